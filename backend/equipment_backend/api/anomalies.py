@@ -0,0 +1,179 @@
+"""
+Anomaly flags for one upload, computed once at ingestion time.
+
+Two checks run over the numeric columns:
+
+- per-type z-score: a value more than ANOMALY_ZSCORE_THRESHOLD sample
+  standard deviations from the mean of its equipment type
+- hard limits: a value outside the ANOMALY_LIMITS range of its column
+  (none by default; deployments opt in per column in settings)
+
+AnomalyScanner flags each parsed chunk right after it has been folded into
+the upload's statistics (api/statistics.py), against the per-type means
+and deviations of every row read so far, that chunk included. There is no
+second pass over the upload: an in-memory upload is one chunk, flagged
+against its final statistics, and a chunked one is judged against figures
+that have settled after the first UPLOAD_CHUNK_ROWS rows, so only values
+right at the threshold can come out differently between the two. (One
+outlier among n values of a type scores at most (n - 1) / sqrt(n), so a
+type needs a dozen rows read before anything can pass a threshold of 3;
+the default chunk is far larger.) Each
+chunk is a few NumPy operations on whole columns; only the counts and the
+first ANOMALY_MAX_ROWS flagged rows are kept. The result is persisted on
+UploadRecord.anomalies; ``row`` is the 1-based data row in the file, as in
+the validation report (api/validation.py), so the two can be read
+side by side.
+"""
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .statistics import compute_statistics
+from .storage import NUMERIC_FIELDS
+
+
+def detect_anomalies(types, values, statistics=None, rows=None, names=None):
+    """
+    ``types`` and ``values`` are as for compute_statistics(), ``statistics``
+    its result for them (computed here if not given). ``rows`` are the
+    1-based file rows of the values and ``names`` their equipment names
+    (see AnomalyScanner.scan). Returns the JSON-ready dict stored on
+    UploadRecord.anomalies:
+
+        {"count": flagged rows, "by_reason": {reason: rows},
+         "rows": [{"row": 4, "name": ..., "type": ..., "reasons": [...]}, ...],
+         "truncated": bool}
+
+    Only the first ANOMALY_MAX_ROWS flagged rows are listed.
+    """
+    if statistics is None:
+        statistics = compute_statistics(types, values)
+    scanner = AnomalyScanner(statistics.get('by_type', {}))
+    scanner.scan(types, values, rows, names)
+    return scanner.result()
+
+
+class AnomalyScanner:
+    """
+    Flags an upload's rows chunk after chunk. ``by_type`` holds the mean
+    and std of each field per type, as in the statistics' "by_type"; a
+    chunked ingest passes the running ones with every chunk instead.
+    """
+
+    def __init__(self, by_type=None):
+        self.by_type = by_type or {}
+        self.threshold = settings.ANOMALY_ZSCORE_THRESHOLD
+        self.rows_scanned = 0
+        self.count = 0
+        self.by_reason = Counter()
+        self.rows = []
+
+    def _type_stat(self, labels, field, stat):
+        # One value per category; NaN where the type has none (e.g. std of
+        # a single row), which never flags
+        values = [self.by_type.get(label, {}).get(field, {}).get(stat) for label in labels]
+        # Trailing NaN for code -1, rows without a type
+        return np.array([np.nan if value is None else value for value in values] + [np.nan])
+
+    def scan(self, types, values, rows=None, names=None, by_type=None):
+        """
+        Flag one chunk. ``rows`` are the chunk's 1-based file rows (its
+        positions after the rows scanned so far if None), ``names`` its
+        equipment names, ``by_type`` the statistics to judge it by if they
+        moved on since the last chunk.
+        """
+        if by_type is not None:
+            self.by_type = by_type
+        if not isinstance(types, pd.Categorical):
+            types = pd.Categorical(types)
+        codes = np.asarray(types.codes)
+        labels = [str(label) for label in types.categories]
+
+        # (reason, field, mask, details) per check; details(rows) describes
+        # each flagged row for the stored list
+        checks = []
+        for field in NUMERIC_FIELDS:
+            x = np.asarray(values[field], dtype='float64')
+            if self.threshold and labels:
+                mean = self._type_stat(labels, field, 'mean')[codes]
+                std = self._type_stat(labels, field, 'std')[codes]
+                checks.append(_zscore_check(field, x, mean, std, self.threshold))
+            low, high = settings.ANOMALY_LIMITS.get(field, (None, None))
+            # NaN compares False, so missing values are never flagged
+            if low is not None:
+                checks.append(('below_min', field, x < low, _limit_details(x, low)))
+            if high is not None:
+                checks.append(('above_max', field, x > high, _limit_details(x, high)))
+
+        if rows is None:
+            rows = np.arange(self.rows_scanned + 1, self.rows_scanned + len(codes) + 1)
+        rows = np.asarray(rows)
+        self.rows_scanned += len(codes)
+        flagged = np.zeros(len(codes), dtype=bool)
+        for _, _, mask, _ in checks:
+            flagged |= mask
+        positions = np.flatnonzero(flagged)
+        self.count += len(positions)
+        listed = positions[:max(settings.ANOMALY_MAX_ROWS - len(self.rows), 0)]
+
+        reasons = {int(position): [] for position in listed}
+        for reason, field, mask, details in checks:
+            total = int(np.count_nonzero(mask))
+            if not total:
+                continue
+            self.by_reason[f'{field}_{reason}'] += total
+            hits = listed[mask[listed]]
+            for position, detail in zip(hits.tolist(), details(hits)):
+                reasons[position].append({"field": field, "reason": reason, **detail})
+        listed_names = _pick(names, listed)
+        for (position, row_reasons), name in zip(reasons.items(), listed_names):
+            code = codes[position]
+            self.rows.append({
+                "row": int(rows[position]),
+                "name": name,
+                "type": labels[code] if code >= 0 else None,
+                "reasons": row_reasons,
+            })
+
+    def result(self):
+        return {
+            "count": self.count,
+            "by_reason": dict(self.by_reason),
+            "rows": self.rows,
+            "truncated": self.count > len(self.rows),
+        }
+
+
+def _pick(names, positions):
+    # Names of the listed rows only, never the whole column
+    if names is None:
+        return [None] * len(positions)
+    if isinstance(names, pd.Series):
+        return names.iloc[positions].tolist()
+    return [names[position] for position in positions.tolist()]
+
+
+def _zscore_check(field, x, mean, std, threshold):
+    # |x - mean| > threshold * std, so no z array is built for every row;
+    # NaN (missing value, type or spread) never flags, zero spread neither
+    deviation = x - mean
+    with np.errstate(invalid='ignore'):
+        mask = np.abs(deviation) > threshold * std
+
+    def details(rows):
+        scores = deviation[rows] / std[rows]
+        return [
+            {"value": value, "zscore": round(score, 2)}
+            for value, score in zip(x[rows].tolist(), scores.tolist())
+        ]
+
+    return 'zscore', field, mask, details
+
+
+def _limit_details(x, limit):
+    def details(rows):
+        return [{"value": value, "limit": limit} for value in x[rows].tolist()]
+    return details
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # Connects the handlers that drop cached PDF reports and responses
+        # and bump the /api/history/ version
+        from . import http_cache, report_cache, response_cache  # noqa: F401
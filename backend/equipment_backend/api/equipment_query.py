@@ -0,0 +1,226 @@
+"""
+Filtering, sorting and keyset pagination of one upload's equipment list.
+
+Query parameters understood by /api/summary/<id>/:
+
+    include_equipment=false     summary only, no equipment list
+    type=Pump&type=Valve        keep only these equipment types
+    min_<field>, max_<field>    inclusive value range, field being
+                                flowrate, pressure or temperature
+    sort=<field> / sort=-<field>  order by a numeric column (default: id)
+    limit=N                     page size, turns pagination on
+    cursor=...                  next_cursor from the previous page
+
+Pages are keyset based: the cursor holds the (sort value, id) of the last
+row returned, so fetching page 100 costs the same as fetching page 1.
+Row storage runs this as SQL against the Equipment indexes, columnar
+storage does the same with NumPy on the unpacked arrays.
+"""
+
+import base64
+import json
+
+import numpy as np
+from django.db.models import Q
+
+from .models import UploadRecord, EquipmentColumns
+from .storage import EQUIPMENT_FIELDS, NUMERIC_FIELDS, unpack_columns, equipment_records
+
+
+MAX_PAGE_SIZE = 5000
+
+
+def parse_equipment_query(params):
+    """Turn request query params into a query dict. Raises ValueError on bad input."""
+    sort = params.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort_field = sort.lstrip('-')
+    if sort_field not in ('id',) + NUMERIC_FIELDS:
+        raise ValueError(f"Cannot sort by '{sort_field}'")
+
+    ranges = {}
+    for field in NUMERIC_FIELDS:
+        for bound in ('min', 'max'):
+            raw = params.get(f'{bound}_{field}')
+            if raw not in (None, ''):
+                try:
+                    ranges[(field, bound)] = float(raw)
+                except ValueError:
+                    raise ValueError(f"{bound}_{field} must be a number")
+
+    limit = params.get('limit')
+    if limit not in (None, ''):
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    else:
+        limit = None
+
+    cursor = params.get('cursor') or None
+    if cursor is not None:
+        cursor = _decode_cursor(cursor)
+        if limit is None:
+            limit = MAX_PAGE_SIZE
+
+    return {
+        'types': [t for t in params.getlist('type') if t],
+        'ranges': ranges,
+        'sort_field': sort_field,
+        'descending': descending,
+        'limit': limit,
+        'cursor': cursor,
+    }
+
+
+def query_equipment(record, query, as_columns=False):
+    """
+    Return (equipment, next_cursor) for one upload. ``equipment`` is a list
+    of dicts, or a dict of column lists with ``as_columns``.
+    """
+    if record.storage == UploadRecord.STORAGE_COLUMNAR:
+        try:
+            page, next_cursor = _query_columnar(record.columns, query)
+        except EquipmentColumns.DoesNotExist:
+            page, next_cursor = _query_rows(record, query)
+    else:
+        page, next_cursor = _query_rows(record, query)
+    return (page if as_columns else equipment_records(page)), next_cursor
+
+
+def _encode_cursor(value, row_id):
+    raw = json.dumps([value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(value), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def iter_equipment(record, query, chunk_size):
+    """
+    Yield the upload's matching equipment as lists of (name, type, flowrate,
+    pressure, temperature) tuples, at most ``chunk_size`` per list, in query
+    order, starting after the cursor if any. Ignores limit; used to stream
+    the whole list out.
+    """
+    if record.storage == UploadRecord.STORAGE_COLUMNAR:
+        try:
+            packed = record.columns
+        except EquipmentColumns.DoesNotExist:
+            packed = None
+        if packed is not None:
+            columns, selected, _ = _select_columnar(packed, query)
+            for start in range(0, len(selected), chunk_size):
+                part = selected[start:start + chunk_size]
+                yield list(zip(*(columns[field][part].tolist() for field in EQUIPMENT_FIELDS)))
+            return
+
+    rows = _rows_queryset(record, query).values_list(*EQUIPMENT_FIELDS)
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _rows_queryset(record, query):
+    qs = record.equipment_list.all()
+    if query['types']:
+        qs = qs.filter(type__in=query['types'])
+    for (field, bound), value in query['ranges'].items():
+        qs = qs.filter(**{f'{field}__{"gte" if bound == "min" else "lte"}': value})
+
+    sort_field = query['sort_field']
+    descending = query['descending']
+    if query['cursor'] is not None:
+        value, last_id = query['cursor']
+        op = 'lt' if descending else 'gt'
+        if sort_field == 'id':
+            qs = qs.filter(**{f'id__{op}': last_id})
+        else:
+            qs = qs.filter(
+                Q(**{f'{sort_field}__{op}': value})
+                | Q(**{sort_field: value, f'id__{op}': last_id})
+            )
+
+    prefix = '-' if descending else ''
+    order = [f'{prefix}id'] if sort_field == 'id' else [f'{prefix}{sort_field}', f'{prefix}id']
+    return qs.order_by(*order)
+
+
+def _query_rows(record, query):
+    qs = _rows_queryset(record, query)
+    sort_field = query['sort_field']
+
+    limit = query['limit']
+    rows = qs.values_list('id', *EQUIPMENT_FIELDS)
+    rows = list(rows[:limit + 1] if limit else rows)
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        last_value = last[0] if sort_field == 'id' else last[1 + EQUIPMENT_FIELDS.index(sort_field)]
+        next_cursor = _encode_cursor(last_value, last[0])
+
+    if not rows:
+        return {field: [] for field in EQUIPMENT_FIELDS}, next_cursor
+    return dict(zip(EQUIPMENT_FIELDS, map(list, list(zip(*rows))[1:]))), next_cursor
+
+
+def _query_columnar(packed, query):
+    columns, selected, keys = _select_columnar(packed, query)
+
+    limit = query['limit']
+    next_cursor = None
+    if limit and len(selected) > limit:
+        selected = selected[:limit]
+        last = int(selected[-1])
+        next_cursor = _encode_cursor(float(keys[last]), last)
+
+    return {field: columns[field][selected].tolist() for field in EQUIPMENT_FIELDS}, next_cursor
+
+
+def _select_columnar(packed, query):
+    # Returns the unpacked columns, the matching row positions in query
+    # order and the sort keys
+    columns = unpack_columns(packed, as_arrays=True)
+    n_rows = len(columns['name'])
+    # Position in the upload plays the part of the row id
+    row_ids = np.arange(n_rows)
+    mask = np.ones(n_rows, dtype=bool)
+
+    if query['types']:
+        mask &= np.isin(columns['type'], query['types'])
+    for (field, bound), value in query['ranges'].items():
+        mask &= (columns[field] >= value) if bound == 'min' else (columns[field] <= value)
+
+    sort_field = query['sort_field']
+    descending = query['descending']
+    keys = row_ids if sort_field == 'id' else columns[sort_field]
+
+    if query['cursor'] is not None:
+        value, last_id = query['cursor']
+        if sort_field == 'id':
+            after = (row_ids < last_id) if descending else (row_ids > last_id)
+        elif descending:
+            after = (keys < value) | ((keys == value) & (row_ids < last_id))
+        else:
+            after = (keys > value) | ((keys == value) & (row_ids > last_id))
+        mask &= after
+
+    selected = row_ids[mask]
+    order = np.lexsort((selected, keys[selected]))
+    if descending:
+        order = order[::-1]
+    return columns, selected[order], keys
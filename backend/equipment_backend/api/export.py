@@ -0,0 +1,118 @@
+"""
+Streaming export of an upload's equipment list for /api/export/<id>/.
+
+Rows come from iter_equipment() (a server-side cursor over Equipment, or
+slices of the unpacked columns) and are encoded chunk by chunk, so no
+format ever holds the whole list:
+
+    csv      the upload's original headers, ready to be uploaded again
+    ndjson   one JSON object per line
+    parquet  one row group per chunk; needs pyarrow
+"""
+
+import csv
+import io
+import json
+import math
+
+from .ingest import COLUMN_MAP
+from .renderers import arrow_available
+from .storage import EQUIPMENT_FIELDS, NUMERIC_FIELDS
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportError(Exception):
+    """Raised when an export format cannot be produced here."""
+
+
+def export_stream(export_format, chunks):
+    """Return an iterator of bytes encoding ``chunks`` in ``export_format``."""
+    if export_format == 'csv':
+        return _csv_stream(chunks)
+    if export_format == 'ndjson':
+        return _ndjson_stream(chunks)
+    if export_format == 'parquet':
+        if not arrow_available():
+            raise ExportError("Parquet export requires pyarrow to be installed on the server")
+        return _parquet_stream(chunks)
+    raise ExportError(f"Unknown export format '{export_format}'")
+
+
+def _csv_stream(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(list(COLUMN_MAP))
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_stream(chunks):
+    encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    for chunk in chunks:
+        lines = [
+            encoder.encode({
+                field: None if isinstance(value, float) and math.isnan(value) else value
+                for field, value in zip(EQUIPMENT_FIELDS, row)
+            })
+            for row in chunk
+        ]
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _Drain(io.RawIOBase):
+    # Write-only file that hands out whatever was written since the last take()
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_stream(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [('name', pa.string()), ('type', pa.dictionary(pa.int32(), pa.string()))]
+        + [(field, pa.float64()) for field in NUMERIC_FIELDS]
+    )
+    drain = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(drain, mode='w'), schema)
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            names, types, *numeric = zip(*chunk)
+            table = pa.Table.from_arrays(
+                [pa.array(names, type=pa.string()), pa.array(types, type=pa.string()).dictionary_encode()]
+                + [pa.array(values, type=pa.float64()) for values in numeric],
+                schema=schema,
+            )
+            writer.write_table(table)
+            data = drain.take()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield drain.take()
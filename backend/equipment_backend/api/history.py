@@ -0,0 +1,109 @@
+"""
+Upload history listing for /api/history/.
+
+Query parameters:
+
+    fields=id,uploaded_at,...   only return these fields (default: all of
+                                HISTORY_DEFAULT_FIELDS)
+    limit=N                     page size (default 5, the old fixed window)
+    cursor=...                  next_cursor from the previous page
+    compact=true                return {"fields": [...], "rows": [[...]]}
+                                instead of one dict per upload
+
+Every page is one SELECT of just the requested columns, ordered by
+(uploaded_at, id) descending with a keyset condition on the same pair,
+backed by the uploadrecord_history_idx index.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import UploadRecord
+
+HISTORY_FIELDS = (
+    'id',
+    'uploaded_at',
+    'total_equipment',
+    'average_flowrate',
+    'average_pressure',
+    'average_temperature',
+    'equipment_type_distribution',
+    'statistics',
+    'storage',
+)
+HISTORY_DEFAULT_FIELDS = HISTORY_FIELDS[:-1]
+
+DEFAULT_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 500
+
+
+def parse_history_query(params):
+    """Turn request query params into a query dict. Raises ValueError on bad input."""
+    fields = params.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    else:
+        fields = list(HISTORY_DEFAULT_FIELDS)
+
+    limit = params.get('limit')
+    if limit not in (None, ''):
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    else:
+        limit = DEFAULT_PAGE_SIZE
+
+    cursor = params.get('cursor') or None
+    if cursor is not None:
+        cursor = _decode_cursor(cursor)
+
+    return {'fields': fields, 'limit': limit, 'cursor': cursor}
+
+
+def query_history(query):
+    """Return (rows as tuples in query['fields'] order, next_cursor)."""
+    fields = query['fields']
+    # The keyset columns are always fetched, even if not asked for
+    columns = list(dict.fromkeys(fields + ['uploaded_at', 'id']))
+
+    qs = UploadRecord.objects.filter(complete=True).order_by('-uploaded_at', '-id')
+    if query['cursor'] is not None:
+        uploaded_at, last_id = query['cursor']
+        qs = qs.filter(Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=last_id))
+
+    limit = query['limit']
+    rows = list(qs.values_list(*columns)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(columns, rows[-1]))
+        next_cursor = _encode_cursor(last['uploaded_at'], last['id'])
+
+    positions = [columns.index(f) for f in fields]
+    return [tuple(row[i] for i in positions) for row in rows], next_cursor
+
+
+def _encode_cursor(uploaded_at, record_id):
+    raw = json.dumps([uploaded_at.isoformat(), record_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        uploaded_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        uploaded_at = parse_datetime(uploaded_at)
+        if uploaded_at is None:
+            raise ValueError
+        return uploaded_at, int(record_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,127 @@
+"""
+Conditional GET support for the JSON endpoints.
+
+/api/summary/<id>/ only changes when its UploadRecord is saved again
+(statistics backfill, storage conversion), so its ETag is built from the
+record's updated_at and the query string, and Last-Modified is updated_at.
+
+/api/history/ changes whenever any upload is created, updated or deleted.
+Rather than rerun the history query to find out, every such change bumps
+the 'history' ChangeCounter row after commit; the ETag is that number plus
+the query string, and Last-Modified is when it was last bumped.
+
+A client that sends back If-None-Match / If-Modified-Since gets a 304
+without the equipment or history queries being run.
+"""
+
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from .models import ChangeCounter, UploadRecord
+
+# Bump whenever the summary or history JSON layout changes
+RESPONSE_FORMAT_VERSION = 3
+
+HISTORY_COUNTER = 'history'
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match already covers ``etag`` (weak comparison)."""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    bare = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == bare for tag in header.split(','))
+
+
+def _not_modified_since(request, last_modified):
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Return a 304 response if the client's copy is still current, else None.
+    If-None-Match wins over If-Modified-Since when both are sent.
+    """
+    if 'HTTP_IF_NONE_MATCH' in request.META:
+        fresh = etag_matches(request, etag)
+    else:
+        fresh = last_modified is not None and _not_modified_since(request, last_modified)
+    if not fresh:
+        return None
+    response = HttpResponseNotModified()
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None, max_age=0):
+    """Attach ETag, Last-Modified and Cache-Control to a response."""
+    response['ETag'] = etag
+    # The body depends on the Accept header (api/renderers.py)
+    patch_vary_headers(response, ['Accept'])
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Responses are per user, so only the client may keep them; with max_age
+    # 0 it must revalidate every time, which is what gets polling clients 304s
+    if max_age:
+        patch_cache_control(response, private=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def query_digest(request):
+    """
+    Short digest of the query string, independent of parameter order, and
+    of the negotiated response format (JSON, packed columns, Arrow...).
+    """
+    params = sorted(request.GET.lists())
+    renderer = getattr(request, 'accepted_renderer', None)
+    params.append(('format', getattr(renderer, 'format', None)))
+    return hashlib.sha256(repr(params).encode('utf-8')).hexdigest()[:16]
+
+
+def summary_etag(request, record, resource='summary'):
+    """ETag of anything derived from one upload only (summary, export...)."""
+    stamp = int(record.updated_at.timestamp() * 1_000_000)
+    return f'"{resource}-{record.id}-{stamp}-v{RESPONSE_FORMAT_VERSION}-{query_digest(request)}"'
+
+
+def history_version():
+    """Return (counter value, last change time) for /api/history/."""
+    counter, _ = ChangeCounter.objects.get_or_create(name=HISTORY_COUNTER)
+    return counter.value, counter.changed_at
+
+
+def history_etag(request, version, resource='history'):
+    """ETag of anything derived from the whole upload history (history, trends...)."""
+    return f'"{resource}-{version}-v{RESPONSE_FORMAT_VERSION}-{query_digest(request)}"'
+
+
+def bump_history_version():
+    updated = ChangeCounter.objects.filter(name=HISTORY_COUNTER).update(
+        value=F('value') + 1,
+        changed_at=timezone.now(),
+    )
+    if not updated:
+        ChangeCounter.objects.get_or_create(name=HISTORY_COUNTER, defaults={'value': 1})
+
+
+@receiver(post_save, sender=UploadRecord, dispatch_uid='api.http_cache.history_saved')
+@receiver(post_delete, sender=UploadRecord, dispatch_uid='api.http_cache.history_deleted')
+def _history_changed(sender, **kwargs):
+    # Bump after commit, so the counter row is never locked for the length
+    # of an upload transaction and readers never see a version whose data
+    # isn't visible yet
+    transaction.on_commit(bump_history_version)
@@ -0,0 +1,367 @@
+"""
+Column-oriented helpers for turning a parsed CSV DataFrame into
+response payloads and Equipment rows.
+
+The old path walked the DataFrame with iterrows(), which builds a pandas
+Series for every row. Here we pull each column out once as a NumPy array
+and zip the plain Python lists together instead.
+
+ingest_csv_stream() is the chunked variant used for very large uploads:
+each chunk is validated, inserted and folded into running aggregates, so
+only one chunk is ever held in memory.
+
+Both paths parse through read_equipment_csv(): the header line is checked
+before anything else is read, then only the five required columns are
+parsed, with pinned dtypes and the multithreaded pyarrow engine when it is
+installed. Rows are then validated in bulk (api/validation.py): bad ones
+are dropped and reported, or refuse the upload with ?invalid_rows=reject.
+"""
+
+from collections import Counter
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import UploadRecord
+from .anomalies import AnomalyScanner
+from .rollups import apply_rollup, compute_rollup
+from .statistics import StatisticsCollector
+from .validation import INVALID_ROWS_MODES, NUMERIC_COLUMNS, RowValidator
+from .storage import NUMERIC_FIELDS, EquipmentWriter, default_backend, delete_series
+
+
+# CSV header -> field name used in the API payload and on the model
+COLUMN_MAP = {
+    'Equipment Name': 'name',
+    'Type': 'type',
+    'Flowrate': 'flowrate',
+    'Pressure': 'pressure',
+    'Temperature': 'temperature',
+}
+
+REQUIRED_COLUMNS = set(COLUMN_MAP)
+
+# Pinned dtypes, so pandas skips type inference on every column. Names stay
+# strings even when they look numeric.
+CSV_DTYPES = {
+    'Equipment Name': str,
+    'Type': 'category',
+    'Flowrate': 'float64',
+    'Pressure': 'float64',
+    'Temperature': 'float64',
+}
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # optional: pandas' C parser
+    pyarrow = None
+
+
+class IngestError(Exception):
+    """Raised when an uploaded CSV cannot be ingested (bad format, missing columns...)."""
+
+
+class InvalidRowsError(IngestError):
+    """Raised when invalid rows refuse the upload; ``report`` is the RowValidator result."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def invalid_rows_mode(value=None):
+    """Validate an ?invalid_rows= value, falling back to INVALID_ROWS_MODE."""
+    mode = value or settings.INVALID_ROWS_MODE
+    if mode not in INVALID_ROWS_MODES:
+        raise IngestError(f"invalid_rows must be one of: {', '.join(INVALID_ROWS_MODES)}")
+    return mode
+
+
+def validate_rows(validator, df, mode):
+    """Run one frame through ``validator``; in 'reject' mode any bad row refuses the upload."""
+    df = validator.clean(df)
+    if mode == 'reject' and validator.rows_rejected:
+        raise InvalidRowsError("CSV contains invalid rows", validator.result())
+    return df
+
+
+def check_valid_rows(validator, count):
+    """Refuse an upload whose rows were all rejected (or that had none)."""
+    if count:
+        return
+    if validator.rows_rejected:
+        raise InvalidRowsError("CSV file contains no valid equipment rows", validator.result())
+    raise IngestError("CSV file contains no equipment rows")
+
+
+def equipment_columns(df):
+    """Extract the equipment columns from a DataFrame as plain lists."""
+    columns = {}
+    for csv_name, field in COLUMN_MAP.items():
+        series = df[csv_name]
+        if field in NUMERIC_FIELDS:
+            # one vectorized cast per column instead of float() per cell
+            columns[field] = series.to_numpy(dtype='float64').tolist()
+        else:
+            columns[field] = series.tolist()
+    return columns
+
+
+def chunk_values(df):
+    """(types, numeric values by field) of a parsed chunk, as compute_statistics() takes them."""
+    return df['Type'], {field: df[csv_name] for csv_name, field in COLUMN_MAP.items() if field in NUMERIC_FIELDS}
+
+
+class RunningAggregates:
+    """
+    Count, per-column sums, type counts, fleet rollup totals and the
+    extended statistics (api/statistics.py), folded in one chunk at a time
+    in memory that doesn't grow with the upload. Each chunk is flagged for
+    anomalies against the statistics so far, see AnomalyScanner.
+    ``exact`` is for a frame that is in memory whole, see StatisticsCollector.
+    """
+
+    def __init__(self, exact=False):
+        self.count = 0
+        self.sums = {field: 0.0 for field in NUMERIC_FIELDS}
+        # non-null counts, so the means skip NaN exactly like DataFrame.mean()
+        self.non_null = {field: 0 for field in NUMERIC_FIELDS}
+        self.type_counts = Counter()
+        self.statistics = StatisticsCollector(exact=exact)
+        self._rollup = {}
+
+    def update(self, df):
+        self.count += len(df)
+        for csv_name, field in COLUMN_MAP.items():
+            if field in NUMERIC_FIELDS:
+                self.sums[field] += float(df[csv_name].sum())
+                self.non_null[field] += int(df[csv_name].count())
+        self.type_counts.update(df['Type'].value_counts().to_dict())
+        types, values = chunk_values(df)
+        self.statistics.update(types, values)
+        for eq_type, totals in compute_rollup(types, values).items():
+            running = self._rollup.setdefault(eq_type, dict.fromkeys(totals, 0))
+            for column, value in totals.items():
+                running[column] += value
+
+    def mean(self, field):
+        if not self.non_null[field]:
+            return float('nan')
+        return round(self.sums[field] / self.non_null[field], 2)
+
+    def summary(self):
+        return {
+            "total_equipment": self.count,
+            "average_flowrate": self.mean('flowrate'),
+            "average_pressure": self.mean('pressure'),
+            "average_temperature": self.mean('temperature'),
+            "equipment_type_distribution": dict(self.type_counts.most_common()),
+            "statistics": self.statistics.result(),
+        }
+
+    def rollup(self):
+        """This upload's contribution to the fleet rollups (api/rollups.py)."""
+        return self._rollup
+
+
+def check_columns(df):
+    if not REQUIRED_COLUMNS.issubset(df.columns):
+        raise IngestError("CSV missing required columns")
+
+
+def check_header(file):
+    """
+    Read only the header line and fail early if a required column is
+    missing. Leaves the file rewound for the actual parse.
+    """
+    try:
+        header = pd.read_csv(file, nrows=0).columns
+    except Exception as e:
+        raise IngestError(f"Invalid CSV file: {str(e)}")
+    finally:
+        file.seek(0)
+    check_columns(pd.DataFrame(columns=header))
+
+
+def csv_engine():
+    """The read_csv engine for whole-file parses, see CSV_PARSER_ENGINE."""
+    engine = settings.CSV_PARSER_ENGINE
+    if engine == 'auto':
+        return 'pyarrow' if pyarrow is not None else 'c'
+    return engine
+
+
+def _csv_options(pinned=True):
+    dtypes = CSV_DTYPES if pinned else {
+        column: dtype for column, dtype in CSV_DTYPES.items() if column not in NUMERIC_COLUMNS
+    }
+    return {'usecols': list(COLUMN_MAP), 'dtype': dtypes}
+
+
+def read_equipment_csv(file, chunk_rows=None):
+    """
+    Parse an uploaded CSV: header check first, then only the required
+    columns with pinned dtypes. With ``chunk_rows`` returns an iterator of
+    chunks (always the C parser, pyarrow cannot read in chunks), otherwise
+    one DataFrame parsed with csv_engine(). Raises IngestError.
+
+    A cell that is not a number makes the pinned float64 parse fail; the
+    file (or the rest of it, chunk-wise) is then read again with the
+    numeric columns left to inference, so RowValidator can coerce them and
+    report the bad rows. Clean files never take that path.
+    """
+    check_header(file)
+    if chunk_rows:
+        return _read_chunks(file, chunk_rows)
+    try:
+        try:
+            return pd.read_csv(file, engine=csv_engine(), **_csv_options())
+        except ValueError:
+            file.seek(0)
+            return pd.read_csv(file, engine=csv_engine(), **_csv_options(pinned=False))
+    except Exception as e:
+        raise IngestError(f"Invalid CSV file: {str(e)}")
+
+
+def _read_chunks(file, chunk_rows):
+    done = 0
+    try:
+        for chunk in pd.read_csv(file, chunksize=chunk_rows, **_csv_options()):
+            done += 1
+            yield chunk
+        return
+    except ValueError:
+        file.seek(0)
+    # Same chunk boundaries as before, so skip the chunks already handed out
+    reader = pd.read_csv(file, chunksize=chunk_rows, **_csv_options(pinned=False))
+    for index, chunk in enumerate(reader):
+        if index >= done:
+            yield chunk
+
+
+def find_duplicate(content_sha256):
+    """
+    The upload already ingested from a file with this digest, if any. Only
+    completed uploads carry a digest (see _ingest_chunks), so an upload still
+    being ingested never matches.
+    """
+    if not content_sha256:
+        return None
+    return UploadRecord.objects.filter(content_sha256=content_sha256, complete=True).first()
+
+
+def release_digest(content_sha256):
+    """Detach a digest from the upload holding it, so a forced re-ingest can take it over."""
+    if content_sha256:
+        UploadRecord.objects.filter(content_sha256=content_sha256).update(content_sha256=None)
+
+
+def ingest_csv_stream(file, chunk_rows, on_progress=None, atomic=True, content_sha256=None, force=False,
+                      invalid_rows=None, on_record=None):
+    """
+    Read an uploaded CSV in chunks of ``chunk_rows`` rows, inserting each
+    chunk and keeping running aggregates. Returns the saved UploadRecord.
+
+    By default everything happens in one transaction, so a bad chunk halfway
+    through leaves nothing behind. Background jobs pass ``atomic=False`` so
+    each chunk commits on its own and progress is visible to other
+    connections; the half-written record is deleted if ingestion fails, and
+    stays marked incomplete (hidden from every listing) until it succeeds.
+    ``on_record(record)`` is called once that record exists, so a job can
+    find it again if its worker dies. ``on_progress(rows_done)`` is called
+    after each chunk.
+
+    ``content_sha256`` is stored on the record in the same save that
+    completes it; with ``force`` it is taken over from an earlier upload of
+    the same file at that point, so a failed re-ingest leaves the earlier
+    upload's digest alone. ``invalid_rows`` is
+    'drop' or 'reject' (see api/validation.py), INVALID_ROWS_MODE if None.
+    """
+    mode = invalid_rows_mode(invalid_rows)
+    reader = read_equipment_csv(file, chunk_rows)
+
+    if atomic:
+        with transaction.atomic():
+            record = _create_placeholder_record()
+            _ingest_chunks(record, reader, on_progress, mode, content_sha256, force)
+        return record
+
+    record = _create_placeholder_record()
+    if on_record:
+        on_record(record)
+    try:
+        _ingest_chunks(record, reader, on_progress, mode, content_sha256, force)
+    except Exception:
+        # The series has no foreign key to the record, see api/storage.py
+        delete_series([record.id])
+        record.delete()
+        raise
+    return record
+
+
+def _create_placeholder_record():
+    # Placeholder values, filled in once the last chunk has been read
+    return UploadRecord.objects.create(
+        complete=False,
+        total_equipment=0,
+        average_flowrate=0,
+        average_pressure=0,
+        average_temperature=0,
+        equipment_type_distribution={},
+        storage=default_backend(),
+    )
+
+
+def _ingest_chunks(record, reader, on_progress, mode='drop', content_sha256=None, force=False):
+    aggregates = RunningAggregates()
+    validator = RowValidator()
+    scanner = AnomalyScanner()
+    writer = EquipmentWriter(record)
+
+    try:
+        for chunk in reader:
+            check_columns(chunk)
+            chunk = validate_rows(validator, chunk, mode)
+            try:
+                columns = equipment_columns(chunk)
+            except ValueError as e:
+                raise IngestError(
+                    f"Invalid numeric value near row {aggregates.count + 1}: {str(e)}"
+                )
+            writer.append(columns)
+            aggregates.update(chunk)
+            # Judged by the statistics of every row read so far, this chunk
+            # included, so the upload is never read a second time
+            scanner.scan(
+                *chunk_values(chunk), rows=chunk.index + 1, names=chunk['Equipment Name'],
+                by_type=aggregates.statistics.type_spread(),
+            )
+            if on_progress:
+                on_progress(validator.rows_checked)
+    except IngestError:
+        raise
+    except Exception as e:
+        raise IngestError(f"Invalid CSV file: {str(e)}")
+
+    check_valid_rows(validator, aggregates.count)
+
+    writer.close()
+
+    summary = aggregates.summary()
+    summary['anomalies'] = scanner.result()
+    summary['rollup'] = aggregates.rollup()
+    summary['validation'] = validator.result()
+    # The digest is only claimed now that the upload is complete
+    summary['content_sha256'] = content_sha256 or None
+    summary['complete'] = True
+    for field, value in summary.items():
+        setattr(record, field, value)
+    # Joins the caller's transaction if there is one, so the rollups and the
+    # digest move together with the upload
+    with transaction.atomic():
+        if force:
+            release_digest(content_sha256)
+        record.save(update_fields=list(summary) + ['updated_at'])
+        apply_rollup(record.rollup, record.uploaded_at)
+
@@ -0,0 +1,301 @@
+"""
+Database-backed background ingestion queue.
+
+upload_csv(?async=true) saves the file, creates an IngestJob row and hands
+its id to a small in-process thread pool. Workers claim a job with a
+conditional UPDATE on its status, so the same job is never run twice even
+when several processes (or the process_ingest_jobs command) look at the
+queue at once. No external broker is needed.
+
+A claim is a lease: while a worker runs a job, a side thread refreshes
+the job's heartbeat every third of INGEST_JOB_LEASE_SECONDS, however long
+a single step (writing a columnar blob, say) takes. requeue_stale_jobs()
+puts a running job whose heartbeat is older than the lease back in the
+queue, deleting the half-written upload its dead worker left behind.
+Every write a worker makes to its job is conditional on still holding the
+claim, so a worker that only stalled cannot overwrite the next attempt.
+
+Jobs outlive the process that accepted them without any extra service:
+recover_jobs(), run lazily from job polls and new async uploads at most
+every INGEST_JOB_RECOVERY_SECONDS, requeues stale jobs and hands every
+queued job to this process's workers. `manage.py process_ingest_jobs`
+does the same from a separate process.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .ingest import IngestError, InvalidRowsError, find_duplicate, ingest_csv_stream
+from .retention import trim_after_upload
+from .storage import delete_series
+from .models import IngestJob, UploadRecord
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Ids of the jobs handed to this process's workers and not finished yet
+_dispatched = set()
+# time.monotonic() after which recover_jobs() may run again
+_next_recovery = 0.0
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                thread_name_prefix='ingest',
+            )
+        return _executor
+
+
+def submit_job(file, content_sha256='', force=False, invalid_rows=''):
+    """Queue an uploaded file for ingestion and return the IngestJob."""
+    recover_jobs()
+    job = IngestJob(
+        file_size=file.size or 0,
+        content_sha256=content_sha256 or '',
+        force=force,
+        invalid_rows=invalid_rows or '',
+    )
+    job.file.save(file.name or 'upload.csv', file, save=False)
+    job.save()
+
+    if settings.INGEST_JOBS_EAGER:
+        run_job(job.id)
+        job.refresh_from_db()
+    else:
+        # Only hand the id to a worker once the row is visible to it
+        transaction.on_commit(lambda: _dispatch(job.id))
+    return job
+
+
+def _dispatch(job_id):
+    with _executor_lock:
+        if job_id in _dispatched:
+            return
+        _dispatched.add(job_id)
+    _get_executor().submit(_run_in_worker, job_id)
+
+
+def recover_jobs():
+    """
+    Requeue stale jobs, then hand every queued job to this process's
+    workers (or run them inline with INGEST_JOBS_EAGER). Queued jobs of a
+    process that has gone away are picked up that way; a job another
+    process runs first is simply not claimed here. Does nothing if it ran
+    less than INGEST_JOB_RECOVERY_SECONDS ago in this process.
+    """
+    global _next_recovery
+    with _executor_lock:
+        now = time.monotonic()
+        if now < _next_recovery:
+            return
+        _next_recovery = now + settings.INGEST_JOB_RECOVERY_SECONDS
+
+    requeue_stale_jobs()
+    queued = IngestJob.objects.filter(status=IngestJob.STATUS_QUEUED).order_by('created_at', 'id')
+    for job_id in queued.values_list('id', flat=True):
+        if settings.INGEST_JOBS_EAGER:
+            run_job(job_id)
+        else:
+            _dispatch(job_id)
+
+
+class LeaseLost(IngestError):
+    """The job was requeued while this worker was still running it."""
+
+
+class _Heartbeat:
+    """
+    Refreshes a running job's heartbeat from a side thread every
+    ``interval`` seconds until the block exits. ``lost`` turns True once
+    the claim is gone.
+    """
+
+    def __init__(self, job, interval):
+        self.job = job
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'ingest-heartbeat-{job.id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not _claimed(self.job).update(heartbeat_at=timezone.now()):
+                        self.lost = True
+                        return
+                except DatabaseError:
+                    # e.g. SQLite busy with the worker's own write; the
+                    # next beat is still well within the lease
+                    logger.warning("Heartbeat of ingest job %s failed", self.job.id, exc_info=True)
+        finally:
+            # This thread's own connection
+            connections.close_all()
+
+
+def claim_job(job_id):
+    """Atomically move a queued job to running. Returns False if someone else got it."""
+    now = timezone.now()
+    return IngestJob.objects.filter(id=job_id, status=IngestJob.STATUS_QUEUED).update(
+        status=IngestJob.STATUS_RUNNING,
+        started_at=now,
+        heartbeat_at=now,
+        attempts=F('attempts') + 1,
+    ) == 1
+
+
+def _claimed(job):
+    # The job as long as this worker's claim on it stands
+    return IngestJob.objects.filter(id=job.id, status=IngestJob.STATUS_RUNNING, attempts=job.attempts)
+
+
+def run_job(job_id):
+    """Claim and run a single job. Returns True if this call ran it."""
+    if not claim_job(job_id):
+        return False
+
+    job = IngestJob.objects.get(id=job_id)
+
+    heartbeat = _Heartbeat(job, settings.INGEST_JOB_LEASE_SECONDS / 3)
+
+    def report_progress(rows_done):
+        if heartbeat.lost or not _claimed(job).update(rows_processed=rows_done, heartbeat_at=timezone.now()):
+            raise LeaseLost(f"Ingest job {job_id} was requeued")
+
+    def link_record(record):
+        _claimed(job).update(upload_record=record)
+
+    try:
+        with heartbeat, job.file.open('rb') as f:
+            # Chunks commit one by one so pollers can watch rows_processed grow
+            record = ingest_csv_stream(
+                f,
+                settings.UPLOAD_CHUNK_ROWS,
+                on_progress=report_progress,
+                on_record=link_record,
+                atomic=False,
+                content_sha256=job.content_sha256,
+                force=job.force,
+                invalid_rows=job.invalid_rows or None,
+            )
+        trim_after_upload()
+    except IntegrityError:
+        # Another upload of the same file got its record in first
+        record = find_duplicate(job.content_sha256)
+        if record is None:
+            logger.exception("Ingest job %s failed", job_id)
+            _finish(job, IngestJob.STATUS_FAILED, error="Ingestion failed: integrity error")
+        else:
+            _finish(job, IngestJob.STATUS_DONE, record=record)
+    except InvalidRowsError as e:
+        _finish(job, IngestJob.STATUS_FAILED, error=str(e), validation=e.report)
+    except IngestError as e:
+        _finish(job, IngestJob.STATUS_FAILED, error=str(e))
+    except Exception as e:
+        logger.exception("Ingest job %s failed", job_id)
+        _finish(job, IngestJob.STATUS_FAILED, error=f"Ingestion failed: {str(e)}")
+    else:
+        _finish(job, IngestJob.STATUS_DONE, record=record)
+    return True
+
+
+def run_pending_jobs(limit=None):
+    """Run queued jobs in this thread, oldest first. Returns how many were run."""
+    queued = IngestJob.objects.filter(status=IngestJob.STATUS_QUEUED).order_by('created_at', 'id')
+    ids = queued.values_list('id', flat=True)
+    if limit:
+        ids = ids[:limit]
+    return sum(1 for job_id in list(ids) if run_job(job_id))
+
+
+def requeue_stale_jobs(now=None):
+    """
+    Recover running jobs whose worker stopped heartbeating: back to the
+    queue, or failed once they have used up INGEST_JOB_MAX_ATTEMPTS.
+    Deletes the incomplete uploads they and any other dead ingest left
+    behind. Returns the ids of the recovered jobs.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.INGEST_JOB_LEASE_SECONDS)
+    stale = IngestJob.objects.filter(status=IngestJob.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+    recovered = []
+    abandoned = []
+    for job in stale:
+        if job.attempts >= settings.INGEST_JOB_MAX_ATTEMPTS:
+            if _finish(job, IngestJob.STATUS_FAILED, error="Ingestion failed: worker stopped responding"):
+                recovered.append(job.id)
+                abandoned.append(job.upload_record_id)
+            continue
+        # Conditional on the heartbeat too, so a worker that reports in
+        # meanwhile keeps its job
+        requeued = _claimed(job).filter(heartbeat_at=job.heartbeat_at).update(
+            status=IngestJob.STATUS_QUEUED,
+            started_at=None,
+            heartbeat_at=None,
+            rows_processed=0,
+            upload_record=None,
+        )
+        if requeued:
+            recovered.append(job.id)
+            abandoned.append(job.upload_record_id)
+
+    # Placeholders of the jobs above, and of any ingest that died before
+    # linking its record; uploads of jobs still holding a lease stay
+    active = IngestJob.objects.filter(status=IngestJob.STATUS_RUNNING, upload_record__isnull=False)
+    dead = UploadRecord.objects.filter(complete=False).filter(
+        Q(id__in=[record_id for record_id in abandoned if record_id]) | Q(uploaded_at__lt=cutoff)
+    ).exclude(id__in=active.values('upload_record_id'))
+    dead_ids = list(dead.values_list('id', flat=True))
+    delete_series(dead_ids)
+    UploadRecord.objects.filter(id__in=dead_ids).delete()
+    return recovered
+
+
+def _finish(job, status, record=None, error='', validation=None):
+    """Record the outcome if this worker still holds the job. Returns whether it did."""
+    updates = {
+        'status': status,
+        'error': error,
+        'file': '',
+        'finished_at': timezone.now(),
+    }
+    if record is not None:
+        updates['upload_record'] = record
+        updates['rows_processed'] = record.total_equipment
+    if validation is not None:
+        updates['validation'] = validation
+    if not _claimed(job).update(**updates):
+        return False
+    # The spooled upload is no longer needed once the job has finished
+    job.file.delete(save=False)
+    return True
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        with _executor_lock:
+            _dispatched.discard(job_id)
+        close_old_connections()
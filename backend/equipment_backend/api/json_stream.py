@@ -0,0 +1,46 @@
+"""
+Incremental JSON encoding of a summary and its equipment list.
+
+DRF renders a response from one complete Python object into one buffer,
+so a summary of a million rows sits in memory twice. Here the summary
+fields are encoded up front and the equipment list is written out chunk
+by chunk as the rows come off the database cursor (or the unpacked
+columns), so memory stays at about one chunk however large the upload.
+"""
+
+import json
+import math
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .storage import EQUIPMENT_FIELDS, NUMERIC_FIELDS
+
+_NUMERIC_POSITIONS = [EQUIPMENT_FIELDS.index(field) for field in NUMERIC_FIELDS]
+
+
+def _clean(row):
+    # JSON has no NaN, and an exception halfway through a stream would
+    # leave the client with a truncated body
+    if any(isinstance(row[i], float) and math.isnan(row[i]) for i in _NUMERIC_POSITIONS):
+        return [None if isinstance(v, float) and math.isnan(v) else v for v in row]
+    return row
+
+
+def stream_summary(summary, chunks):
+    """
+    Yield ``summary`` as UTF-8 JSON with an "equipment" list built from
+    ``chunks``, an iterable of lists of row tuples in EQUIPMENT_FIELDS order.
+    """
+    head = json.dumps(summary, cls=JSONEncoder, separators=(',', ':'))
+    yield (head[:-1] + (',' if summary else '') + '"equipment":[').encode('utf-8')
+
+    encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = encoder.encode([dict(zip(EQUIPMENT_FIELDS, _clean(row))) for row in chunk])[1:-1]
+        yield (body if first else ',' + body).encode('utf-8')
+        first = False
+
+    yield b']}'
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from api.models import SeriesReading, UploadRecord
+from api.storage import load_columns, write_series
+
+
+class Command(BaseCommand):
+    help = "Write the per-asset series readings of stored uploads that have none (e.g. uploads from before the series existed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rewrite the readings of every stored upload.")
+
+    def handle(self, *args, **options):
+        records = UploadRecord.objects.filter(complete=True).order_by('id')
+        if not options['all']:
+            records = records.filter(~Exists(SeriesReading.objects.filter(upload_id=OuterRef('pk'))))
+
+        updated = 0
+        for record in records.iterator():
+            with transaction.atomic():
+                SeriesReading.objects.filter(upload_id=record.id).delete()
+                write_series(record, load_columns(record))
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled series readings for {updated} upload(s)"))
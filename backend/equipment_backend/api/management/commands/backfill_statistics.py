@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.anomalies import detect_anomalies
+from api.models import UploadRecord
+from api.statistics import compute_statistics
+from api.storage import NUMERIC_FIELDS, load_columns
+from api.validation import kept_rows
+
+
+class Command(BaseCommand):
+    help = "Compute extended statistics and anomaly flags for uploads stored before they were recorded at ingestion time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute for every upload, not just missing ones.")
+
+    def handle(self, *args, **options):
+        records = UploadRecord.objects.filter(complete=True).order_by('id')
+        if not options['all']:
+            records = records.filter(Q(statistics={}) | Q(anomalies={}))
+
+        updated = 0
+        for record in records.iterator():
+            columns = load_columns(record)
+            values = {field: columns[field] for field in NUMERIC_FIELDS}
+            record.statistics = compute_statistics(columns['type'], values)
+            # Numbered by file row like at ingestion; by stored position when
+            # the validation report can't tell which rows were dropped
+            record.anomalies = detect_anomalies(
+                columns['type'], values, record.statistics,
+                rows=kept_rows(record.validation, len(columns['type'])), names=columns['name'],
+            )
+            record.save(update_fields=['statistics', 'anomalies', 'updated_at'])
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Updated statistics for {updated} upload(s)"))
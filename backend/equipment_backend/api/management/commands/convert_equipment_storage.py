@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import UploadRecord
+from api.storage import convert_record
+
+
+class Command(BaseCommand):
+    help = "Move existing uploads between the 'rows' and 'columnar' equipment storage layouts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to',
+            required=True,
+            choices=[UploadRecord.STORAGE_ROWS, UploadRecord.STORAGE_COLUMNAR],
+            help="Target storage layout.",
+        )
+        parser.add_argument('ids', nargs='*', type=int, help="Upload ids to convert (default: all).")
+
+    def handle(self, *args, **options):
+        target = options['to']
+        records = UploadRecord.objects.filter(complete=True).exclude(storage=target).order_by('id')
+        if options['ids']:
+            records = records.filter(id__in=options['ids'])
+
+        converted = 0
+        for record in records.iterator():
+            # One transaction per upload, so an interrupted run can simply be restarted
+            with transaction.atomic():
+                if convert_record(record, target):
+                    converted += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {converted} upload(s) to '{target}' storage"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import requeue_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued CSV ingestion jobs (e.g. ones left behind by a restarted web worker), "
+        "first requeueing running jobs whose worker stopped responding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling the queue instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls with --loop.")
+        parser.add_argument('--limit', type=int, default=None, help="Run at most this many jobs per poll.")
+
+    def handle(self, *args, **options):
+        while True:
+            recovered = requeue_stale_jobs()
+            if recovered:
+                self.stdout.write(f"Recovered {len(recovered)} stale ingest job(s)")
+            ran = run_pending_jobs(limit=options['limit'])
+            if ran:
+                self.stdout.write(f"Ran {ran} ingest job(s)")
+            if not options['loop']:
+                break
+            if not ran:
+                time.sleep(options['interval'])
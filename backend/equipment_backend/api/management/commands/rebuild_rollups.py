@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import TypeDayRollup, TypeRollup, UploadRecord
+from api.rollups import apply_rollup, compute_rollup
+from api.storage import NUMERIC_FIELDS, load_columns
+
+
+class Command(BaseCommand):
+    help = "Rebuild the fleet rollup tables from the stored uploads, computing missing per-upload rollups first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every upload's rollup, not just missing ones.")
+
+    def handle(self, *args, **options):
+        records = UploadRecord.objects.filter(complete=True).order_by('id')
+        missing = records if options['all'] else records.filter(rollup={}, total_equipment__gt=0)
+
+        computed = 0
+        for record in missing.iterator():
+            columns = load_columns(record)
+            record.rollup = compute_rollup(
+                columns['type'],
+                {field: columns[field] for field in NUMERIC_FIELDS},
+            )
+            record.save(update_fields=['rollup', 'updated_at'])
+            computed += 1
+
+        with transaction.atomic():
+            TypeRollup.objects.all().delete()
+            TypeDayRollup.objects.all().delete()
+            total = 0
+            for rollup, uploaded_at in records.values_list('rollup', 'uploaded_at').iterator():
+                apply_rollup(rollup, uploaded_at)
+                total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Computed {computed} upload rollup(s), rebuilt totals from {total} upload(s)"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.retention import expired_record_ids, trim_history, trim_series
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete uploads outside the history retention policy (HISTORY_RETENTION_COUNT / HISTORY_RETENTION_DAYS) "
+        "and series readings older than SERIES_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None, help="Keep this many most recent uploads (overrides the setting).")
+        parser.add_argument('--days', type=int, default=None, help="Keep uploads from the last N days (overrides the setting).")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            ids = expired_record_ids(keep=options['keep'], days=options['days'])
+            self.stdout.write(f"Would delete {len(ids)} upload(s): {ids}")
+            return
+
+        ids = trim_history(keep=options['keep'], days=options['days'])
+        readings = trim_series()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {len(ids)} upload(s) and {readings} series reading(s)"))
@@ -0,0 +1,90 @@
+"""
+Negotiated response compression for the API.
+
+Brotli is used when the client accepts it and the brotli package is
+installed, gzip otherwise (via Django's GZipMiddleware, which also pads
+the output against BREACH). Only responses of at least
+COMPRESSION_MIN_BYTES are compressed; formats that are compressed already
+(PDF, images, archives, Parquet) are left alone. Streaming responses are
+compressed chunk by chunk, each chunk flushed as it goes, so a large
+export never has to be buffered to be compressed.
+"""
+
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+_encoding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Map each encoding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for item in header.split(','):
+        match = _encoding_re.match(item)
+        if match:
+            try:
+                accepted[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    return accepted
+
+
+def _compress_brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type.startswith(settings.COMPRESSION_EXCLUDED_TYPES):
+            return response
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        use_brotli = (
+            brotli is not None
+            and accepted.get('br', 0) > 0
+            and accepted['br'] >= accepted.get('gzip', 0)
+            and not getattr(response, 'is_async', False)
+        )
+        if not use_brotli:
+            # Vary, streaming, ETag weakening etc. all handled by Django
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = settings.COMPRESSION_BROTLI_QUALITY
+        if response.streaming:
+            response.streaming_content = _compress_brotli_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is no longer byte-identical to what a strong
+        # ETag promised
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
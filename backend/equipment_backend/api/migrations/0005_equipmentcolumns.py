@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_ingestjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentColumns',
+            fields=[
+                ('upload_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='columns', serialize=False, to='api.uploadrecord')),
+                ('row_count', models.IntegerField()),
+                ('names', models.BinaryField()),
+                ('type_labels', models.JSONField()),
+                ('type_codes', models.BinaryField()),
+                ('flowrate', models.BinaryField()),
+                ('pressure', models.BinaryField()),
+                ('temperature', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='storage',
+            field=models.CharField(choices=[('rows', 'One Equipment row per item'), ('columnar', 'Packed EquipmentColumns blob')], default='rows', max_length=10),
+        ),
+    ]
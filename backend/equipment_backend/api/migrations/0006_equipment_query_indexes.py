@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_equipmentcolumns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_record', 'type'], name='equipment_record_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_record', 'flowrate', 'id'], name='equipment_record_flow_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_record', 'pressure', 'id'], name='equipment_record_press_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_record', 'temperature', 'id'], name='equipment_record_temp_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_equipment_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='statistics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_uploadrecord_statistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadrecord',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='uploadrecord_history_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_response_versions'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='equipment_record_type_idx',
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['upload_record', 'type', 'flowrate', 'pressure', 'temperature'], name='equipment_trends_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_equipment_trends_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeRollup',
+            fields=[
+                ('count', models.BigIntegerField(default=0)),
+                ('flowrate_n', models.BigIntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0)),
+                ('flowrate_sumsq', models.FloatField(default=0)),
+                ('pressure_n', models.BigIntegerField(default=0)),
+                ('pressure_sum', models.FloatField(default=0)),
+                ('pressure_sumsq', models.FloatField(default=0)),
+                ('temperature_n', models.BigIntegerField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('temperature_sumsq', models.FloatField(default=0)),
+                ('type', models.CharField(max_length=50, primary_key=True, serialize=False)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='rollup',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='TypeDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.BigIntegerField(default=0)),
+                ('flowrate_n', models.BigIntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0)),
+                ('flowrate_sumsq', models.FloatField(default=0)),
+                ('pressure_n', models.BigIntegerField(default=0)),
+                ('pressure_sum', models.FloatField(default=0)),
+                ('pressure_sumsq', models.FloatField(default=0)),
+                ('temperature_n', models.BigIntegerField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('temperature_sumsq', models.FloatField(default=0)),
+                ('type', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'type'], name='typedayrollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('type', 'day'), name='typedayrollup_type_day_uniq')],
+            },
+        ),
+    ]
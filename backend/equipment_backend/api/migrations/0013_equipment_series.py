@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_fleet_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name_hash', models.BigIntegerField()),
+                ('upload_id', models.IntegerField(db_index=True)),
+                ('uploaded_at', models.DateTimeField(db_index=True)),
+                ('type', models.CharField(blank=True, max_length=50)),
+                ('flowrate', models.FloatField(null=True)),
+                ('pressure', models.FloatField(null=True)),
+                ('temperature', models.FloatField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name_hash', 'uploaded_at'], name='series_name_time_idx')],
+            },
+        ),
+    ]
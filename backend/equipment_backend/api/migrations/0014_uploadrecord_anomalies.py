@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_equipment_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadrecord',
+            name='anomalies',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
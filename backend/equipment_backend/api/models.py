@@ -9,12 +9,46 @@ from django.db import models
 # Django writes SQL for you.
 
 class UploadRecord(models.Model):
+    STORAGE_ROWS = 'rows'
+    STORAGE_COLUMNAR = 'columnar'
+    STORAGE_CHOICES = [
+        (STORAGE_ROWS, 'One Equipment row per item'),
+        (STORAGE_COLUMNAR, 'Packed EquipmentColumns blob'),
+    ]
+
     uploaded_at = models.DateTimeField(auto_now_add=True)
     total_equipment = models.IntegerField()
     average_flowrate = models.FloatField()
     average_pressure = models.FloatField()
     average_temperature = models.FloatField()
     equipment_type_distribution = models.JSONField()
+    # min/max/std/percentiles overall and per type, see api/statistics.py
+    statistics = models.JSONField(default=dict, blank=True)
+    # Where this upload's equipment list lives, see api/storage.py
+    storage = models.CharField(max_length=10, choices=STORAGE_CHOICES, default=STORAGE_ROWS)
+    # SHA-256 of the uploaded file, used to recognise repeated uploads. Only
+    # set once ingestion has completed, so a half-written upload never
+    # matches a re-upload or holds the digest
+    content_sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Last change to anything served by /api/summary/<id>/, drives its ETag
+    updated_at = models.DateTimeField(auto_now=True)
+    # This upload's share of the fleet rollups, so it can be taken out again
+    # when the upload is trimmed (see api/rollups.py)
+    rollup = models.JSONField(default=dict, blank=True)
+    # Rows flagged as z-score outliers or out of limits, see api/anomalies.py
+    anomalies = models.JSONField(default=dict, blank=True)
+    # Rows dropped by validation and why, see api/validation.py
+    validation = models.JSONField(default=dict, blank=True)
+    # False while a chunked ingest is still writing this upload. Incomplete
+    # uploads are left out of every listing and lookup; the placeholder of
+    # a job whose worker died is deleted when the job is requeued (api/jobs.py)
+    complete = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of /api/history/ and the retention trim
+            models.Index(fields=['-uploaded_at', '-id'], name='uploadrecord_history_idx'),
+        ]
 
     def __str__(self):
         return f"Upload at {self.uploaded_at}"
@@ -27,5 +61,174 @@ class Equipment(models.Model):
     pressure = models.FloatField()
     temperature = models.FloatField()
 
+    class Meta:
+        # Back the filters, sorts and keyset pages of /api/summary/<id>/
+        indexes = [
+            # Also covers the GROUP BY of /api/trends/ (api/trends.py), which
+            # reads every column it needs straight from this index
+            models.Index(
+                fields=['upload_record', 'type', 'flowrate', 'pressure', 'temperature'],
+                name='equipment_trends_idx',
+            ),
+            models.Index(fields=['upload_record', 'flowrate', 'id'], name='equipment_record_flow_idx'),
+            models.Index(fields=['upload_record', 'pressure', 'id'], name='equipment_record_press_idx'),
+            models.Index(fields=['upload_record', 'temperature', 'id'], name='equipment_record_temp_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.type})"
+
+
+class EquipmentColumns(models.Model):
+    """
+    Compact alternative to Equipment rows: the whole equipment list of one
+    upload stored column-wise in a single row.
+
+    Numeric columns are packed little-endian float64 arrays, types are
+    int32 codes into ``type_labels`` and names are one UTF-8 blob
+    separated by NUL bytes.
+    """
+    upload_record = models.OneToOneField(UploadRecord, primary_key=True, related_name='columns', on_delete=models.CASCADE)
+    row_count = models.IntegerField()
+    names = models.BinaryField()
+    type_labels = models.JSONField()
+    type_codes = models.BinaryField()
+    flowrate = models.BinaryField()
+    pressure = models.BinaryField()
+    temperature = models.BinaryField()
+
+    def __str__(self):
+        return f"Columns for upload {self.upload_record_id} ({self.row_count} rows)"
+
+
+class IngestJob(models.Model):
+    """
+    A queued CSV upload waiting to be ingested by a background worker.
+    The table itself is the queue: workers claim a job by flipping its
+    status from queued to running with a conditional UPDATE, and hold it
+    for as long as they keep its heartbeat fresh.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    file = models.FileField(upload_to='ingest_jobs/')
+    file_size = models.BigIntegerField(default=0)
+    content_sha256 = models.CharField(max_length=64, blank=True, default='')
+    # ?force=true: take the digest over from an earlier upload on completion
+    force = models.BooleanField(default=False)
+    # 'drop' or 'reject', see api/validation.py; empty means INVALID_ROWS_MODE
+    invalid_rows = models.CharField(max_length=10, blank=True, default='')
+    rows_processed = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    # Validation report of an upload refused with ?invalid_rows=reject, see
+    # api/validation.py; the report of an accepted upload is on its record
+    validation = models.JSONField(default=dict, blank=True)
+    # Times the job has been claimed; a job that keeps killing its worker
+    # fails after INGEST_JOB_MAX_ATTEMPTS
+    attempts = models.IntegerField(default=0)
+    # Refreshed by the worker after every chunk. A running job whose
+    # heartbeat is older than INGEST_JOB_LEASE_SECONDS has lost its worker
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    upload_record = models.ForeignKey(UploadRecord, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Ingest job {self.id} ({self.status})"
+
+
+class ChangeCounter(models.Model):
+    """
+    A named counter bumped whenever some collection changes, so responses
+    built from it can be revalidated by comparing a single number
+    (see api/http_cache.py).
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.value}"
+
+
+class RollupTotals(models.Model):
+    """
+    Running row count, and per numeric column the non-null count, sum and
+    sum of squares, from which means and variances follow in O(1).
+    """
+    count = models.BigIntegerField(default=0)
+    flowrate_n = models.BigIntegerField(default=0)
+    flowrate_sum = models.FloatField(default=0)
+    flowrate_sumsq = models.FloatField(default=0)
+    pressure_n = models.BigIntegerField(default=0)
+    pressure_sum = models.FloatField(default=0)
+    pressure_sumsq = models.FloatField(default=0)
+    temperature_n = models.BigIntegerField(default=0)
+    temperature_sum = models.FloatField(default=0)
+    temperature_sumsq = models.FloatField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class TypeRollup(RollupTotals):
+    """Totals per equipment type over every stored upload."""
+    type = models.CharField(max_length=50, primary_key=True)
+
+    def __str__(self):
+        return f"{self.type} ({self.count})"
+
+
+class TypeDayRollup(RollupTotals):
+    """Totals per equipment type and upload day."""
+    type = models.CharField(max_length=50)
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['type', 'day'], name='typedayrollup_type_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'type'], name='typedayrollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} on {self.day} ({self.count})"
+
+
+class SeriesReading(models.Model):
+    """
+    One reading of the per-asset time series read by api/series.py: an
+    item of an upload, keyed by the 64-bit hash of its name (see
+    api/storage.py name_hashes(), stored as a signed integer). An asset's
+    history is one range scan of series_name_time_idx, whatever the size
+    of the fleet.
+
+    Readings refer to their upload by plain id, so trimming the upload
+    history leaves the series alone; SERIES_RETENTION_DAYS trims it instead.
+    """
+    name_hash = models.BigIntegerField()
+    upload_id = models.IntegerField(db_index=True)
+    uploaded_at = models.DateTimeField(db_index=True)
+    type = models.CharField(max_length=50, blank=True)
+    flowrate = models.FloatField(null=True)
+    pressure = models.FloatField(null=True)
+    temperature = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name_hash', 'uploaded_at'], name='series_name_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reading {self.name_hash:x} of upload {self.upload_id}"
@@ -5,12 +5,37 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
 from datetime import datetime
 
+# matplotlib is imported on first chart render (see _chart_figure) and this
+# module itself only when a report is requested, so web workers and
+# manage.py commands don't pay for either at startup.
 
-def generate_pdf(summary, equipment_list=None):
+logger = logging.getLogger(__name__)
+
+
+EQUIPMENT_HEADER = ['Name', 'Type', 'Flowrate (L/min)', 'Pressure (bar)', 'Temp (°C)']
+EQUIPMENT_COL_WIDTHS = [1.5*inch, 1.2*inch, 1.3*inch, 1.3*inch, 1.2*inch]
+
+# Above this many rows the detail list switches to the high-volume layout
+HIGH_VOLUME_THRESHOLD = 500
+# Rows per detail table in high-volume mode, about one letter page
+HIGH_VOLUME_ROWS_PER_TABLE = 45
+HIGH_VOLUME_ROW_HEIGHT = 14
+
+
+def generate_pdf(summary, equipment_list=None, high_volume=None):
+    """
+    Build the PDF report and return it in a BytesIO.
+
+    ``high_volume`` picks the detail table layout: None decides from the
+    number of rows, True/False force one layout.
+    """
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.4*inch, bottomMargin=0.4*inch,
                            leftMargin=0.7*inch, rightMargin=0.7*inch)
@@ -121,40 +146,41 @@ def generate_pdf(summary, equipment_list=None):
         ]))
         story.append(dist_table)
     
+    # Extended statistics, precomputed at upload time
+    statistics = summary.get('statistics') or {}
+    if statistics.get('overall'):
+        story.append(Spacer(1, 0.12*inch))
+        story.append(Paragraph("DETAILED STATISTICS", heading_style))
+        story.append(Spacer(1, 0.08*inch))
+        story.append(_statistics_table(statistics))
+        if statistics.get('estimated'):
+            story.append(Paragraph(
+                f"Percentiles estimated from a sample of {statistics['sample_size']:,} rows per equipment type.",
+                date_style,
+            ))
+    
+    # Anomalies flagged at upload time, see api/anomalies.py
+    anomalies = summary.get('anomalies') or {}
+    if anomalies.get('count'):
+        story.append(Spacer(1, 0.12*inch))
+        story.append(Paragraph("ANOMALIES", heading_style))
+        story.append(Spacer(1, 0.08*inch))
+        story.append(Paragraph(_anomaly_overview(anomalies), styles['Normal']))
+        story.append(Spacer(1, 0.08*inch))
+        story.append(_anomaly_table(anomalies))
+
     # Equipment Details Section (if provided)
     if equipment_list and len(equipment_list) > 0:
         story.append(PageBreak())
         story.append(Paragraph("DETAILED EQUIPMENT LIST", heading_style))
         story.append(Spacer(1, 0.08*inch))
         
-        # Build equipment details table
-        eq_data = [['Name', 'Type', 'Flowrate (L/min)', 'Pressure (bar)', 'Temp (°C)']]
-        for eq in equipment_list:
-            eq_data.append([
-                eq.get('name', 'N/A'),
-                eq.get('type', 'N/A'),
-                f"{eq.get('flowrate', 0):.2f}",
-                f"{eq.get('pressure', 0):.2f}",
-                f"{eq.get('temperature', 0):.2f}",
-            ])
-        
-        eq_table = Table(eq_data, colWidths=[1.5*inch, 1.2*inch, 1.3*inch, 1.3*inch, 1.2*inch])
-        eq_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        story.append(eq_table)
+        if high_volume is None:
+            high_volume = len(equipment_list) > HIGH_VOLUME_THRESHOLD
+        if high_volume:
+            story.extend(_equipment_tables_high_volume(equipment_list))
+        else:
+            story.append(_equipment_table(equipment_list))
     
     # Add Notes Section at the bottom
     story.append(Spacer(1, 0.2*inch))
@@ -182,10 +208,256 @@ def generate_pdf(summary, equipment_list=None):
     return buffer
 
 
+def _equipment_table(equipment_list):
+    """Detail list as one table with a full grid, fine for small uploads"""
+    eq_data = [EQUIPMENT_HEADER]
+    for eq in equipment_list:
+        eq_data.append([
+            eq.get('name', 'N/A'),
+            eq.get('type', 'N/A'),
+            f"{eq.get('flowrate', 0):.2f}",
+            f"{eq.get('pressure', 0):.2f}",
+            f"{eq.get('temperature', 0):.2f}",
+        ])
+    
+    eq_table = Table(eq_data, colWidths=EQUIPMENT_COL_WIDTHS)
+    eq_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ]))
+    return eq_table
+
+
+# One style shared by every chunk: no per-cell grid, just a box, a rule under
+# the header and banded rows
+HIGH_VOLUME_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a5490')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ('BOX', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+])
+
+
+def _equipment_tables_high_volume(equipment_list):
+    """
+    Detail list for large uploads: page-sized tables with fixed column
+    widths and row heights, so ReportLab never has to measure cells or
+    split one huge table across thousands of pages.
+    """
+    tables = []
+    for start in range(0, len(equipment_list), HIGH_VOLUME_ROWS_PER_TABLE):
+        chunk = equipment_list[start:start + HIGH_VOLUME_ROWS_PER_TABLE]
+        eq_data = [EQUIPMENT_HEADER]
+        eq_data.extend(
+            [
+                str(eq.get('name', 'N/A')),
+                str(eq.get('type', 'N/A')),
+                f"{eq.get('flowrate', 0):.2f}",
+                f"{eq.get('pressure', 0):.2f}",
+                f"{eq.get('temperature', 0):.2f}",
+            ]
+            for eq in chunk
+        )
+        table = Table(
+            eq_data,
+            colWidths=EQUIPMENT_COL_WIDTHS,
+            rowHeights=[HIGH_VOLUME_ROW_HEIGHT] * len(eq_data),
+        )
+        table.setStyle(HIGH_VOLUME_STYLE)
+        tables.append(table)
+    return tables
+
+
+STAT_METRICS = [
+    ('flowrate', 'Flowrate (L/min)'),
+    ('pressure', 'Pressure (bar)'),
+    ('temperature', 'Temp (°C)'),
+]
+STAT_COLUMNS = ['min', 'max', 'std', 'p50', 'p95', 'p99']
+
+
+def _format_stat(value):
+    return 'N/A' if value is None else f"{value:.2f}"
+
+
+def _statistics_table(statistics):
+    """Min/max/std/percentiles overall and per equipment type"""
+    stat_data = [['Type', 'Metric', 'Min', 'Max', 'Std', 'P50', 'P95', 'P99']]
+    groups = [('All', statistics['overall'])]
+    groups += sorted(statistics.get('by_type', {}).items())
+    for group_name, group in groups:
+        for field, label in STAT_METRICS:
+            stats = group.get(field)
+            if not stats:
+                continue
+            stat_data.append([str(group_name), label] + [_format_stat(stats.get(col)) for col in STAT_COLUMNS])
+
+    stat_table = Table(stat_data, colWidths=[1.1*inch, 1.3*inch] + [0.78*inch] * len(STAT_COLUMNS), repeatRows=1)
+    stat_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    return stat_table
+
+
+# Flagged rows listed in the report; the rest are only counted
+ANOMALY_REPORT_ROWS = 200
+
+ANOMALY_REASONS = {
+    'zscore': 'Outlier for its type',
+    'below_min': 'Below limit',
+    'above_max': 'Above limit',
+}
+
+
+def _anomaly_overview(anomalies):
+    counts = ', '.join(
+        f"{field_reason.replace('_', ' ')}: {count}"
+        for field_reason, count in sorted(anomalies.get('by_reason', {}).items())
+    )
+    return f"{anomalies['count']} row(s) flagged ({counts})."
+
+
+def _describe_reason(reason):
+    text = ANOMALY_REASONS.get(reason['reason'], reason['reason'])
+    if 'zscore' in reason:
+        return f"{text} (z = {reason['zscore']:.2f})"
+    if 'limit' in reason:
+        return f"{text} {reason['limit']:g}"
+    return text
+
+
+def _anomaly_table(anomalies):
+    """One line per flagged value: file row, equipment, column, value and reason"""
+    field_labels = dict(STAT_METRICS)
+    anomaly_data = [['Row', 'Name', 'Type', 'Metric', 'Value', 'Reason']]
+    listed = 0
+    for flagged in anomalies.get('rows', []):
+        if listed >= ANOMALY_REPORT_ROWS:
+            break
+        listed += 1
+        for reason in flagged['reasons']:
+            anomaly_data.append([
+                str(flagged['row']),
+                str(flagged.get('name') or ''),
+                str(flagged.get('type') or ''),
+                field_labels.get(reason['field'], reason['field']),
+                _format_stat(reason.get('value')),
+                _describe_reason(reason),
+            ])
+
+    if anomalies['count'] > listed:
+        anomaly_data.append(['', f"... and {anomalies['count'] - listed} more flagged row(s)", '', '', '', ''])
+
+    anomaly_table = Table(
+        anomaly_data,
+        colWidths=[0.6*inch, 1.4*inch, 1.0*inch, 1.2*inch, 0.9*inch, 1.9*inch],
+        repeatRows=1,
+    )
+    anomaly_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#b03a2e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fdf2f0')]),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    return anomaly_table
+
+
+# Rendered pie charts by content hash of the distribution, most recent last
+CHART_CACHE_SIZE = 64
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+# Each thread reuses one Agg figure instead of setting up a new one per chart.
+# Nothing here goes through pyplot, whose global state isn't thread-safe.
+_chart_local = threading.local()
+
+
+def preload_report_stack():
+    """Import everything report generation needs, e.g. in the gunicorn master before forking."""
+    from matplotlib.figure import Figure  # noqa: F401
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: F401
+
+
+def _chart_figure():
+    fig = getattr(_chart_local, 'figure', None)
+    if fig is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=(6, 4), facecolor='white')
+        FigureCanvasAgg(fig)
+        _chart_local.figure = fig
+    fig.clear()
+    return fig
+
+
+def _chart_key(equipment_dist):
+    # Wedge order follows the dict order, so it is part of the key
+    payload = json.dumps([[str(k), v] for k, v in equipment_dist.items()])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
 def _create_equipment_distribution_chart(equipment_dist):
     """Create a pie chart for equipment distribution"""
+    key = _chart_key(equipment_dist)
+    with _chart_cache_lock:
+        png = _chart_cache.get(key)
+        if png is not None:
+            _chart_cache.move_to_end(key)
+    
+    if png is None:
+        png = _render_distribution_chart(equipment_dist)
+        if png is None:
+            return None
+        with _chart_cache_lock:
+            _chart_cache[key] = png
+            while len(_chart_cache) > CHART_CACHE_SIZE:
+                _chart_cache.popitem(last=False)
+    
+    return BytesIO(png)
+
+
+def _render_distribution_chart(equipment_dist):
     try:
-        fig, ax = plt.subplots(figsize=(6, 4), facecolor='white')
+        fig = _chart_figure()
+        ax = fig.add_subplot(111)
         
         labels = list(equipment_dist.keys())
         sizes = list(equipment_dist.values())
@@ -208,13 +480,13 @@ def _create_equipment_distribution_chart(equipment_dist):
         
         # Save to buffer
         chart_buffer = BytesIO()
-        plt.tight_layout()
-        plt.savefig(chart_buffer, format='png', dpi=150, bbox_inches='tight', facecolor='white')
-        chart_buffer.seek(0)
-        plt.close(fig)
+        fig.tight_layout()
+        fig.savefig(chart_buffer, format='png', dpi=150, bbox_inches='tight', facecolor='white')
+        fig.clear()
         
-        return chart_buffer
-    except Exception as e:
-        print(f"Error creating chart: {e}")
-        plt.close('all')
+        return chart_buffer.getvalue()
+    except Exception:
+        logger.exception("Error creating chart")
+        # Throw away this thread's figure in case it was left half drawn
+        _chart_local.figure = None
         return None
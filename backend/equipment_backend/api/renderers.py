@@ -0,0 +1,187 @@
+"""
+Column-wise binary renderers for responses that carry an equipment table
+(/api/upload/ and /api/summary/<id>/), picked with the Accept header.
+
+application/vnd.equipment.columns -- packed arrays, no dependencies:
+
+    bytes 0-7     magic b'EQCOLS\\x00\\x01'
+    bytes 8-11    uint32 little-endian: header length H
+    H bytes       UTF-8 JSON header, space padded so the arrays after it
+                  start at a multiple of 8 bytes
+    flowrate      rows x float64 little-endian
+    pressure      rows x float64 little-endian
+    temperature   rows x float64 little-endian
+    type          rows x int32 little-endian, index into type_labels
+    name          UTF-8 names separated by NUL bytes
+
+    The header is the usual JSON response without "equipment", plus
+    "columns": {"rows": n, "type_labels": [...], "layout": [[column,
+    dtype, byte length], ...]} listing the arrays above in order
+    ("columns" is null when the response has no equipment table).
+
+application/vnd.apache.arrow.stream -- one Arrow IPC record batch with
+    name (string), type (dictionary) and the three float64 columns; the
+    JSON header above (without "columns") is in the schema metadata under
+    b'summary'. Only offered when pyarrow is installed.
+
+Responses without an equipment table, or error responses, still render,
+errors falling back to plain JSON.
+"""
+
+import importlib.util
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .storage import CODE_DTYPE, EQUIPMENT_FIELDS, FLOAT_DTYPE, NAME_SEPARATOR, NUMERIC_FIELDS, TypeEncoder
+
+PACKED_MAGIC = b'EQCOLS\x00\x01'
+PACKED_ALIGNMENT = 8
+
+
+def equipment_as_columns(equipment):
+    """Accept the equipment table as a dict of columns or a list of row dicts."""
+    if isinstance(equipment, dict):
+        return equipment
+    return {field: [row[field] for row in equipment] for field in EQUIPMENT_FIELDS}
+
+
+def _split(data):
+    header = {key: value for key, value in data.items() if key != 'equipment'}
+    equipment = data.get('equipment')
+    return header, None if equipment is None else equipment_as_columns(equipment)
+
+
+def _is_error(data):
+    return not isinstance(data, dict) or 'error' in data or 'detail' in data
+
+
+class _ColumnarRenderer(BaseRenderer):
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _is_error(data):
+            response = (renderer_context or {}).get('response')
+            if response is not None:
+                response['Content-Type'] = 'application/json'
+            return JSONRenderer().render(data)
+        header, columns = _split(data)
+        return self.render_columns(header, columns)
+
+
+class PackedColumnsRenderer(_ColumnarRenderer):
+    media_type = 'application/vnd.equipment.columns'
+    format = 'columns'
+
+    def render_columns(self, header, columns):
+        buffers = []
+        if columns is not None:
+            encoder = TypeEncoder()
+            codes = encoder.encode(columns['type'])
+            for field in NUMERIC_FIELDS:
+                buffers.append((field, FLOAT_DTYPE.str, np.asarray(columns[field], dtype=FLOAT_DTYPE).tobytes()))
+            buffers.append(('type', CODE_DTYPE.str, codes.astype(CODE_DTYPE).tobytes()))
+            names = NAME_SEPARATOR.join(
+                str(name).replace(NAME_SEPARATOR, '') for name in columns['name']
+            )
+            buffers.append(('name', 'utf-8', names.encode('utf-8')))
+            header['columns'] = {
+                "rows": len(codes),
+                "type_labels": encoder.labels,
+                "layout": [[column, dtype, len(raw)] for column, dtype, raw in buffers],
+            }
+        else:
+            header['columns'] = None
+
+        header_bytes = json.dumps(header, cls=JSONEncoder, separators=(',', ':')).encode('utf-8')
+        prefix = len(PACKED_MAGIC) + 4
+        padding = -(prefix + len(header_bytes)) % PACKED_ALIGNMENT
+        header_bytes += b' ' * padding
+
+        return b''.join(
+            [PACKED_MAGIC, struct.pack('<I', len(header_bytes)), header_bytes]
+            + [raw for _, _, raw in buffers]
+        )
+
+
+class ArrowStreamRenderer(_ColumnarRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+    def render_columns(self, header, columns):
+        import pyarrow as pa
+
+        if columns is None:
+            columns = {field: [] for field in EQUIPMENT_FIELDS}
+        encoder = TypeEncoder()
+        codes = encoder.encode(columns['type'])
+        arrays = [
+            pa.array(columns['name'], type=pa.string()),
+            pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), pa.array(encoder.labels, type=pa.string())),
+        ] + [pa.array(np.asarray(columns[field], dtype=FLOAT_DTYPE)) for field in NUMERIC_FIELDS]
+
+        metadata = {b'summary': json.dumps(header, cls=JSONEncoder).encode('utf-8')}
+        batch = pa.RecordBatch.from_arrays(arrays, names=list(EQUIPMENT_FIELDS))
+        batch = batch.replace_schema_metadata(metadata)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Formats of /api/export/<id>/. The view streams the body itself, so these
+    only name the format for content negotiation (?format= or Accept) and
+    render error responses, as JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data)
+
+
+class CSVExportRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class ParquetExportRenderer(_ExportRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+
+# CSV first: it is what a client that doesn't ask for anything gets
+EXPORT_RENDERERS = [CSVExportRenderer, NDJSONExportRenderer, ParquetExportRenderer]
+
+
+def arrow_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+COLUMNAR_FORMATS = (PackedColumnsRenderer.format, ArrowStreamRenderer.format)
+
+
+def wants_columns(request):
+    """True when content negotiation picked one of the column-wise formats."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', None) in COLUMNAR_FORMATS
+
+
+# JSON stays first so clients that send no Accept header get what they always did
+EQUIPMENT_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + [PackedColumnsRenderer]
+if arrow_available():
+    EQUIPMENT_RENDERERS.append(ArrowStreamRenderer)
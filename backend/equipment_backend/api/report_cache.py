@@ -0,0 +1,59 @@
+"""
+Cache of generated PDF reports, keyed by UploadRecord id and version.
+
+A report is built once per version of a record: the cache key and the
+ETag both carry the record's updated_at, so a record that is re-ingested
+or backfilled gets a new report and clients revalidating with
+If-None-Match see the change. Callers always look the record up first;
+the cache is never taken as proof that a record exists.
+
+The bytes live in the 'reports' cache (locmem by default, which evicts
+least recently used entries once REPORT_CACHE_MAX_ENTRIES is reached;
+set REPORT_CACHE_DIR for a filesystem cache shared by all workers).
+Entries expire after REPORT_CACHE_TTL seconds, and this process drops
+its own copy as soon as a record is deleted.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import UploadRecord
+from .response_cache import record_lookup
+
+# Bump whenever generate_pdf output changes, so clients don't keep stale copies
+REPORT_LAYOUT_VERSION = 5
+
+
+def _cache():
+    return caches[settings.REPORT_CACHE_ALIAS]
+
+
+def _stamp(record):
+    return int(record.updated_at.timestamp() * 1_000_000)
+
+
+def _key(record):
+    return f"report:{record.id}:{_stamp(record)}:v{REPORT_LAYOUT_VERSION}"
+
+
+def report_etag(record):
+    return f'W/"report-{record.id}-{_stamp(record)}-v{REPORT_LAYOUT_VERSION}"'
+
+
+def get_report(record):
+    pdf_bytes = _cache().get(_key(record))
+    record_lookup('report', pdf_bytes is not None)
+    return pdf_bytes
+
+
+def store_report(record, pdf_bytes):
+    # Very large reports would push everything else out of the cache
+    if len(pdf_bytes) <= settings.REPORT_CACHE_MAX_ITEM_BYTES:
+        _cache().set(_key(record), pdf_bytes, timeout=settings.REPORT_CACHE_TTL)
+
+
+@receiver(post_delete, sender=UploadRecord, dispatch_uid='api.report_cache.invalidate')
+def _invalidate_on_delete(sender, instance, **kwargs):
+    _cache().delete(_key(instance))
@@ -0,0 +1,95 @@
+"""
+Server-side cache of the read endpoints' response data.
+
+Summaries are cached per UploadRecord id and query string, history pages
+and trends per query string. An entry keeps the response data together
+with its ETag and Last-Modified, so a hit answers both a normal GET and a
+conditional one without rebuilding the data.
+
+Keys are built from database state, so they can never point at stale
+data in any worker: a summary key carries its record's updated_at, a
+history or trends key the history version counter (api/http_cache.py),
+which moves on after every committed upload, edit or retention delete.
+Both cost one indexed lookup per request, which the caller needs anyway
+for the ETag, and save loading and serialising the data itself.
+
+The data lives in the 'responses' cache: locmem by default, or a
+FileBasedCache shared by all workers when RESPONSE_CACHE_DIR is set.
+Either way an entry is only reachable while it is current; the backend
+only decides how many workers share a copy. RESPONSE_CACHE_TTLS sets the
+lifetime per endpoint, 0 turning caching off for it;
+RESPONSE_CACHE_MAX_ITEM_BYTES keeps very large equipment lists out.
+
+Hits and misses are counted per endpoint and process, see cache_stats().
+"""
+
+import pickle
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def record_lookup(endpoint, hit):
+    """Count a cache hit or miss for ``endpoint``."""
+    with _stats_lock:
+        _stats[(endpoint, 'hits' if hit else 'misses')] += 1
+
+
+def cache_stats():
+    """Hit/miss counters of this process, per endpoint."""
+    with _stats_lock:
+        counts = dict(_stats)
+    endpoints = sorted({endpoint for endpoint, _ in counts})
+    stats = {}
+    for endpoint in endpoints:
+        hits = counts.get((endpoint, 'hits'), 0)
+        misses = counts.get((endpoint, 'misses'), 0)
+        stats[endpoint] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def summary_key(record, query_digest):
+    stamp = int(record.updated_at.timestamp() * 1_000_000)
+    return f"summary:{record.id}:{stamp}:{query_digest}"
+
+
+def history_key(version, query_digest, resource='history'):
+    return f"{resource}:{version}:{query_digest}"
+
+
+def get(endpoint, key):
+    """Return the cached entry for ``key``, or None. Counts the lookup."""
+    if not settings.RESPONSE_CACHE_TTLS.get(endpoint):
+        return None
+    payload = _cache().get(key)
+    record_lookup(endpoint, payload is not None)
+    return None if payload is None else pickle.loads(payload)
+
+
+def store(endpoint, key, entry):
+    ttl = settings.RESPONSE_CACHE_TTLS.get(endpoint)
+    if not ttl:
+        return
+    # Pickle once here, so the size limit is checked on what is actually stored
+    payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(payload) <= settings.RESPONSE_CACHE_MAX_ITEM_BYTES:
+        _cache().set(key, payload, timeout=ttl)
+
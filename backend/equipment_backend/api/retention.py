@@ -0,0 +1,86 @@
+"""
+History retention: how many uploads (or how many days of uploads) to keep.
+
+trim_history() works out every expired UploadRecord in one query and
+removes them with bulk DELETEs in a single transaction, a few statements
+per batch of records however many equipment rows they hold, subtracting
+their share of the fleet rollups (api/rollups.py) on the way. Running it
+twice, or from two uploads at once, is harmless.
+
+The per-asset series (api/series.py) outlives the uploads it was written
+from and has its own limit, SERIES_RETENTION_DAYS, applied by
+trim_series() at the same times.
+
+It runs after each upload unless HISTORY_TRIM_ON_UPLOAD is off, in which
+case schedule `manage.py trim_history` instead.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SeriesReading, UploadRecord
+from .rollups import apply_rollup
+
+DELETE_BATCH_SIZE = 500
+
+
+def expired_record_ids(keep=None, days=None, now=None):
+    """Ids of uploads outside the retention policy (settings are used for missing arguments)."""
+    if keep is None:
+        keep = settings.HISTORY_RETENTION_COUNT
+    if days is None:
+        days = settings.HISTORY_RETENTION_DAYS
+
+    # Uploads still being ingested are neither counted nor trimmed; the
+    # placeholders of dead ingests are cleaned up by requeue_stale_jobs()
+    completed = UploadRecord.objects.filter(complete=True)
+    expired = set()
+    if keep:
+        newest_first = completed.order_by('-uploaded_at', '-id')
+        expired.update(newest_first.values_list('id', flat=True)[keep:])
+    if days:
+        cutoff = (now or timezone.now()) - timedelta(days=days)
+        expired.update(completed.filter(uploaded_at__lt=cutoff).values_list('id', flat=True))
+    return sorted(expired)
+
+
+def trim_history(keep=None, days=None, now=None):
+    """Delete every upload outside the retention policy. Returns the deleted ids."""
+    with transaction.atomic():
+        ids = expired_record_ids(keep=keep, days=days, now=now)
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[start:start + DELETE_BATCH_SIZE]
+            # Take the uploads out of the fleet rollups first. The rows are
+            # locked, so a concurrent trim waits and then finds them gone
+            # instead of subtracting them a second time.
+            expiring = UploadRecord.objects.select_for_update().filter(id__in=batch)
+            for rollup, uploaded_at in expiring.values_list('rollup', 'uploaded_at'):
+                apply_rollup(rollup, uploaded_at, sign=-1)
+            # Equipment and EquipmentColumns have no signals or cascades
+            # of their own, so the collector removes
+            # them with one DELETE ... WHERE upload_record_id IN (...) each
+            # rather than loading them. Only the record ids and versions are
+            # fetched, for the post_delete hook that evicts cached reports.
+            UploadRecord.objects.filter(id__in=batch).only('id', 'updated_at').delete()
+    return ids
+
+
+def trim_series(days=None, now=None):
+    """Delete series readings older than SERIES_RETENTION_DAYS. Returns how many."""
+    if days is None:
+        days = settings.SERIES_RETENTION_DAYS
+    if not days:
+        return 0
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    deleted, _ = SeriesReading.objects.filter(uploaded_at__lt=cutoff).delete()
+    return deleted
+
+
+def trim_after_upload():
+    if settings.HISTORY_TRIM_ON_UPLOAD:
+        trim_series()
+        return trim_history()
+    return []
@@ -0,0 +1,167 @@
+"""
+Fleet-wide rollups: running totals per equipment type (TypeRollup) and per
+type and upload day (TypeDayRollup), across every stored upload.
+
+Each upload's contribution (per type: row count, and per numeric column
+the non-null count, sum and sum of squares) is computed once at ingestion
+and kept on UploadRecord.rollup. It is added to both tables in the same
+transaction that stores the upload, and subtracted again by the retention
+trim, so /api/fleet/ reads one row per type (or per type and day) instead
+of scanning Equipment.
+
+Updates are UPDATE ... SET col = col + delta statements, so concurrent
+uploads never overwrite each other's totals. `manage.py rebuild_rollups`
+recomputes everything from the stored uploads.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import TypeDayRollup, TypeRollup
+from .storage import NUMERIC_FIELDS
+
+TOTAL_COLUMNS = ('count',) + tuple(
+    f'{field}_{part}' for field in NUMERIC_FIELDS for part in ('n', 'sum', 'sumsq')
+)
+
+
+def compute_rollup(types, values):
+    """
+    Per-type totals of one upload, as {type: {column: value}} with the
+    TOTAL_COLUMNS names. ``types`` and ``values`` are as for
+    compute_statistics().
+    """
+    frame = pd.DataFrame({field: np.asarray(values[field], dtype='float64') for field in NUMERIC_FIELDS})
+    if frame.empty:
+        return {}
+    if not isinstance(types, pd.Categorical):
+        types = pd.Categorical(types)
+    squares = frame ** 2
+    grouped = frame.groupby(types, observed=True)
+    sizes = grouped.size()
+    counts = grouped.count()
+    sums = grouped.sum()
+    sumsqs = squares.groupby(types, observed=True).sum()
+
+    rollup = {}
+    for eq_type in sizes.index:
+        totals = {'count': int(sizes[eq_type])}
+        for field in NUMERIC_FIELDS:
+            totals[f'{field}_n'] = int(counts.at[eq_type, field])
+            totals[f'{field}_sum'] = float(sums.at[eq_type, field])
+            totals[f'{field}_sumsq'] = float(sumsqs.at[eq_type, field])
+        rollup[str(eq_type)] = totals
+    return rollup
+
+
+def apply_rollup(rollup, uploaded_at, sign=1):
+    """Add (sign=1) or subtract (sign=-1) one upload's contribution."""
+    day = timezone.localdate(uploaded_at)
+    for eq_type, totals in rollup.items():
+        deltas = {column: sign * totals.get(column, 0) for column in TOTAL_COLUMNS}
+        _add(TypeRollup, {'type': eq_type}, deltas)
+        _add(TypeDayRollup, {'type': eq_type, 'day': day}, deltas)
+
+
+def _add(model, keys, deltas):
+    updates = {column: F(column) + delta for column, delta in deltas.items()}
+    if model.objects.filter(**keys).update(**updates):
+        return
+    try:
+        # Savepoint, so losing the race to create the row doesn't break
+        # the surrounding upload transaction
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        model.objects.filter(**keys).update(**updates)
+
+
+def _moments(n, total, sumsq):
+    if not n:
+        return {"count": 0, "mean": None, "variance": None, "std": None}
+    mean = total / n
+    if n > 1:
+        # Sample variance, like the per-upload statistics; clamp rounding noise
+        variance = max((sumsq - total * total / n) / (n - 1), 0.0)
+    else:
+        variance = None
+    return {
+        "count": n,
+        "mean": mean,
+        "variance": variance,
+        "std": None if variance is None else math.sqrt(variance),
+    }
+
+
+def fleet_summary(rows):
+    """
+    Turn rollup rows (model instances or dicts of TOTAL_COLUMNS) into
+    {"overall": {...}, "by_type": {type: {...}}} with count, and per numeric
+    column count/mean/variance/std.
+    """
+    def describe(totals):
+        return {
+            "count": totals['count'],
+            **{
+                field: _moments(totals[f'{field}_n'], totals[f'{field}_sum'], totals[f'{field}_sumsq'])
+                for field in NUMERIC_FIELDS
+            },
+        }
+
+    overall = dict.fromkeys(TOTAL_COLUMNS, 0)
+    by_type = {}
+    for row in rows:
+        totals = {column: _get(row, column) for column in TOTAL_COLUMNS}
+        if not totals['count']:
+            continue
+        by_type[_get(row, 'type')] = describe(totals)
+        for column in TOTAL_COLUMNS:
+            overall[column] += totals[column]
+    return {"overall": describe(overall), "by_type": by_type}
+
+
+def query_fleet(query, by_day=False):
+    """
+    Fleet statistics for a trends-style query (see parse_trends_query()).
+
+    Without a date range the all-time TypeRollup totals are used. With one,
+    the TypeDayRollup rows of the days it touches are summed; the range is
+    rounded out to whole days. ``by_day`` returns one summary per day.
+    """
+    if not (by_day or query['start'] or query['end']):
+        rows = TypeRollup.objects.all()
+        if query['types']:
+            rows = rows.filter(type__in=query['types'])
+        return fleet_summary(rows)
+
+    rows = TypeDayRollup.objects.all()
+    if query['types']:
+        rows = rows.filter(type__in=query['types'])
+    if query['start'] is not None:
+        rows = rows.filter(day__gte=timezone.localdate(query['start']))
+    if query['end'] is not None:
+        last_day = timezone.localdate(query['end'])
+        rows = rows.filter(day__lt=last_day) if query['end_exclusive'] else rows.filter(day__lte=last_day)
+
+    if not by_day:
+        totals = rows.values('type').annotate(**{column: Sum(column) for column in TOTAL_COLUMNS}).order_by()
+        return fleet_summary(totals)
+
+    days = {}
+    for row in rows.order_by('day', 'type'):
+        days.setdefault(row.day, []).append(row)
+    return {
+        "days": [
+            {"day": day.isoformat(), **fleet_summary(day_rows)}
+            for day, day_rows in days.items()
+        ]
+    }
+
+
+def _get(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
@@ -0,0 +1,120 @@
+"""
+One asset's readings across uploads for /api/series/.
+
+Query parameters:
+
+    name=Pump A                 the equipment name (required)
+    start=..., end=...          as for /api/trends/
+    points=N                    at most this many points (default
+                                SERIES_DEFAULT_POINTS, capped at
+                                SERIES_MAX_POINTS)
+
+The readings are the name's SeriesReading rows (api/storage.py), read in
+time order in one range scan of series_name_time_idx, so the cost follows
+the asset's own history rather than the fleet's. The date range is cut
+out of that history in the same pass, which also tells an unknown name
+(404) from a range without readings. Uploads still being ingested are
+left out. When there are more than ``points`` readings the range is cut
+into ``points`` equal time buckets and each non-empty bucket becomes one
+point with the mean, min and max of every numeric column, so spikes
+survive the downsampling.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import SeriesReading, UploadRecord
+from .storage import NUMERIC_FIELDS, name_hashes
+from .trends import parse_trends_query
+
+
+def parse_series_query(params):
+    """Turn request query params into a query dict. Raises ValueError on bad input."""
+    query = parse_trends_query(params)
+    query['name'] = params.get('name', '').strip()
+    if not query['name']:
+        raise ValueError("name is required")
+    try:
+        points = int(params.get('points', settings.SERIES_DEFAULT_POINTS))
+    except ValueError:
+        raise ValueError("points must be an integer")
+    if points < 1:
+        raise ValueError("points must be positive")
+    query['points'] = min(points, settings.SERIES_MAX_POINTS)
+    return query
+
+
+def query_series(query):
+    """
+    Return {"name", "total_readings", "downsampled", "points"} for the
+    query, or None when no stored upload has an item of that name.
+    """
+    readings = SeriesReading.objects.filter(name_hash=int(name_hashes([query['name']])[0])).exclude(
+        upload_id__in=UploadRecord.objects.filter(complete=False).values('id')
+    )
+
+    history = list(
+        readings.order_by('uploaded_at', 'upload_id', 'id')
+        .values_list('uploaded_at', 'upload_id', 'type', *NUMERIC_FIELDS)
+    )
+    if not history:
+        return None
+    rows = _in_range(history, query)
+
+    downsampled = len(rows) > query['points']
+    points = _downsample(rows, query['points']) if downsampled else [
+        {
+            "uploaded_at": uploaded_at,
+            "upload_id": upload_id,
+            "type": eq_type,
+            **{field: _value(value) for field, value in zip(NUMERIC_FIELDS, values)},
+        }
+        for uploaded_at, upload_id, eq_type, *values in rows
+    ]
+    return {
+        "name": query['name'],
+        "total_readings": len(rows),
+        "downsampled": downsampled,
+        "points": points,
+    }
+
+
+def _in_range(history, query):
+    # The readings of ``history`` (oldest first) within the query's dates
+    times = [row[0] for row in history]
+    start, end = query['start'], query['end']
+    low = 0 if start is None else bisect_left(times, start)
+    if end is None:
+        high = len(times)
+    else:
+        high = bisect_left(times, end) if query['end_exclusive'] else bisect_right(times, end)
+    return history[low:high]
+
+
+def _downsample(rows, n_buckets):
+    frame = pd.DataFrame(rows, columns=['uploaded_at', 'upload_id', 'type', *NUMERIC_FIELDS])
+    frame[list(NUMERIC_FIELDS)] = frame[list(NUMERIC_FIELDS)].astype('float64')
+    times = frame['uploaded_at'].map(lambda value: value.timestamp()).to_numpy()
+    edges = np.linspace(times[0], times[-1], n_buckets + 1)
+    frame['bucket'] = np.clip(np.searchsorted(edges, times, side='right') - 1, 0, n_buckets - 1)
+
+    grouped = frame.groupby('bucket', sort=True)
+    bounds = grouped['uploaded_at'].agg(['first', 'last', 'size'])
+    stats = grouped[list(NUMERIC_FIELDS)].agg(['mean', 'min', 'max'])
+
+    points = []
+    for bucket, (first, last, size) in bounds.iterrows():
+        point = {"uploaded_at": first, "end": last, "count": int(size)}
+        for field in NUMERIC_FIELDS:
+            point[field] = _value(stats.at[bucket, (field, 'mean')])
+            point[f'{field}_min'] = _value(stats.at[bucket, (field, 'min')])
+            point[f'{field}_max'] = _value(stats.at[bucket, (field, 'max')])
+        points.append(point)
+    return points
+
+
+def _value(value):
+    return None if pd.isna(value) else float(value)
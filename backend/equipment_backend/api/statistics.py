@@ -0,0 +1,216 @@
+"""
+Extended per-upload statistics, computed once at ingestion time.
+
+For flowrate, pressure and temperature we store count, mean, min, max,
+std (sample, like pandas) and the p50/p95/p99 percentiles, both over the
+whole upload and per equipment type. The result is persisted on
+UploadRecord.statistics so history, summary and PDF never have to rescan
+the equipment rows.
+
+Uploads are folded in chunk by chunk in constant memory, whatever their
+size: count, mean, std, min and max come from per-type moments merged
+with Chan's formulas and are exact; the percentiles come from a bottom-k
+sample of STATISTICS_SAMPLE_SIZE rows per type (the rows with the
+smallest random keys, which is a uniform sample however the upload is
+chunked). They are exact for types up to that many rows, and estimates
+within a fraction of a percentile rank above it; the result then says
+"estimated": true along with the sample size. When the whole upload is in
+memory anyway (in-memory uploads, compute_statistics()) the collector is
+exact and keeps every row.
+"""
+
+import math
+
+import numpy as np
+from django.conf import settings
+
+from .storage import NUMERIC_FIELDS, TypeEncoder
+
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Seed of the sampling keys, so the same file always gives the same figures
+SAMPLE_SEED = 0
+
+# Columns of the per-type moments array
+N, MEAN, M2, MIN, MAX = range(5)
+
+
+def _clean(value):
+    # JSON has no NaN; std of a single value, empty groups etc. become null
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def compute_statistics(types, values):
+    """
+    ``types`` is a sequence (or Categorical) of equipment types, ``values``
+    maps each numeric field to an array of the same length. Returns the
+    JSON-ready dict stored on UploadRecord.statistics. Exact, the values
+    are all in memory already.
+    """
+    collector = StatisticsCollector(exact=True)
+    collector.update(types, values)
+    return collector.result()
+
+
+class StatisticsCollector:
+    """
+    Folds an upload into per-type moments and a bounded sample, chunk by
+    chunk. Holds about 32 bytes per sampled row, so at most
+    STATISTICS_SAMPLE_SIZE * 32 bytes per type. With ``exact`` every row
+    is kept and the percentiles are exact whatever the upload size.
+    """
+
+    def __init__(self, sample_size=None, exact=False):
+        self.exact = exact
+        self.sample_size = None if exact else sample_size or settings.STATISTICS_SAMPLE_SIZE
+        self.rows = 0
+        self.encoder = TypeEncoder()
+        self._rng = np.random.default_rng(SAMPLE_SEED)
+        # moments[code] is a (5, fields) array of N, MEAN, M2, MIN, MAX
+        self._moments = {}
+        # sample[code] is (keys, values as a (rows, fields) array)
+        self._sample = {}
+
+    def update(self, types, values):
+        codes = self.encoder.encode(types)
+        data = np.column_stack([np.asarray(values[field], dtype='float64') for field in NUMERIC_FIELDS])
+        self.rows += len(codes)
+        if self.exact:
+            # Nothing to sample, the keys only keep the sort stable
+            keys = np.zeros(len(codes))
+        else:
+            # One key per row, drawn whatever the chunk size, so the sample
+            # doesn't depend on how the upload was chunked
+            keys = self._rng.random(len(codes))
+
+        order = np.lexsort((keys, codes))
+        codes, keys, data = codes[order], keys[order], data[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(codes)]):
+            if start == end:
+                continue
+            code = int(codes[start])
+            group = data[start:end]
+            self._merge_moments(code, _moments(group))
+            # Within the group the rows are sorted by key already
+            self._merge_sample(code, keys[start:end][:self.sample_size], group[:self.sample_size])
+
+    def _merge_moments(self, code, chunk):
+        if code not in self._moments:
+            self._moments[code] = chunk
+            return
+        self._moments[code] = _merge(self._moments[code], chunk)
+
+    def _merge_sample(self, code, keys, rows):
+        if code in self._sample:
+            old_keys, old_rows = self._sample[code]
+            keys = np.concatenate([old_keys, keys])
+            rows = np.concatenate([old_rows, rows])
+            if self.sample_size is not None and len(keys) > self.sample_size:
+                keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+                keys, rows = keys[keep], rows[keep]
+        self._sample[code] = (keys, rows)
+
+    def type_spread(self):
+        """
+        Per-type mean and std of the rows folded in so far, in the shape of
+        result()'s "by_type" without the rest. Reads the moments only, so it
+        is cheap enough to call after every chunk (see AnomalyScanner).
+        """
+        spread = {}
+        for code, label in enumerate(self.encoder.labels):
+            if label is None or code not in self._moments:
+                continue
+            moments = self._moments[code]
+            spread[label] = {}
+            for i, field in enumerate(NUMERIC_FIELDS):
+                n = moments[N, i]
+                spread[label][field] = {
+                    "mean": _clean(moments[MEAN, i]) if n else None,
+                    "std": _clean(math.sqrt(max(moments[M2, i], 0.0) / (n - 1))) if n > 1 else None,
+                }
+        return spread
+
+    @property
+    def estimated(self):
+        """Whether the percentiles come from a sample rather than every row."""
+        return self.sample_size is not None and self.rows > self.sample_size
+
+    def result(self):
+        if not self._moments:
+            return {"overall": {}, "by_type": {}, "estimated": False}
+
+        labels = self.encoder.labels
+        by_type = {}
+        for code, label in enumerate(labels):
+            # rows without a type only count towards the overall stats
+            if label is None or code not in self._moments:
+                continue
+            by_type[label] = _field_stats(self._moments[code], self._sample[code][1])
+
+        overall_moments = None
+        for moments in self._moments.values():
+            overall_moments = moments if overall_moments is None else _merge(overall_moments, moments)
+        # The rows with the smallest keys overall are each among the
+        # smallest of their own type, so the union of the per-type samples
+        # holds the overall sample
+        keys = np.concatenate([keys for keys, _ in self._sample.values()])
+        rows = np.concatenate([rows for _, rows in self._sample.values()])
+        if self.sample_size is not None and len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            rows = rows[keep]
+
+        result = {"overall": _field_stats(overall_moments, rows), "by_type": by_type, "estimated": self.estimated}
+        if self.estimated:
+            result["sample_size"] = self.sample_size
+        return result
+
+
+def _moments(group):
+    # (5, fields) moments of one chunk of one type, NaN skipped like pandas
+    valid = ~np.isnan(group)
+    n = valid.sum(axis=0)
+    filled = np.where(valid, group, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / n
+        m2 = (np.where(valid, group - mean, 0.0) ** 2).sum(axis=0)
+        low = np.where(n > 0, np.where(valid, group, np.inf).min(axis=0, initial=np.inf), np.nan)
+        high = np.where(n > 0, np.where(valid, group, -np.inf).max(axis=0, initial=-np.inf), np.nan)
+    return np.array([n, mean, m2, low, high], dtype='float64')
+
+
+def _merge(a, b):
+    # Chan et al. parallel update of count, mean and M2; empty sides pass through
+    n = a[N] + b[N]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = b[MEAN] - a[MEAN]
+        mean = np.where(a[N] == 0, b[MEAN], np.where(b[N] == 0, a[MEAN], a[MEAN] + delta * b[N] / n))
+        m2 = np.where(
+            (a[N] == 0) | (b[N] == 0),
+            np.nan_to_num(a[M2]) + np.nan_to_num(b[M2]),
+            a[M2] + b[M2] + delta * delta * a[N] * b[N] / n,
+        )
+    return np.array([n, mean, m2, np.fmin(a[MIN], b[MIN]), np.fmax(a[MAX], b[MAX])])
+
+
+def _field_stats(moments, sample):
+    stats = {}
+    for i, field in enumerate(NUMERIC_FIELDS):
+        n = int(moments[N, i])
+        values = sample[:, i]
+        values = values[~np.isnan(values)]
+        field_stats = {
+            "count": n,
+            "mean": _clean(moments[MEAN, i]) if n else None,
+            "min": _clean(moments[MIN, i]) if n else None,
+            "max": _clean(moments[MAX, i]) if n else None,
+            "std": _clean(math.sqrt(max(moments[M2, i], 0.0) / (n - 1))) if n > 1 else None,
+        }
+        # Linear interpolation, as DataFrame.quantile()
+        quantiles = np.quantile(values, PERCENTILES) if len(values) else [float('nan')] * len(PERCENTILES)
+        for q, value in zip(PERCENTILES, quantiles):
+            field_stats[f"p{int(round(q * 100))}"] = _clean(value)
+        stats[field] = field_stats
+    return stats
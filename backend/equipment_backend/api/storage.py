@@ -0,0 +1,250 @@
+"""
+Storage backends for the per-upload equipment list.
+
+'rows'      one Equipment row per item (the original layout)
+'columnar'  one EquipmentColumns row per upload holding packed arrays
+
+settings.EQUIPMENT_STORAGE picks the backend for new uploads; each
+UploadRecord remembers which one it was written with, so reads work for
+both kinds side by side. Use the convert_equipment_storage command to move
+existing uploads between layouts.
+
+Whatever the backend, every chunk is also written to the per-asset time
+series read by api/series.py: one SeriesReading row per item, keyed by
+the hash of its name and indexed on (hash, upload time), so reading one
+asset's history costs the same however large the fleet grows.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import UploadRecord, Equipment, EquipmentColumns, SeriesReading
+
+
+NUMERIC_FIELDS = ('flowrate', 'pressure', 'temperature')
+EQUIPMENT_FIELDS = ('name', 'type') + NUMERIC_FIELDS
+
+BULK_CREATE_BATCH_SIZE = 5000
+
+FLOAT_DTYPE = np.dtype('<f8')
+CODE_DTYPE = np.dtype('<i4')
+HASH_DTYPE = np.dtype('<i8')
+NAME_SEPARATOR = '\x00'
+
+# The name hash key is baked into the stored series: changing it needs
+# `manage.py backfill_series --all`.
+SERIES_HASH_KEY = 'equipment-series'
+
+
+def equipment_records(columns):
+    """Build the list of equipment dicts returned in API responses."""
+    return [
+        dict(zip(EQUIPMENT_FIELDS, values))
+        for values in zip(*(columns[field] for field in EQUIPMENT_FIELDS))
+    ]
+
+
+def bulk_insert_equipment(record, columns, batch_size=BULK_CREATE_BATCH_SIZE):
+    """Insert all equipment rows for an upload straight from the columns."""
+    Equipment.objects.bulk_create(
+        (
+            Equipment(
+                upload_record_id=record.id,
+                name=name,
+                type=eq_type,
+                flowrate=flowrate,
+                pressure=pressure,
+                temperature=temperature,
+            )
+            for name, eq_type, flowrate, pressure, temperature in zip(
+                *(columns[field] for field in EQUIPMENT_FIELDS)
+            )
+        ),
+        batch_size=batch_size,
+    )
+
+
+def name_hashes(names):
+    """
+    Stable 64-bit hashes of equipment names, as stored in
+    SeriesReading.name_hash (the unsigned hash read as a signed integer).
+    """
+    names = np.asarray([str(name) for name in names], dtype=object)
+    # Names are mostly distinct, so factorizing them first only costs time
+    return pd.util.hash_array(names, hash_key=SERIES_HASH_KEY, categorize=False).view(HASH_DTYPE)
+
+
+def write_series(record, columns):
+    """Append one chunk of the upload's items to the per-asset time series."""
+    if not len(columns['name']):
+        return
+    numeric = [np.asarray(columns[field], dtype=FLOAT_DTYPE) for field in NUMERIC_FIELDS]
+    SeriesReading.objects.bulk_create(
+        (
+            SeriesReading(
+                name_hash=name_hash,
+                upload_id=record.id,
+                uploaded_at=record.uploaded_at,
+                type='' if pd.isna(eq_type) else str(eq_type),
+                # NaN is not a value every database keeps, NULL is
+                flowrate=None if math.isnan(flowrate) else flowrate,
+                pressure=None if math.isnan(pressure) else pressure,
+                temperature=None if math.isnan(temperature) else temperature,
+            )
+            for name_hash, eq_type, flowrate, pressure, temperature in zip(
+                name_hashes(columns['name']).tolist(), columns['type'], *(values.tolist() for values in numeric)
+            )
+        ),
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+
+
+def delete_series(upload_ids):
+    """Drop the series readings of uploads that never completed."""
+    SeriesReading.objects.filter(upload_id__in=list(upload_ids)).delete()
+
+
+class TypeEncoder:
+    """Dictionary-encodes equipment types into int32 codes, chunk after chunk."""
+
+    def __init__(self):
+        self._codes = {}
+
+    @property
+    def labels(self):
+        return list(self._codes)
+
+    def encode(self, types):
+        # Factorize the chunk, then map its local codes onto the upload-wide labels
+        local_codes, uniques = pd.factorize(pd.Series(types, dtype=object), use_na_sentinel=False)
+        mapping = np.empty(len(uniques), dtype=CODE_DTYPE)
+        for i, label in enumerate(uniques):
+            label = None if pd.isna(label) else str(label)
+            mapping[i] = self._codes.setdefault(label, len(self._codes))
+        return mapping[local_codes]
+
+
+def default_backend():
+    return getattr(settings, 'EQUIPMENT_STORAGE', UploadRecord.STORAGE_ROWS)
+
+
+class EquipmentWriter:
+    """
+    Collects an upload's equipment columns chunk by chunk and persists them
+    with the chosen backend. Row storage inserts every chunk immediately;
+    columnar storage keeps the packed bytes (24 bytes per row plus names
+    and codes) and writes the single EquipmentColumns row on close().
+    Series readings are written chunk by chunk unless ``series`` is off.
+    """
+
+    def __init__(self, record, backend=None, series=True):
+        self.record = record
+        self.backend = backend or default_backend()
+        self.series = series
+        self.row_count = 0
+        self._numeric = {field: [] for field in NUMERIC_FIELDS}
+        self._names = []
+        self._codes = []
+        self._types = TypeEncoder()
+
+    def append(self, columns):
+        n_rows = len(columns['name'])
+        if not n_rows:
+            return
+        self.row_count += n_rows
+        if self.series:
+            write_series(self.record, columns)
+
+        if self.backend == UploadRecord.STORAGE_ROWS:
+            bulk_insert_equipment(self.record, columns)
+            return
+
+        for field in NUMERIC_FIELDS:
+            self._numeric[field].append(np.asarray(columns[field], dtype=FLOAT_DTYPE).tobytes())
+        self._names.append(NAME_SEPARATOR.join(
+            str(name).replace(NAME_SEPARATOR, '') for name in columns['name']
+        ))
+        self._codes.append(self._types.encode(columns['type']).tobytes())
+
+    def close(self):
+        if self.record.storage != self.backend:
+            self.record.storage = self.backend
+            self.record.save(update_fields=['storage', 'updated_at'])
+
+        if self.backend == UploadRecord.STORAGE_COLUMNAR:
+            EquipmentColumns.objects.update_or_create(
+                upload_record=self.record,
+                defaults={
+                    'row_count': self.row_count,
+                    'names': NAME_SEPARATOR.join(self._names).encode('utf-8'),
+                    'type_labels': self._types.labels,
+                    'type_codes': b''.join(self._codes),
+                    'flowrate': b''.join(self._numeric['flowrate']),
+                    'pressure': b''.join(self._numeric['pressure']),
+                    'temperature': b''.join(self._numeric['temperature']),
+                },
+            )
+
+
+def write_equipment(record, columns, backend=None, series=True):
+    """Persist a complete set of equipment columns for an upload."""
+    writer = EquipmentWriter(record, backend, series)
+    writer.append(columns)
+    writer.close()
+
+
+def load_columns(record):
+    """Return the upload's equipment as a dict of column lists, whatever the backend."""
+    if record.storage == UploadRecord.STORAGE_COLUMNAR:
+        try:
+            packed = record.columns
+        except EquipmentColumns.DoesNotExist:
+            packed = None
+        if packed is not None:
+            return unpack_columns(packed)
+
+    rows = record.equipment_list.order_by('id').values_list(*EQUIPMENT_FIELDS)
+    columns = dict(zip(EQUIPMENT_FIELDS, map(list, zip(*rows))))
+    return columns or {field: [] for field in EQUIPMENT_FIELDS}
+
+
+def unpack_columns(packed, as_arrays=False):
+    """Decode an EquipmentColumns row into column lists (or NumPy arrays)."""
+    labels = np.array(packed.type_labels, dtype=object)
+    codes = np.frombuffer(bytes(packed.type_codes), dtype=CODE_DTYPE)
+    names = bytes(packed.names).decode('utf-8').split(NAME_SEPARATOR) if packed.row_count else []
+    columns = {
+        'name': np.array(names, dtype=object),
+        'type': labels[codes] if len(labels) else np.array([], dtype=object),
+    }
+    for field in NUMERIC_FIELDS:
+        columns[field] = np.frombuffer(bytes(getattr(packed, field)), dtype=FLOAT_DTYPE)
+
+    if as_arrays:
+        return columns
+    return {field: values.tolist() for field, values in columns.items()}
+
+
+def load_equipment(record):
+    """Return the upload's equipment as the list of dicts used in API responses."""
+    return equipment_records(load_columns(record))
+
+
+def convert_record(record, backend):
+    """Rewrite one upload's equipment list with another backend. Returns False if nothing to do."""
+    if record.storage == backend:
+        return False
+
+    columns = load_columns(record)
+    # Only the layout changes, the series stays as it is
+    write_equipment(record, columns, backend, series=False)
+
+    # Drop the old layout only after the new one has been written
+    if backend == UploadRecord.STORAGE_COLUMNAR:
+        Equipment.objects.filter(upload_record=record).delete()
+    else:
+        EquipmentColumns.objects.filter(upload_record=record).delete()
+    return True
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.models import UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(UPLOAD_CHUNK_ROWS=60, ANOMALY_LIMITS={})
+class AnomalyTests(ApiTestCase):
+    def anomalies(self, content, **params):
+        response = self.upload(content, **params)
+        self.assertEqual(response.status_code, 200)
+        return self.latest_record().anomalies
+
+    def test_pressure_outlier_is_flagged_on_both_paths(self):
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                anomalies = self.anomalies(make_csv(seed=1 if stream == 'true' else 0), stream=stream)
+                self.assertEqual(anomalies['by_reason'], {'pressure_zscore': 1})
+                self.assertFalse(anomalies['truncated'])
+                [flagged] = anomalies['rows']
+                # Item 3 is the fourth data row of the file
+                self.assertEqual(flagged['row'], 4)
+                self.assertEqual(flagged['type'], 'Reactor')
+                self.assertTrue(flagged['name'].endswith('-3'))
+                self.assertEqual(flagged['reasons'][0]['value'], 500)
+
+    def test_rows_are_numbered_like_the_validation_report(self):
+        content = make_csv(bad_rows={1: {'Flowrate': 'abc'}})
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                self.anomalies(content, stream=stream, force='true')
+                record = self.latest_record()
+                self.assertEqual([row['row'] for row in record.validation['rows']], [2])
+                self.assertEqual([row['row'] for row in record.anomalies['rows']], [4])
+
+    def test_hard_limits(self):
+        with override_settings(ANOMALY_ZSCORE_THRESHOLD=0, ANOMALY_LIMITS={'temperature': (None, 140.0)}):
+            anomalies = self.anomalies(make_csv(), stream='true')
+        values = [row['reasons'][0]['value'] for row in anomalies['rows']]
+        self.assertEqual(anomalies['by_reason'], {'temperature_above_max': len(values)})
+        self.assertTrue(values)
+        self.assertTrue(all(value > 140 for value in values))
+        self.assertEqual(anomalies['rows'][0]['reasons'][0]['limit'], 140.0)
+
+    def test_only_the_first_rows_are_listed(self):
+        with override_settings(ANOMALY_ZSCORE_THRESHOLD=0, ANOMALY_LIMITS={'flowrate': (100.0, None)},
+                               ANOMALY_MAX_ROWS=5):
+            anomalies = self.anomalies(make_csv(), stream='true')
+        self.assertGreater(anomalies['count'], 5)
+        self.assertEqual(len(anomalies['rows']), 5)
+        self.assertTrue(anomalies['truncated'])
+        rows = [row['row'] for row in anomalies['rows']]
+        self.assertEqual(rows, sorted(rows))
+
+    def test_backfill_keeps_the_numbering(self):
+        self.anomalies(make_csv(bad_rows={1: {'Flowrate': 'abc'}}))
+        record = self.latest_record()
+        expected = record.anomalies
+        UploadRecord.objects.filter(id=record.id).update(anomalies={})
+        call_command('backfill_statistics', stdout=StringIO())
+        record.refresh_from_db()
+        self.assertNestedAlmostEqual(record.anomalies, expected)
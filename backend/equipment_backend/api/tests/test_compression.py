@@ -0,0 +1,65 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api import middleware
+from api.middleware import accepted_encodings
+
+from .utils import ApiTestCase, make_csv
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_q_values(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, br, identity; q=0, x y'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0},
+        )
+        self.assertEqual(accepted_encodings(''), {})
+
+
+class CompressionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.record_id = self.upload(make_csv()).json()['id']
+        self.url = f'/api/summary/{self.record_id}/'
+
+    def test_gzip_json(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        # A compressed body is only weakly the same as the plain one
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_streamed_export_is_compressed_as_it_goes(self):
+        url = f'/api/export/{self.record_id}/?format=csv'
+        plain = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    def test_small_and_precompressed_responses_are_left_alone(self):
+        for url in ('/api/summary/999/', f'/api/report/{self.record_id}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_without_brotli_br_falls_back_to_gzip(self):
+        with mock.patch.object(middleware, 'brotli', None):
+            response = self.client.get(self.url, headers={'Accept-Encoding': 'br, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    @unittest.skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli_when_preferred(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip;q=0.8, br'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(middleware.brotli.decompress(response.content)), plain.json())
+
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip, br;q=0.5'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
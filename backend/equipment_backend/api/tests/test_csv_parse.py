@@ -0,0 +1,73 @@
+import io
+import unittest
+
+import pandas as pd
+from django.test import override_settings
+
+from api.ingest import IngestError, csv_engine, pyarrow, read_equipment_csv
+from api.models import UploadRecord
+
+from .utils import HEADER, ApiTestCase, make_csv
+
+
+class CsvParseTests(ApiTestCase):
+    def test_missing_column_is_refused_from_the_header(self):
+        # The rows after the header would not even tokenize
+        content = b"Equipment Name,Type,Flowrate,Temperature\n" + b"a,b,c,d,e,f,g\n" * 1000
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                response = self.upload(content, stream=stream)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'CSV missing required columns'})
+        self.assertFalse(UploadRecord.objects.exists())
+
+    def test_only_the_required_columns_are_read(self):
+        df = pd.read_csv(io.BytesIO(make_csv(rows=30)))
+        # Extra columns anywhere, the required ones in another order
+        df.insert(0, 'Notes', 'n/a')
+        df['Site'] = 'North'
+        df = df[['Temperature', 'Notes', 'Type', 'Equipment Name', 'Site', 'Pressure', 'Flowrate']]
+        wide = df.to_csv(index=False).encode()
+
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                self.assertEqual(self.upload(wide, stream=stream, force='true').status_code, 200)
+        data = self.upload(make_csv(rows=30), stream='false', force='true').json()
+        self.assertEqual(self.upload(wide, stream='false', force='true').json()['equipment'], data['equipment'])
+
+    def test_dtypes_are_pinned(self):
+        content = (HEADER + "\n007,Pump,1,2,3\n1e3,Valve,4.5,6,7\n").encode()
+        for df in (read_equipment_csv(io.BytesIO(content)), next(read_equipment_csv(io.BytesIO(content), 10))):
+            self.assertEqual(list(df.columns), ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+            # Names that look numeric stay as written
+            self.assertEqual(df['Equipment Name'].tolist(), ['007', '1e3'])
+            self.assertIsInstance(df['Type'].dtype, pd.CategoricalDtype)
+            for column in ('Flowrate', 'Pressure', 'Temperature'):
+                self.assertEqual(df[column].dtype, 'float64')
+
+    def test_bad_cell_rereads_the_rest_in_the_same_chunks(self):
+        content = make_csv(rows=25, bad_rows={17: {'Pressure': 'high'}})
+        chunks = list(read_equipment_csv(io.BytesIO(content), 10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual([chunk.index[0] for chunk in chunks], [0, 10, 20])
+        self.assertEqual(chunks[0]['Pressure'].dtype, 'float64')
+        self.assertEqual(chunks[1]['Pressure'].iloc[7], 'high')
+
+    def test_unreadable_file_is_an_ingest_error(self):
+        with self.assertRaises(IngestError):
+            read_equipment_csv(io.BytesIO(b""))
+
+    def test_engine_setting(self):
+        with override_settings(CSV_PARSER_ENGINE='c'):
+            self.assertEqual(csv_engine(), 'c')
+        with override_settings(CSV_PARSER_ENGINE='auto'):
+            self.assertEqual(csv_engine(), 'c' if pyarrow is None else 'pyarrow')
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_pyarrow_parses_like_the_c_parser(self):
+        content = make_csv(rows=50)
+        with override_settings(CSV_PARSER_ENGINE='pyarrow'):
+            arrow = read_equipment_csv(io.BytesIO(content))
+        with override_settings(CSV_PARSER_ENGINE='c'):
+            c = read_equipment_csv(io.BytesIO(content))
+        pd.testing.assert_frame_equal(arrow, c, check_categorical=False)
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.test import override_settings
+
+from api.models import UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+class DuplicateUploadTests(ApiTestCase):
+    def test_same_file_returns_the_earlier_upload(self):
+        content = make_csv()
+        first = self.upload(content, 'a.csv').json()
+        second = self.upload(content, 'b.csv').json()
+        self.assertEqual(UploadRecord.objects.count(), 1)
+        record = self.latest_record()
+        self.assertEqual(record.content_sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(second['duplicate_of'], record.id)
+        self.assertEqual(second['total_equipment'], first['total_equipment'])
+        self.assertEqual(second['equipment'], first['equipment'])
+
+    def test_streamed_duplicate_has_no_equipment_list(self):
+        content = make_csv()
+        self.upload(content, stream='true')
+        data = self.upload(content, stream='true').json()
+        self.assertEqual(data['duplicate_of'], self.latest_record().id)
+        self.assertNotIn('equipment', data)
+
+    @override_settings(INGEST_JOBS_EAGER=True)
+    def test_async_duplicate_is_answered_straight_away(self):
+        content = make_csv()
+        self.upload(content)
+        data = self.upload(content, **{'async': 'true'}).json()
+        self.assertEqual(data['duplicate_of'], self.latest_record().id)
+        self.assertEqual(UploadRecord.objects.count(), 1)
+
+    def test_rejected_upload_claims_no_digest(self):
+        content = make_csv(bad_rows={5: {'Pressure': 'x'}})
+        self.assertEqual(self.upload(content, invalid_rows='reject').status_code, 400)
+        self.assertNotIn('duplicate_of', self.upload(content).json())
+
+    def test_force_ingests_again_and_moves_the_digest(self):
+        content = make_csv()
+        self.upload(content)
+        first = self.latest_record()
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                response = self.upload(content, stream=stream, force='true')
+                self.assertNotIn('duplicate_of', response.json())
+                latest = self.latest_record()
+                self.assertNotEqual(latest.id, first.id)
+                self.assertIsNotNone(latest.content_sha256)
+                self.assertIsNone(UploadRecord.objects.get(id=first.id).content_sha256)
+                self.assertEqual(UploadRecord.objects.exclude(content_sha256=None).get().id, latest.id)
+                # A plain re-upload now finds the forced one
+                self.assertEqual(self.upload(content).json()['duplicate_of'], latest.id)
@@ -0,0 +1,68 @@
+from django.test import override_settings
+
+from api.models import UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+class EquipmentQueryTests(ApiTestCase):
+    def walk(self, url):
+        items, cursor = [], None
+        for _ in range(100):
+            response = self.client.get(url + (f'&cursor={cursor}' if cursor else ''))
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            items.extend(data['equipment'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return items
+        self.fail("Paging did not end")
+
+    def test_keyset_pages_on_both_backends(self):
+        for backend in ('rows', 'columnar'):
+            with self.subTest(backend=backend), override_settings(EQUIPMENT_STORAGE=backend):
+                record = UploadRecord.objects.get(id=self.upload(make_csv(seed=len(backend))).json()['id'])
+                self.assertEqual(record.storage, backend)
+                url = f'/api/summary/{record.id}/'
+
+                everything = self.client.get(url).json()['equipment']
+                self.assertEqual(len(everything), 120)
+                self.assertEqual(self.walk(url + '?limit=7'), everything)
+
+                # Descending sorts break ties by descending id too
+                expected = sorted(enumerate(everything), key=lambda pair: (-pair[1]['flowrate'], -pair[0]))
+                self.assertEqual(self.walk(url + '?limit=9&sort=-flowrate'), [item for _, item in expected])
+
+                expected = sorted(
+                    (item for item in everything if item['type'] == 'Pump' and item['pressure'] >= 5),
+                    key=lambda item: item['pressure'],
+                )
+                self.assertEqual(self.walk(url + '?limit=4&type=Pump&min_pressure=5&sort=pressure'), expected)
+
+                expected = [
+                    item for item in everything
+                    if item['type'] in ('Valve', 'Reactor') and 60 <= item['temperature'] <= 100
+                ]
+                filtered = self.client.get(url + '?type=Valve&type=Reactor&min_temperature=60&max_temperature=100')
+                self.assertEqual(filtered.json()['equipment'], expected)
+
+    def test_unpaged_response_has_no_cursor(self):
+        record_id = self.upload(make_csv()).json()['id']
+        self.assertNotIn('next_cursor', self.client.get(f'/api/summary/{record_id}/').json())
+
+    def test_summary_without_equipment(self):
+        record_id = self.upload(make_csv()).json()['id']
+        data = self.client.get(f'/api/summary/{record_id}/?include_equipment=false').json()
+        self.assertNotIn('equipment', data)
+        self.assertEqual(data['total_equipment'], 120)
+
+    def test_bad_parameters_are_errors(self):
+        record_id = self.upload(make_csv()).json()['id']
+        for query in ('sort=name', 'limit=0', 'limit=abc', 'limit=100000', 'min_flowrate=x', 'limit=5&cursor=nope'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/summary/{record_id}/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_unknown_upload_is_not_found(self):
+        self.assertEqual(self.client.get('/api/summary/999/').status_code, 404)
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import unittest
+
+from django.test import override_settings
+
+from api.renderers import arrow_available
+from api.storage import EQUIPMENT_FIELDS, NUMERIC_FIELDS
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(EXPORT_CHUNK_ROWS=7)
+class ExportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.record_id = self.upload(make_csv()).json()['id']
+
+    def equipment(self, record_id=None):
+        return self.client.get(f'/api/summary/{record_id or self.record_id}/?stream=false').json()['equipment']
+
+    def export(self, query, record_id=None, headers=None):
+        response = self.client.get(f'/api/export/{record_id or self.record_id}/{query}', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_on_both_backends(self):
+        with override_settings(EQUIPMENT_STORAGE='columnar'):
+            columnar_id = self.upload(make_csv(seed=5)).json()['id']
+        for record_id in (self.record_id, columnar_id):
+            with self.subTest(record_id=record_id):
+                response, body = self.export('?format=csv', record_id)
+                self.assertTrue(response['Content-Type'].startswith('text/csv'))
+                self.assertIn(f'upload_{record_id}.csv', response['Content-Disposition'])
+                rows = list(csv.DictReader(io.StringIO(body)))
+                self.assertEqual(list(rows[0]), ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+                equipment = self.equipment(record_id)
+                self.assertEqual(len(rows), len(equipment))
+                for row, item in zip(rows, equipment):
+                    self.assertEqual(row['Equipment Name'], item['name'])
+                    self.assertEqual(row['Type'], item['type'])
+                    for field in NUMERIC_FIELDS:
+                        self.assertEqual(float(row[field.capitalize()]), item[field])
+
+    def test_csv_export_uploads_again(self):
+        _, body = self.export('?format=csv')
+        data = self.upload(body.encode(), force='true').json()
+        self.assertEqual(data['total_equipment'], 120)
+        self.assertEqual(data['equipment'], self.equipment())
+
+    def test_ndjson_export_with_filters(self):
+        response, body = self.export('?format=ndjson&type=Valve&sort=-temperature')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        items = [json.loads(line) for line in body.splitlines()]
+        expected = sorted(
+            (item for item in self.equipment() if item['type'] == 'Valve'),
+            key=lambda item: -item['temperature'],
+        )
+        self.assertEqual(items, [{field: item[field] for field in EQUIPMENT_FIELDS} for item in expected])
+
+    def test_format_from_the_accept_header(self):
+        response, _ = self.export('', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        # CSV when the client doesn't ask for anything in particular
+        response, _ = self.export('')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+    @unittest.skipIf(arrow_available(), "pyarrow is installed")
+    def test_parquet_needs_pyarrow(self):
+        response = self.client.get(f'/api/export/{self.record_id}/?format=parquet')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    @unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get(f'/api/export/{self.record_id}/?format=parquet')
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.to_pylist(), self.equipment())
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/export/999/?format=csv').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/export/{self.record_id}/?format=csv&sort=name').status_code, 400)
+
+    def test_export_revalidates(self):
+        response, _ = self.export('?format=csv')
+        again = self.client.get(f'/api/export/{self.record_id}/?format=csv', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        # Each format is its own representation
+        other, _ = self.export('?format=ndjson')
+        self.assertNotEqual(other['ETag'], response['ETag'])
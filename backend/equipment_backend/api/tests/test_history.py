@@ -0,0 +1,53 @@
+from django.test import override_settings
+
+from api.history import HISTORY_DEFAULT_FIELDS
+from api.models import UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(HISTORY_RETENTION_COUNT=0)
+class HistoryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for seed in range(5):
+            self.upload(make_csv(rows=8, seed=seed))
+        self.newest_first = list(UploadRecord.objects.order_by('-uploaded_at', '-id').values_list('id', flat=True))
+
+    def get(self, query=''):
+        response = self.client.get('/api/history/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_plain_request_is_the_latest_five(self):
+        data = self.get()
+        self.assertIsInstance(data, list)
+        self.assertEqual([item['id'] for item in data], self.newest_first)
+        self.assertEqual(list(data[0]), list(HISTORY_DEFAULT_FIELDS))
+
+    def test_keyset_pages(self):
+        items, cursor = [], None
+        for _ in range(10):
+            data = self.get('?limit=2&fields=id' + (f'&cursor={cursor}' if cursor else ''))
+            items.extend(data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(items, [{'id': record_id} for record_id in self.newest_first])
+
+    def test_compact_rows(self):
+        data = self.get('?compact=true&fields=id,total_equipment&limit=3')
+        self.assertEqual(data['fields'], ['id', 'total_equipment'])
+        self.assertEqual(data['rows'], [[record_id, 8] for record_id in self.newest_first[:3]])
+        self.assertTrue(data['next_cursor'])
+
+    def test_storage_is_only_returned_on_request(self):
+        self.assertNotIn('storage', self.get()[0])
+        self.assertEqual(self.get('?fields=storage&limit=1')['results'], [{'storage': 'rows'}])
+
+    def test_bad_parameters_are_errors(self):
+        for query in ('fields=id,secret', 'limit=0', 'limit=x', 'limit=501', 'cursor=nope'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/history/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
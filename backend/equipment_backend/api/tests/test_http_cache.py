@@ -0,0 +1,67 @@
+from django.utils.http import http_date
+
+from api.http_cache import history_version
+
+from .utils import ApiTestCase, make_csv
+
+
+class ConditionalRequestTests(ApiTestCase):
+    def assertRevalidates(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        return etag
+
+    def test_summary_etag(self):
+        record_id = self.upload(make_csv()).json()['id']
+        url = f'/api/summary/{record_id}/'
+        etag = self.assertRevalidates(url)
+        # Another query is another representation
+        self.assertNotEqual(self.assertRevalidates(url + '?include_equipment=false'), etag)
+
+        record = self.latest_record()
+        record.save(update_fields=['updated_at'])
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_summary_last_modified(self):
+        record_id = self.upload(make_csv()).json()['id']
+        url = f'/api/summary/{record_id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
+        # If-None-Match wins when both are sent
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_history_etag_moves_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(make_csv(seed=1))
+        version, _ = history_version()
+        etag = self.assertRevalidates('/api/history/')
+        # Polling clients have to come back and revalidate
+        self.assertIn('no-cache', self.client.get('/api/history/')['Cache-Control'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(make_csv(seed=2))
+        self.assertEqual(history_version()[0], version + 1)
+        changed = self.client.get('/api/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.json()), 2)
+
+    def test_report_etag(self):
+        record_id = self.upload(make_csv(rows=12)).json()['id']
+        url = f'/api/report/{record_id}/'
+        etag = self.assertRevalidates(url)
+        # The latest report is the same document
+        self.assertEqual(self.client.get('/api/report/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.latest_record().save(update_fields=['updated_at'])
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertTrue(b''.join(changed.streaming_content).startswith(b'%PDF'))
+        self.assertNotEqual(changed['ETag'], etag)
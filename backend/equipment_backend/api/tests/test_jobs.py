@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api import jobs
+from api.jobs import _Heartbeat, claim_job, requeue_stale_jobs, run_job
+from api.models import IngestJob, UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(INGEST_JOBS_EAGER=True, INGEST_JOB_RECOVERY_SECONDS=0, UPLOAD_CHUNK_ROWS=10)
+class IngestJobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Recovery is throttled per process, start every test afresh
+        jobs._next_recovery = 0.0
+
+    def queue(self, content):
+        # Queued, but not handed to any worker
+        with override_settings(INGEST_JOBS_EAGER=False), self.captureOnCommitCallbacks(execute=False):
+            data = self.upload(content, **{'async': 'true'}).json()
+        self.assertEqual(data['status'], IngestJob.STATUS_QUEUED)
+        return data['id']
+
+    def simulate_dead_worker(self, job_id):
+        # Claimed, a placeholder written, then no heartbeat for days
+        self.assertTrue(claim_job(job_id))
+        placeholder = UploadRecord.objects.create(
+            total_equipment=0, average_flowrate=0, average_pressure=0, average_temperature=0,
+            equipment_type_distribution={}, complete=False,
+        )
+        IngestJob.objects.filter(id=job_id).update(
+            upload_record=placeholder, heartbeat_at=timezone.now() - timedelta(days=2),
+        )
+        return placeholder
+
+    def test_async_upload_runs_to_done(self):
+        response = self.upload(make_csv(), **{'async': 'true'})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['status'], IngestJob.STATUS_DONE)
+        self.assertEqual(data['attempts'], 1)
+
+        status = self.client.get(data['status_url']).json()
+        self.assertEqual(status['rows_processed'], 120)
+        record = self.latest_record()
+        self.assertTrue(record.complete)
+        self.assertEqual(status['summary']['id'], record.id)
+        self.assertEqual(status['summary']['total_equipment'], 120)
+
+        job = IngestJob.objects.get(id=data['id'])
+        self.assertFalse(job.file)
+        # A finished job is never claimed again
+        self.assertFalse(claim_job(job.id))
+        self.assertFalse(run_job(job.id))
+
+    def test_broken_file_fails_the_job(self):
+        data = self.upload(b"not,a,valid\nfile\n", **{'async': 'true'}).json()
+        self.assertEqual(data['status'], IngestJob.STATUS_FAILED)
+        self.assertTrue(data['error'])
+        self.assertFalse(UploadRecord.objects.exists())
+
+    def test_unknown_job_is_not_found(self):
+        self.assertEqual(self.client.get('/api/jobs/999/').status_code, 404)
+
+    def test_unfinished_upload_is_hidden(self):
+        job_id = self.queue(make_csv())
+        placeholder = self.simulate_dead_worker(job_id)
+        self.assertEqual(self.client.get(f'/api/summary/{placeholder.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/history/').json(), [])
+
+    def test_stale_job_is_requeued_then_failed(self):
+        job_id = self.queue(make_csv())
+        placeholder = self.simulate_dead_worker(job_id)
+
+        self.assertEqual(requeue_stale_jobs(now=timezone.now() - timedelta(days=3)), [])
+        self.assertEqual(requeue_stale_jobs(), [job_id])
+        job = IngestJob.objects.get(id=job_id)
+        self.assertEqual(job.status, IngestJob.STATUS_QUEUED)
+        self.assertIsNone(job.upload_record_id)
+        self.assertFalse(UploadRecord.objects.filter(id=placeholder.id).exists())
+
+        with override_settings(INGEST_JOB_MAX_ATTEMPTS=2):
+            self.simulate_dead_worker(job_id)
+            self.assertEqual(requeue_stale_jobs(), [job_id])
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_polling_runs_jobs_nobody_picked_up(self):
+        job_id = self.queue(make_csv())
+        status = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertEqual(status['status'], IngestJob.STATUS_DONE)
+        self.assertEqual(status['summary']['total_equipment'], 120)
+
+    def test_polling_recovers_jobs_of_a_dead_worker(self):
+        job_id = self.queue(make_csv())
+        self.simulate_dead_worker(job_id)
+
+        status = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertEqual(status['status'], IngestJob.STATUS_DONE)
+        self.assertEqual(status['attempts'], 2)
+        self.assertEqual(UploadRecord.objects.get().total_equipment, 120)
+
+    def test_recovery_is_throttled(self):
+        job_id = self.queue(make_csv())
+        with override_settings(INGEST_JOB_RECOVERY_SECONDS=3600):
+            # The first call runs the queue, the second is within the interval
+            self.client.get('/api/jobs/999/')
+            second = self.queue(make_csv(seed=1))
+            self.assertEqual(self.client.get(f'/api/jobs/{second}/').json()['status'], IngestJob.STATUS_QUEUED)
+        self.assertEqual(IngestJob.objects.get(id=job_id).status, IngestJob.STATUS_DONE)
+
+
+class HeartbeatTests(TransactionTestCase):
+    def setUp(self):
+        self.job = IngestJob.objects.create(file='ingest_jobs/none.csv')
+        self.assertTrue(claim_job(self.job.id))
+        self.job.refresh_from_db()
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out")
+            time.sleep(0.02)
+
+    def test_heartbeat_keeps_the_lease_fresh(self):
+        started = self.job.heartbeat_at
+        with _Heartbeat(self.job, 0.05) as heartbeat:
+            self.wait_for(lambda: IngestJob.objects.get(id=self.job.id).heartbeat_at > started)
+        self.assertFalse(heartbeat.lost)
+
+    def test_heartbeat_notices_a_lost_claim(self):
+        with _Heartbeat(self.job, 0.05) as heartbeat:
+            IngestJob.objects.filter(id=self.job.id).update(status=IngestJob.STATUS_QUEUED)
+            self.wait_for(lambda: heartbeat.lost)
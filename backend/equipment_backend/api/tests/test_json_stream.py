@@ -0,0 +1,66 @@
+import json
+
+from django.test import SimpleTestCase, override_settings
+
+from api.json_stream import stream_summary
+
+from .utils import ApiTestCase, make_csv
+
+
+class StreamSummaryTests(SimpleTestCase):
+    def decode(self, summary, chunks):
+        return json.loads(b''.join(stream_summary(summary, chunks)))
+
+    def test_chunks_make_one_list(self):
+        chunks = [[('A', 'Pump', 1.0, 2.0, 3.0)], [], [('B', 'Välve', float('nan'), 5.0, 6.0)]]
+        self.assertEqual(self.decode({'id': 1}, chunks), {
+            'id': 1,
+            'equipment': [
+                {'name': 'A', 'type': 'Pump', 'flowrate': 1.0, 'pressure': 2.0, 'temperature': 3.0},
+                {'name': 'B', 'type': 'Välve', 'flowrate': None, 'pressure': 5.0, 'temperature': 6.0},
+            ],
+        })
+
+    def test_empty(self):
+        self.assertEqual(self.decode({}, []), {'equipment': []})
+
+
+@override_settings(SUMMARY_STREAM_CHUNK_ROWS=7)
+class StreamedSummaryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.record_id = self.upload(make_csv()).json()['id']
+        self.url = f'/api/summary/{self.record_id}/'
+
+    def test_streamed_summary_matches_the_rendered_one(self):
+        rendered = self.client.get(self.url + '?stream=false')
+        self.assertFalse(rendered.streaming)
+        streamed = self.client.get(self.url + '?stream=true')
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), rendered.json())
+
+    def test_filters_apply_to_the_stream(self):
+        query = '&type=Pump&sort=-pressure'
+        streamed = json.loads(b''.join(self.client.get(self.url + '?stream=true' + query).streaming_content))
+        self.assertEqual(streamed, self.client.get(self.url + '?stream=false' + query).json())
+
+    def test_large_uploads_stream_by_default(self):
+        with override_settings(SUMMARY_STREAMING_THRESHOLD_ROWS=100):
+            self.assertTrue(self.client.get(self.url).streaming)
+        with override_settings(SUMMARY_STREAMING_THRESHOLD_ROWS=1000):
+            self.assertFalse(self.client.get(self.url).streaming)
+
+    def test_pages_and_bad_queries_are_not_streamed(self):
+        self.assertFalse(self.client.get(self.url + '?stream=true&limit=5').streaming)
+        self.assertEqual(self.client.get(self.url + '?stream=true&sort=name').status_code, 400)
+
+    def test_streamed_summary_revalidates(self):
+        etag = self.client.get(self.url + '?stream=true')['ETag']
+        self.assertEqual(self.client.get(self.url + '?stream=true', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_columnar_uploads_stream_too(self):
+        with override_settings(EQUIPMENT_STORAGE='columnar'):
+            url = f"/api/summary/{self.upload(make_csv(seed=1)).json()['id']}/"
+        streamed = json.loads(b''.join(self.client.get(url + '?stream=true').streaming_content))
+        self.assertEqual(streamed, self.client.get(url + '?stream=false').json())
@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from api import pdf_utils
+from api.pdf_utils import HIGH_VOLUME_ROWS_PER_TABLE, HIGH_VOLUME_THRESHOLD, generate_pdf
+
+SUMMARY = {
+    "total_equipment": 0,
+    "average_flowrate": 1.0,
+    "average_pressure": 2.0,
+    "average_temperature": 3.0,
+    "equipment_type_distribution": {"Pump": 2, "Valve": 1},
+}
+
+
+def equipment(rows):
+    return [
+        {"name": f"EQ-{i}", "type": "Pump" if i % 2 else "Valve",
+         "flowrate": i * 1.5, "pressure": i * 0.1, "temperature": 20 + i}
+        for i in range(rows)
+    ]
+
+
+class HighVolumeLayoutTests(SimpleTestCase):
+    def test_detail_list_is_split_into_page_sized_tables(self):
+        rows = equipment(2 * HIGH_VOLUME_ROWS_PER_TABLE + 1)
+        tables = pdf_utils._equipment_tables_high_volume(rows)
+        self.assertEqual(len(tables), 3)
+        # Each table has its own header row
+        self.assertEqual([len(table._cellvalues) for table in tables],
+                         [HIGH_VOLUME_ROWS_PER_TABLE + 1, HIGH_VOLUME_ROWS_PER_TABLE + 1, 2])
+        self.assertEqual(tables[2]._cellvalues[1][0], f"EQ-{2 * HIGH_VOLUME_ROWS_PER_TABLE}")
+
+    def test_layout_follows_the_row_count(self):
+        with mock.patch.object(pdf_utils, '_equipment_tables_high_volume',
+                               wraps=pdf_utils._equipment_tables_high_volume) as high_volume:
+            generate_pdf(SUMMARY, equipment(HIGH_VOLUME_THRESHOLD))
+            self.assertFalse(high_volume.called)
+            generate_pdf(SUMMARY, equipment(HIGH_VOLUME_THRESHOLD + 1))
+            self.assertTrue(high_volume.called)
+
+    def test_both_layouts_build_a_pdf(self):
+        for high_volume in (False, True):
+            with self.subTest(high_volume=high_volume):
+                pdf = generate_pdf(SUMMARY, equipment(60), high_volume=high_volume).getvalue()
+                self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+class ChartCacheTests(SimpleTestCase):
+    def setUp(self):
+        pdf_utils._chart_cache.clear()
+        self.addCleanup(pdf_utils._chart_cache.clear)
+        patcher = mock.patch.object(pdf_utils, '_render_distribution_chart',
+                                    wraps=pdf_utils._render_distribution_chart)
+        self.render = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_distribution_is_rendered_once(self):
+        first = pdf_utils._create_equipment_distribution_chart({"Pump": 2, "Valve": 1}).getvalue()
+        self.assertTrue(first.startswith(b'\x89PNG'))
+        again = pdf_utils._create_equipment_distribution_chart({"Pump": 2, "Valve": 1}).getvalue()
+        self.assertEqual(again, first)
+        self.assertEqual(self.render.call_count, 1)
+        # Wedge order is part of the chart
+        pdf_utils._create_equipment_distribution_chart({"Valve": 1, "Pump": 2})
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(pdf_utils, 'CHART_CACHE_SIZE', 2):
+            for count in (1, 2, 3):
+                pdf_utils._create_equipment_distribution_chart({"Pump": count})
+            self.assertEqual(len(pdf_utils._chart_cache), 2)
+            # The oldest one went first
+            pdf_utils._create_equipment_distribution_chart({"Pump": 3})
+            self.assertEqual(self.render.call_count, 3)
+            pdf_utils._create_equipment_distribution_chart({"Pump": 1})
+            self.assertEqual(self.render.call_count, 4)
+
+    def test_failed_render_is_not_cached(self):
+        self.render.side_effect = [None, b'png']
+        self.assertIsNone(pdf_utils._create_equipment_distribution_chart({"Pump": 1}))
+        self.assertEqual(pdf_utils._create_equipment_distribution_chart({"Pump": 1}).getvalue(), b'png')
+
+    def test_threads_draw_on_their_own_figure(self):
+        figures = []
+
+        def render():
+            figures.append(pdf_utils._chart_figure())
+            pdf_utils._render_distribution_chart({"Pump": 1})
+
+        threads = [threading.Thread(target=render) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(figures[0], figures[1])
+
+
+class LazyReportStackTests(SimpleTestCase):
+    def loaded_modules(self, code):
+        # A fresh interpreter, this one has loaded the report stack already
+        script = (
+            "import sys, django; django.setup(); " + code + "; "
+            "print(' '.join(sorted({name.split('.')[0] for name in sys.modules} & {'matplotlib', 'reportlab'})))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='equipment_backend.settings')
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        return result.stdout.split()
+
+    def test_app_starts_without_the_report_stack(self):
+        self.assertEqual(self.loaded_modules("import equipment_backend.urls"), [])
+
+    def test_preload_imports_it(self):
+        self.assertEqual(
+            self.loaded_modules("from api.pdf_utils import preload_report_stack; preload_report_stack()"),
+            ['matplotlib', 'reportlab'],
+        )
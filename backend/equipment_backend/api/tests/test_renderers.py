@@ -0,0 +1,99 @@
+import json
+import struct
+import unittest
+
+import numpy as np
+
+from api.renderers import PACKED_ALIGNMENT, PACKED_MAGIC, arrow_available
+
+from .utils import ApiTestCase, make_csv
+
+PACKED = 'application/vnd.equipment.columns'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+
+def unpack_columns(body):
+    """(header, columns) of a packed columns body, see api/renderers.py."""
+    assert body[:len(PACKED_MAGIC)] == PACKED_MAGIC
+    (length,) = struct.unpack_from('<I', body, len(PACKED_MAGIC))
+    start = len(PACKED_MAGIC) + 4
+    header = json.loads(body[start:start + length])
+    offset = start + length
+    columns = {}
+    for column, dtype, size in (header['columns'] or {}).get('layout', []):
+        raw = body[offset:offset + size]
+        columns[column] = raw.decode('utf-8').split('\x00') if dtype == 'utf-8' else np.frombuffer(raw, dtype=dtype)
+        offset += size
+    return header, columns
+
+
+class PackedColumnsTests(ApiTestCase):
+    def assertMatchesJson(self, body, data):
+        header, columns = unpack_columns(body)
+        equipment = data.pop('equipment')
+        layout = header.pop('columns')
+        self.assertEqual(layout['rows'], len(equipment))
+        self.assertEqual(header, data)
+        labels = layout['type_labels']
+        self.assertEqual(
+            [
+                {'name': name, 'type': labels[code], 'flowrate': flowrate, 'pressure': pressure, 'temperature': temperature}
+                for name, code, flowrate, pressure, temperature in zip(
+                    columns['name'], columns['type'], columns['flowrate'], columns['pressure'], columns['temperature'],
+                )
+            ],
+            equipment,
+        )
+
+    def test_upload_and_summary_as_packed_columns(self):
+        content = make_csv()
+        response = self.upload(content, headers={'Accept': PACKED})
+        self.assertEqual(response['Content-Type'], PACKED)
+        record_id = unpack_columns(response.content)[0]['id']
+
+        url = f'/api/summary/{record_id}/'
+        packed = self.client.get(url, headers={'Accept': PACKED})
+        self.assertEqual(packed['Content-Type'], PACKED)
+        self.assertMatchesJson(packed.content, self.client.get(url).json())
+        self.assertMatchesJson(response.content, self.upload(content, force='true').json() | {'id': record_id})
+
+    def test_arrays_are_aligned(self):
+        record_id = self.upload(make_csv()).json()['id']
+        body = self.client.get(f'/api/summary/{record_id}/', headers={'Accept': PACKED}).content
+        (length,) = struct.unpack_from('<I', body, len(PACKED_MAGIC))
+        self.assertEqual((len(PACKED_MAGIC) + 4 + length) % PACKED_ALIGNMENT, 0)
+
+    def test_summary_without_equipment(self):
+        record_id = self.upload(make_csv()).json()['id']
+        body = self.client.get(f'/api/summary/{record_id}/?include_equipment=false', headers={'Accept': PACKED}).content
+        header, columns = unpack_columns(body)
+        self.assertIsNone(header['columns'])
+        self.assertEqual(columns, {})
+        self.assertEqual(header['total_equipment'], 120)
+
+    def test_errors_fall_back_to_json(self):
+        response = self.client.get('/api/summary/999/', headers={'Accept': PACKED})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('error', response.json())
+
+    def test_json_stays_the_default(self):
+        response = self.upload(make_csv())
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+@unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+class ArrowStreamTests(ApiTestCase):
+    def test_summary_as_arrow(self):
+        import pyarrow as pa
+
+        record_id = self.upload(make_csv()).json()['id']
+        url = f'/api/summary/{record_id}/'
+        response = self.client.get(url, headers={'Accept': ARROW})
+        self.assertEqual(response['Content-Type'], ARROW)
+        table = pa.ipc.open_stream(response.content).read_all()
+
+        data = self.client.get(url).json()
+        equipment = data.pop('equipment')
+        self.assertEqual(json.loads(table.schema.metadata[b'summary']), data)
+        self.assertEqual(table.to_pylist(), equipment)
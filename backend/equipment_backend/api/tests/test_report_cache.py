@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from api import pdf_utils
+from api.models import UploadRecord
+from api.report_cache import get_report
+
+from .utils import ApiTestCase, make_csv
+
+
+class ReportCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.record = UploadRecord.objects.get(id=self.upload(make_csv(rows=12)).json()['id'])
+        self.url = f'/api/report/{self.record.id}/'
+        patcher = mock.patch.object(pdf_utils, 'generate_pdf', wraps=pdf_utils.generate_pdf)
+        self.generate_pdf = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def download(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        return content
+
+    def test_report_is_built_once(self):
+        first = self.download()
+        self.assertEqual(self.download(), first)
+        # The latest report is the same cached document
+        self.assertEqual(self.download('/api/report/'), first)
+        self.assertEqual(self.generate_pdf.call_count, 1)
+
+    def test_changed_record_gets_a_new_report(self):
+        self.download()
+        self.record.save(update_fields=['updated_at'])
+        self.download()
+        self.assertEqual(self.generate_pdf.call_count, 2)
+
+    def test_deleted_record_leaves_the_cache(self):
+        self.download()
+        self.assertIsNotNone(get_report(self.record))
+        self.record.delete()
+        self.assertIsNone(get_report(self.record))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(REPORT_CACHE_MAX_ITEM_BYTES=10)
+    def test_oversized_reports_are_not_cached(self):
+        self.download()
+        self.download()
+        self.assertEqual(self.generate_pdf.call_count, 2)
+
+    def test_missing_report_is_not_found(self):
+        self.assertEqual(self.client.get('/api/report/999/').status_code, 404)
+
+    def test_no_uploads_at_all(self):
+        self.record.delete()
+        self.assertEqual(self.client.get('/api/report/').status_code, 400)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.test import override_settings
+
+from api import response_cache
+
+from .utils import ApiTestCase, make_csv
+
+
+class ResponseCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        response_cache.reset_stats()
+        self.addCleanup(response_cache.reset_stats)
+
+    def stats(self, endpoint):
+        stats = self.client.get('/api/cache/stats/').json()
+        return {key: stats.get(endpoint, {}).get(key, 0) for key in ('hits', 'misses')}
+
+    def test_summary_is_served_from_the_cache(self):
+        record_id = self.upload(make_csv()).json()['id']
+        url = f'/api/summary/{record_id}/'
+        first = self.client.get(url).json()
+        with self.assertNumQueries(3):
+            # Session, user and the record itself, not the equipment
+            self.assertEqual(self.client.get(url).json(), first)
+        self.assertEqual(self.stats('summary'), {'hits': 1, 'misses': 1})
+
+        # A changed record is a new key
+        self.latest_record().save(update_fields=['updated_at'])
+        self.client.get(url)
+        self.assertEqual(self.stats('summary'), {'hits': 1, 'misses': 2})
+
+    def test_history_is_rebuilt_after_an_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(make_csv(seed=1))
+        self.assertEqual(len(self.client.get('/api/history/').json()), 1)
+        self.assertEqual(len(self.client.get('/api/history/').json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(make_csv(seed=2))
+        self.assertEqual(len(self.client.get('/api/history/').json()), 2)
+        self.assertEqual(self.stats('history'), {'hits': 1, 'misses': 2})
+
+    def test_zero_ttl_turns_caching_off(self):
+        record_id = self.upload(make_csv()).json()['id']
+        with override_settings(RESPONSE_CACHE_TTLS={**settings.RESPONSE_CACHE_TTLS, 'summary': 0}):
+            self.client.get(f'/api/summary/{record_id}/')
+            self.client.get(f'/api/summary/{record_id}/')
+        self.assertEqual(self.stats('summary'), {'hits': 0, 'misses': 0})
+
+    @override_settings(RESPONSE_CACHE_MAX_ITEM_BYTES=100)
+    def test_large_responses_are_not_stored(self):
+        record_id = self.upload(make_csv()).json()['id']
+        self.client.get(f'/api/summary/{record_id}/')
+        self.client.get(f'/api/summary/{record_id}/')
+        self.assertEqual(self.stats('summary'), {'hits': 0, 'misses': 2})
+
+    def test_hit_rate(self):
+        record_id = self.upload(make_csv()).json()['id']
+        for _ in range(4):
+            self.client.get(f'/api/summary/{record_id}/')
+        self.assertEqual(self.client.get('/api/cache/stats/').json()['summary']['hit_rate'], 0.75)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import Equipment, EquipmentColumns, UploadRecord
+from api.retention import expired_record_ids, trim_history
+
+from .utils import ApiTestCase, make_csv
+
+
+class RetentionTests(ApiTestCase):
+    def upload_many(self, count, first_seed=0, **settings):
+        with override_settings(HISTORY_TRIM_ON_UPLOAD=False, **settings):
+            return [
+                self.upload(make_csv(rows=10, seed=seed)).json()['id']
+                for seed in range(first_seed, first_seed + count)
+            ]
+
+    @override_settings(HISTORY_RETENTION_COUNT=2)
+    def test_uploads_trim_the_oldest(self):
+        for seed in range(4):
+            self.upload(make_csv(rows=20 + seed, seed=seed))
+        records = list(UploadRecord.objects.order_by('id'))
+        self.assertEqual([record.total_equipment for record in records], [22, 23])
+        self.assertFalse(Equipment.objects.exclude(upload_record__in=records).exists())
+
+    def test_both_storage_layouts_are_deleted(self):
+        ids = self.upload_many(2, EQUIPMENT_STORAGE='columnar') + self.upload_many(2, first_seed=2)
+        self.assertEqual(trim_history(keep=1), ids[:3])
+        self.assertFalse(EquipmentColumns.objects.exists())
+        self.assertEqual(set(Equipment.objects.values_list('upload_record', flat=True)), {ids[3]})
+
+    def test_trim_by_age(self):
+        ids = self.upload_many(3)
+        UploadRecord.objects.filter(id=ids[0]).update(uploaded_at=timezone.now() - timedelta(days=10))
+        self.assertEqual(expired_record_ids(keep=0, days=7), [ids[0]])
+        # Either rule expires an upload
+        self.assertEqual(expired_record_ids(keep=1, days=7), ids[:2])
+        self.assertEqual(expired_record_ids(keep=0, days=0), [])
+
+    def test_trim_history_is_idempotent(self):
+        ids = self.upload_many(3)
+        self.assertEqual(trim_history(keep=2), [ids[0]])
+        self.assertEqual(trim_history(keep=2), [])
+        self.assertEqual(list(UploadRecord.objects.order_by('id').values_list('id', flat=True)), ids[1:])
+
+    def test_unfinished_uploads_are_left_alone(self):
+        ids = self.upload_many(2)
+        placeholder = UploadRecord.objects.create(
+            total_equipment=0, average_flowrate=0, average_pressure=0, average_temperature=0,
+            equipment_type_distribution={}, complete=False,
+        )
+        self.assertEqual(trim_history(keep=1), [ids[0]])
+        self.assertTrue(UploadRecord.objects.filter(id=placeholder.id).exists())
+
+    def test_command(self):
+        ids = self.upload_many(3)
+        out = StringIO()
+        call_command('trim_history', '--keep', '1', '--dry-run', stdout=out)
+        self.assertIn(f"Would delete 2 upload(s): {ids[:2]}", out.getvalue())
+        self.assertEqual(UploadRecord.objects.count(), 3)
+
+        out = StringIO()
+        call_command('trim_history', '--keep', '1', stdout=out)
+        self.assertIn("Deleted 2 upload(s)", out.getvalue())
+        self.assertEqual(list(UploadRecord.objects.values_list('id', flat=True)), ids[2:])
@@ -0,0 +1,78 @@
+import io
+from datetime import datetime
+from io import StringIO
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import TypeDayRollup, TypeRollup, UploadRecord
+from api.retention import trim_history
+from api.rollups import apply_rollup
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(HISTORY_TRIM_ON_UPLOAD=False, UPLOAD_CHUNK_ROWS=7)
+class FleetRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contents = [make_csv(rows=20 + seed, seed=seed) for seed in range(3)]
+        for content, stream in zip(self.contents, ('false', 'true', 'false')):
+            self.upload(content, stream=stream)
+
+    def fleet(self, query=''):
+        response = self.client.get('/api/fleet/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertMatchesPandas(self, fleet, contents):
+        df = pd.concat([pd.read_csv(io.BytesIO(content)) for content in contents])
+        self.assertEqual(fleet['overall']['count'], len(df))
+        self.assertAlmostEqual(fleet['overall']['pressure']['mean'], df['Pressure'].mean())
+        self.assertAlmostEqual(fleet['overall']['pressure']['std'], df['Pressure'].std())
+        for eq_type, group in df.groupby('Type'):
+            stats = fleet['by_type'][eq_type]
+            self.assertEqual(stats['count'], len(group))
+            self.assertAlmostEqual(stats['flowrate']['mean'], group['Flowrate'].mean())
+            self.assertAlmostEqual(stats['temperature']['variance'], group['Temperature'].var())
+
+    def test_fleet_matches_pandas(self):
+        self.assertMatchesPandas(self.fleet(), self.contents)
+        self.assertEqual(set(self.fleet('?type=Pump')['by_type']), {'Pump'})
+
+    def test_trim_takes_uploads_out(self):
+        trim_history(keep=1)
+        self.assertMatchesPandas(self.fleet(), self.contents[2:])
+        # A second trim subtracts nothing more, from the daily totals either
+        self.assertEqual(trim_history(keep=1), [])
+        self.assertEqual(sum(TypeDayRollup.objects.values_list('count', flat=True)), 22)
+
+    def test_by_day(self):
+        first, second, third = UploadRecord.objects.order_by('id')
+        # Move one upload, and its share of the daily totals, to another day
+        apply_rollup(first.rollup, first.uploaded_at, sign=-1)
+        first.uploaded_at = timezone.make_aware(datetime(2026, 3, 1, 12))
+        first.save(update_fields=['uploaded_at'])
+        apply_rollup(first.rollup, first.uploaded_at)
+
+        days = self.fleet('?by=day')['days']
+        self.assertEqual([day['overall']['count'] for day in days], [20, 43])
+        self.assertEqual(days[0]['day'], '2026-03-01')
+        self.assertEqual(self.fleet('?end=2026-03-01')['overall']['count'], 20)
+        self.assertEqual(self.fleet('?start=2026-03-02')['overall']['count'], 43)
+
+    def test_rebuild_command(self):
+        expected = self.fleet()
+        TypeRollup.objects.update(count=0)
+        TypeDayRollup.objects.all().delete()
+        UploadRecord.objects.filter(id=UploadRecord.objects.earliest('id').id).update(rollup={})
+
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertIn("Computed 1 upload rollup(s), rebuilt totals from 3 upload(s)", out.getvalue())
+        self.assertNestedAlmostEqual(self.fleet(), expected)
+
+    def test_bad_by_is_an_error(self):
+        self.assertEqual(self.client.get('/api/fleet/?by=week').status_code, 400)
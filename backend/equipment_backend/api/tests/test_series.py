@@ -0,0 +1,99 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import SeriesReading, UploadRecord
+from api.retention import trim_history, trim_series
+from api.series import parse_series_query, query_series
+
+from .utils import HEADER, ApiTestCase
+
+
+def reading_csv(day, rows=('P-1', 'P-2', 'P-3')):
+    # Each item's flowrate is the day, its pressure the item number
+    lines = [HEADER] + [f"{name},Pump,{day},{i},{20 + day}" for i, name in enumerate(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+@override_settings(HISTORY_RETENTION_COUNT=0, UPLOAD_CHUNK_ROWS=2)
+class SeriesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # Ten daily uploads, alternating the in-memory and chunked paths
+        for day in range(1, 11):
+            record_id = self.upload(reading_csv(day), stream='true' if day % 2 else 'false').json()['id']
+            uploaded_at = timezone.make_aware(datetime(2026, 3, day, 12))
+            UploadRecord.objects.filter(id=record_id).update(uploaded_at=uploaded_at)
+            SeriesReading.objects.filter(upload_id=record_id).update(uploaded_at=uploaded_at)
+
+    def series(self, query):
+        response = self.client.get('/api/series/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_one_reading_per_upload(self):
+        data = self.series('?name=P-2')
+        self.assertEqual(data['total_readings'], 10)
+        self.assertFalse(data['downsampled'])
+        self.assertEqual([point['flowrate'] for point in data['points']], list(range(1, 11)))
+        self.assertEqual({point['pressure'] for point in data['points']}, {1.0})
+        self.assertEqual({point['type'] for point in data['points']}, {'Pump'})
+        self.assertEqual(SeriesReading.objects.count(), 30)
+
+    def test_date_range(self):
+        data = self.series('?name=P-1&start=2026-03-03&end=2026-03-05')
+        self.assertEqual([point['flowrate'] for point in data['points']], [3, 4, 5])
+        data = self.series('?name=P-1&start=2026-03-03T13:00:00&end=2026-03-05T12:00:00')
+        self.assertEqual([point['flowrate'] for point in data['points']], [4, 5])
+        # A known name without readings in range is not a 404
+        data = self.series('?name=P-1&start=2026-04-01')
+        self.assertEqual((data['total_readings'], data['points']), (0, []))
+
+    def test_downsampling_keeps_extremes(self):
+        data = self.series('?name=P-3&points=3')
+        self.assertTrue(data['downsampled'])
+        self.assertEqual(sum(point['count'] for point in data['points']), 10)
+        self.assertEqual(data['points'][0]['flowrate_min'], 1)
+        self.assertEqual(data['points'][-1]['flowrate_max'], 10)
+
+    def test_unknown_name_and_bad_queries(self):
+        self.assertEqual(self.client.get('/api/series/?name=nope').status_code, 404)
+        for query in ('', 'name=P-1&points=0', 'name=P-1&points=x', 'name=P-1&start=soon'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/series/?{query}').status_code, 400)
+
+    def test_series_outlives_the_upload_history(self):
+        trim_history(keep=1)
+        self.assertEqual(self.series('?name=P-1')['total_readings'], 10)
+        with override_settings(SERIES_RETENTION_DAYS=7):
+            deleted = trim_series(now=timezone.make_aware(datetime(2026, 3, 11)))
+        self.assertEqual(deleted, 3 * 3)
+        self.assertEqual(self.series('?name=P-1')['total_readings'], 7)
+
+    def test_unfinished_uploads_are_left_out(self):
+        UploadRecord.objects.filter(id=UploadRecord.objects.latest('id').id).update(complete=False)
+        self.assertEqual(self.series('?name=P-1')['total_readings'], 9)
+
+    def test_backfill_command(self):
+        SeriesReading.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_series', stdout=out)
+        self.assertIn("Backfilled series readings for 10 upload(s)", out.getvalue())
+        self.assertEqual(self.series('?name=P-3')['total_readings'], 10)
+        # Only uploads without readings, unless asked for all
+        call_command('backfill_series', stdout=out)
+        self.assertIn("for 0 upload(s)", out.getvalue())
+        self.assertEqual(SeriesReading.objects.count(), 30)
+
+    def test_one_query_over_the_name_index(self):
+        query = parse_series_query(QueryDict('name=P-1&start=2026-03-02&end=2026-03-04'))
+        with self.assertNumQueries(1):
+            self.assertEqual(query_series(query)['total_readings'], 3)
+        with self.assertNumQueries(1):
+            self.assertIsNone(query_series(parse_series_query(QueryDict('name=nope&start=2026-03-02'))))
+        plan = SeriesReading.objects.filter(name_hash=1).order_by('uploaded_at').explain()
+        self.assertIn('series_name_time_idx', plan)
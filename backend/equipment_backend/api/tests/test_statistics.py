@@ -0,0 +1,106 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.test import override_settings
+
+from api.models import UploadRecord
+from api.statistics import StatisticsCollector, compute_statistics
+
+from .utils import ApiTestCase, make_csv
+
+
+class StatisticsCollectorTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(1)
+        self.types = np.array(['Pump', 'Valve'] * 500)
+        self.values = {
+            'flowrate': rng.uniform(0, 100, 1000),
+            'pressure': rng.uniform(0, 10, 1000),
+            'temperature': rng.uniform(20, 80, 1000),
+        }
+
+    def collect(self, chunk_rows, **kwargs):
+        collector = StatisticsCollector(**kwargs)
+        for start in range(0, len(self.types), chunk_rows):
+            chunk = slice(start, start + chunk_rows)
+            collector.update(self.types[chunk], {field: values[chunk] for field, values in self.values.items()})
+        return collector.result()
+
+    def test_exact_percentiles_whatever_the_size(self):
+        statistics = compute_statistics(self.types, self.values)
+        self.assertFalse(statistics['estimated'])
+        self.assertNotIn('sample_size', statistics)
+        pressure = pd.Series(self.values['pressure'])
+        self.assertAlmostEqual(statistics['overall']['pressure']['p95'], pressure.quantile(0.95))
+        self.assertAlmostEqual(statistics['by_type']['Valve']['pressure']['p50'], pressure[1::2].median())
+
+    def test_sample_does_not_depend_on_chunking(self):
+        first = self.collect(7, sample_size=50)
+        self.assertNestedAlmostEqual(first, self.collect(130, sample_size=50))
+        self.assertTrue(first['estimated'])
+        self.assertEqual(first['sample_size'], 50)
+        # Counts, means and extremes stay exact
+        self.assertEqual(first['by_type']['Pump']['flowrate']['count'], 500)
+        self.assertEqual(first['overall']['flowrate']['max'], self.values['flowrate'].max())
+
+    def test_small_uploads_are_not_estimated(self):
+        statistics = self.collect(100, sample_size=1000)
+        self.assertFalse(statistics['estimated'])
+        self.assertNestedAlmostEqual(statistics, compute_statistics(self.types, self.values))
+
+    def test_empty(self):
+        self.assertEqual(
+            StatisticsCollector().result(),
+            {"overall": {}, "by_type": {}, "estimated": False},
+        )
+
+
+@override_settings(UPLOAD_CHUNK_ROWS=7)
+class UploadStatisticsTests(ApiTestCase):
+    def test_statistics_match_pandas(self):
+        content = make_csv()
+        statistics = UploadRecord.objects.get(id=self.upload(content).json()['id']).statistics
+        df = pd.read_csv(io.BytesIO(content))
+        for column in ('Flowrate', 'Pressure', 'Temperature'):
+            stats = statistics['overall'][column.lower()]
+            self.assertEqual(stats['count'], len(df))
+            self.assertAlmostEqual(stats['mean'], df[column].mean())
+            self.assertAlmostEqual(stats['std'], df[column].std())
+            self.assertAlmostEqual(stats['p95'], df[column].quantile(0.95))
+            self.assertEqual(stats['max'], df[column].max())
+        pumps = df[df['Type'] == 'Pump']
+        self.assertAlmostEqual(statistics['by_type']['Pump']['pressure']['p50'], pumps['Pressure'].median())
+
+    def test_in_memory_and_streamed_agree_below_the_sample_size(self):
+        content = make_csv()
+        in_memory = self.upload(content, stream='false').json()['statistics']
+        streamed = self.upload(content, stream='true', force='true').json()['statistics']
+        self.assertFalse(streamed['estimated'])
+        self.assertNestedAlmostEqual(in_memory, streamed)
+
+    @override_settings(STATISTICS_SAMPLE_SIZE=20)
+    def test_only_streamed_uploads_are_estimated(self):
+        content = make_csv(rows=400)
+        df = pd.read_csv(io.BytesIO(content))
+
+        in_memory = self.upload(content, stream='false').json()['statistics']
+        self.assertFalse(in_memory['estimated'])
+        self.assertAlmostEqual(in_memory['overall']['temperature']['p99'], df['Temperature'].quantile(0.99))
+
+        streamed = self.upload(content, stream='true', force='true').json()['statistics']
+        self.assertTrue(streamed['estimated'])
+        self.assertEqual(streamed['sample_size'], 20)
+        flowrate = streamed['by_type']['Pump']['flowrate']
+        self.assertEqual(flowrate['count'], 100)
+        self.assertTrue(flowrate['min'] <= flowrate['p50'] <= flowrate['max'])
+        # Stored as returned
+        self.assertEqual(self.latest_record().statistics, streamed)
+
+    @override_settings(STATISTICS_SAMPLE_SIZE=20)
+    def test_report_notes_estimated_percentiles(self):
+        record_id = self.upload(make_csv(rows=400), stream='true').json()['id']
+        response = self.client.get(f'/api/report/{record_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.models import Equipment, EquipmentColumns, UploadRecord
+from api.storage import load_columns, load_equipment
+
+from .utils import ApiTestCase, make_csv
+
+
+class ColumnarStorageTests(ApiTestCase):
+    def upload_with(self, backend, content, **params):
+        with override_settings(EQUIPMENT_STORAGE=backend, UPLOAD_CHUNK_ROWS=7):
+            data = self.upload(content, **params).json()
+        return UploadRecord.objects.get(id=data['id'])
+
+    def test_columnar_upload_stores_one_packed_row(self):
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                record = self.upload_with('columnar', make_csv(seed=stream == 'true'), stream=stream)
+                self.assertEqual(record.storage, UploadRecord.STORAGE_COLUMNAR)
+                self.assertFalse(Equipment.objects.filter(upload_record=record).exists())
+                packed = EquipmentColumns.objects.get(upload_record=record)
+                self.assertEqual(packed.row_count, 120)
+                self.assertEqual(sorted(packed.type_labels), ['Compressor', 'Pump', 'Reactor', 'Valve'])
+
+    def test_both_layouts_read_back_the_same(self):
+        content = make_csv()
+        rows = self.upload_with('rows', content)
+        columnar = self.upload_with('columnar', content, force='true')
+        self.assertEqual(load_equipment(columnar), load_equipment(rows))
+        self.assertEqual(
+            self.client.get(f'/api/summary/{columnar.id}/').json()['equipment'],
+            self.client.get(f'/api/summary/{rows.id}/').json()['equipment'],
+        )
+
+    def test_names_with_separators_and_unicode_survive(self):
+        content = (
+            "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+            "Pumpe Ä,Pump,1,2,3\n"
+            "\"Valve, north\",Valve,4,5,6\n"
+        ).encode()
+        record = self.upload_with('columnar', content)
+        self.assertEqual(load_columns(record)['name'], ['Pumpe Ä', 'Valve, north'])
+
+    def test_report_reads_columnar_uploads(self):
+        record = self.upload_with('columnar', make_csv(rows=12))
+        response = self.client.get(f'/api/report/{record.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_convert_command_moves_uploads_both_ways(self):
+        record = self.upload_with('rows', make_csv())
+        before = load_equipment(record)
+
+        out = StringIO()
+        call_command('convert_equipment_storage', '--to', 'columnar', stdout=out)
+        self.assertIn("Converted 1 upload(s)", out.getvalue())
+        record.refresh_from_db()
+        self.assertEqual(record.storage, UploadRecord.STORAGE_COLUMNAR)
+        self.assertFalse(Equipment.objects.exists())
+        self.assertEqual(load_equipment(record), before)
+
+        call_command('convert_equipment_storage', '--to', 'rows', str(record.id), stdout=StringIO())
+        record.refresh_from_db()
+        self.assertEqual(record.storage, UploadRecord.STORAGE_ROWS)
+        self.assertFalse(EquipmentColumns.objects.exists())
+        self.assertEqual(load_equipment(record), before)
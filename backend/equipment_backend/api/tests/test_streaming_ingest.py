@@ -0,0 +1,52 @@
+from django.test import override_settings
+
+from api.models import Equipment, UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(UPLOAD_CHUNK_ROWS=7)
+class StreamingIngestTests(ApiTestCase):
+    def test_chunked_and_in_memory_summaries_agree(self):
+        content = make_csv()
+        in_memory = self.upload(content, stream='false').json()
+        chunked = self.upload(content, stream='true', force='true').json()
+
+        self.assertNotEqual(in_memory['id'], chunked['id'])
+        self.assertEqual(chunked['total_equipment'], in_memory['total_equipment'])
+        self.assertEqual(chunked['equipment_type_distribution'], in_memory['equipment_type_distribution'])
+        # Rounded to 2 places after summing chunk by chunk, so a tie may
+        # round either way
+        for field in ('average_flowrate', 'average_pressure', 'average_temperature'):
+            self.assertAlmostEqual(chunked[field], in_memory[field], delta=0.0100001)
+
+        first, second = UploadRecord.objects.order_by('id')
+        self.assertEqual(
+            list(second.equipment_list.order_by('id').values_list('name', 'type', 'flowrate', 'pressure', 'temperature')),
+            list(first.equipment_list.order_by('id').values_list('name', 'type', 'flowrate', 'pressure', 'temperature')),
+        )
+
+    def test_both_paths_return_the_record_id(self):
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                data = self.upload(make_csv(seed=stream == 'true'), stream=stream).json()
+                self.assertEqual(data['id'], self.latest_record().id)
+                self.assertEqual(self.client.get(f"/api/summary/{data['id']}/").status_code, 200)
+
+    def test_streamed_response_has_no_equipment_list(self):
+        data = self.upload(make_csv(), stream='true').json()
+        self.assertNotIn('equipment', data)
+        self.assertEqual(data['total_equipment'], 120)
+
+    @override_settings(UPLOAD_STREAMING_THRESHOLD_BYTES=1024)
+    def test_large_files_take_the_chunked_path(self):
+        self.assertNotIn('equipment', self.upload(make_csv()).json())
+        self.assertIn('equipment', self.upload(make_csv(rows=5, seed=1)).json())
+
+    def test_failing_chunk_leaves_nothing_behind(self):
+        # The bad row sits in the last chunk, after earlier chunks were inserted
+        content = make_csv(bad_rows={115: {'Pressure': 'broken'}})
+        response = self.upload(content, stream='true', invalid_rows='reject')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadRecord.objects.exists())
+        self.assertFalse(Equipment.objects.exists())
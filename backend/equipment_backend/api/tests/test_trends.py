@@ -0,0 +1,68 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import UploadRecord
+
+from .utils import ApiTestCase, make_csv
+
+
+@override_settings(HISTORY_RETENTION_COUNT=0)
+class TrendsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contents = {}
+        for seed, backend in enumerate(('rows', 'columnar')):
+            content = make_csv(rows=40, seed=seed)
+            with override_settings(EQUIPMENT_STORAGE=backend):
+                record_id = self.upload(content).json()['id']
+            self.contents[record_id] = content
+        # One upload a day, the rows one first
+        for day, record_id in enumerate(self.contents, start=1):
+            UploadRecord.objects.filter(id=record_id).update(
+                uploaded_at=timezone.make_aware(datetime(2026, 3, day, 12)),
+            )
+
+    def trends(self, query=''):
+        response = self.client.get('/api/trends/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_both_backends_match_pandas(self):
+        results = self.trends()
+        self.assertEqual(len(results), 8)
+        for record_id, content in self.contents.items():
+            df = pd.read_csv(io.BytesIO(content))
+            rows = [row for row in results if row['upload_id'] == record_id]
+            self.assertEqual([row['type'] for row in rows], sorted(df['Type'].unique()))
+            for row in rows:
+                group = df[df['Type'] == row['type']]
+                self.assertEqual(row['count'], len(group))
+                for column in ('Flowrate', 'Pressure', 'Temperature'):
+                    self.assertAlmostEqual(row[f'average_{column.lower()}'], group[column].mean(), delta=0.005)
+
+    def test_type_filter(self):
+        results = self.trends('?type=Pump&type=Reactor')
+        self.assertEqual({row['type'] for row in results}, {'Pump', 'Reactor'})
+        self.assertEqual(len(results), 4)
+
+    def test_date_range(self):
+        rows_id, columnar_id = self.contents
+        self.assertEqual({row['upload_id'] for row in self.trends('?start=2026-03-02')}, {columnar_id})
+        # A bare end date covers the whole day
+        self.assertEqual({row['upload_id'] for row in self.trends('?end=2026-03-01')}, {rows_id})
+        self.assertEqual(self.trends('?end=2026-03-01T11:00:00'), [])
+
+    def test_bad_queries_are_errors(self):
+        for query in ('start=yesterday', 'end=2026-13-01', 'start=2026-03-02&end=2026-03-01'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/trends/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_one_day_range(self):
+        rows_id, _ = self.contents
+        self.assertEqual({row['upload_id'] for row in self.trends('?start=2026-03-01&end=2026-03-01')}, {rows_id})
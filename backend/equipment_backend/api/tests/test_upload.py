@@ -0,0 +1,45 @@
+import csv
+import io
+
+from api.models import Equipment
+from api.storage import load_equipment
+
+from .utils import ApiTestCase, make_csv
+
+
+class UploadTests(ApiTestCase):
+    def test_equipment_list_mirrors_the_file(self):
+        content = make_csv(rows=40)
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(data['total_equipment'], 40)
+        self.assertEqual(data['equipment'], [
+            {
+                'name': row['Equipment Name'],
+                'type': row['Type'],
+                'flowrate': float(row['Flowrate']),
+                'pressure': float(row['Pressure']),
+                'temperature': float(row['Temperature']),
+            }
+            for row in rows
+        ])
+        self.assertEqual(data['equipment_type_distribution'], {'Pump': 10, 'Valve': 10, 'Compressor': 10, 'Reactor': 10})
+        self.assertAlmostEqual(data['average_flowrate'], round(sum(float(row['Flowrate']) for row in rows) / 40, 2))
+
+    def test_equipment_rows_are_stored_in_file_order(self):
+        data = self.upload(make_csv(rows=25)).json()
+        record = self.latest_record()
+        self.assertEqual(Equipment.objects.filter(upload_record=record).count(), 25)
+        self.assertEqual(load_equipment(record), data['equipment'])
+
+    def test_upload_needs_a_file(self):
+        response = self.client.post('/api/upload/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'No file uploaded'})
+
+    def test_upload_needs_a_login(self):
+        self.client.logout()
+        self.assertIn(self.upload(make_csv()).status_code, (401, 403))
@@ -0,0 +1,68 @@
+from django.test import override_settings
+
+from api.models import UploadRecord
+
+from .utils import HEADER, ApiTestCase, make_csv
+
+
+class ValidationTests(ApiTestCase):
+    BAD_ROWS = {
+        4: {'Flowrate': 'abc'},
+        9: {'Type': ''},
+        10: {'Temperature': 'inf'},
+    }
+
+    def test_invalid_rows_are_dropped_and_reported(self):
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream), override_settings(UPLOAD_CHUNK_ROWS=7):
+                content = make_csv(seed=stream == 'true', bad_rows=self.BAD_ROWS)
+                response = self.upload(content, stream=stream)
+                self.assertEqual(response.status_code, 200)
+                validation = response.json()['validation']
+                self.assertEqual(validation['rows_checked'], 120)
+                self.assertEqual(validation['rows_rejected'], 3)
+                self.assertEqual(validation['by_error'], {
+                    'Flowrate: not_a_number': 1,
+                    'Type: missing': 1,
+                    'Temperature: not_finite': 1,
+                })
+                self.assertEqual([row['row'] for row in validation['rows']], [5, 10, 11])
+                self.assertEqual(validation['rows'][0]['errors'], [
+                    {'column': 'Flowrate', 'error': 'not_a_number', 'value': 'abc'},
+                ])
+                record = self.latest_record()
+                self.assertEqual(record.total_equipment, 117)
+                self.assertEqual(record.validation, validation)
+
+    def test_dropped_rows_leave_no_type_behind(self):
+        # Valve only appears on the rejected row
+        content = (HEADER + "\nA,Pump,1,2,3\nB,Valve,abc,2,3\nC,Pump,2,3,4\n").encode()
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                data = self.upload(content, stream=stream, force='true').json()
+                self.assertEqual(data['equipment_type_distribution'], {'Pump': 2})
+                record = self.latest_record()
+                self.assertEqual(set(record.statistics['by_type']), {'Pump'})
+                self.assertEqual(set(record.rollup), {'Pump'})
+        trends = self.client.get('/api/trends/').json()['results']
+        self.assertEqual({row['type'] for row in trends}, {'Pump'})
+
+    def test_reject_mode_refuses_the_upload(self):
+        for stream in ('false', 'true'):
+            with self.subTest(stream=stream):
+                response = self.upload(make_csv(bad_rows=self.BAD_ROWS), stream=stream, invalid_rows='reject')
+                self.assertEqual(response.status_code, 400)
+                data = response.json()
+                self.assertIn('error', data)
+                self.assertEqual(data['validation']['rows_rejected'], 3)
+                self.assertFalse(UploadRecord.objects.exists())
+
+    def test_no_valid_rows_is_an_error(self):
+        response = self.upload((HEADER + "\nA,Pump,x,2,3\n").encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['validation']['rows_rejected'], 1)
+
+    def test_unknown_mode_is_an_error(self):
+        response = self.upload(make_csv(), invalid_rows='skip')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadRecord.objects.exists())
@@ -0,0 +1,70 @@
+"""Shared helpers for the API tests."""
+
+import math
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from api.models import UploadRecord
+
+TYPES = ('Pump', 'Valve', 'Compressor', 'Reactor')
+HEADER = "Equipment Name,Type,Flowrate,Pressure,Temperature"
+
+
+def make_csv(rows=120, seed=0, bad_rows=()):
+    """
+    CSV bytes of ``rows`` equipment items, distinct per ``seed``. Item 3 is
+    a far pressure outlier of its type so the z-score check has something
+    to flag. ``bad_rows`` maps 0-based items to {column: value} to put in
+    instead.
+    """
+    rng = np.random.default_rng(seed)
+    lines = [HEADER]
+    for i in range(rows):
+        values = {
+            'Equipment Name': f"EQ-{seed}-{i}",
+            'Type': TYPES[i % len(TYPES)],
+            'Flowrate': f"{rng.uniform(50, 250):.2f}",
+            'Pressure': f"{rng.uniform(1, 12):.2f}" if i != 3 else "500",
+            'Temperature': f"{rng.uniform(20, 150):.1f}",
+        }
+        values.update(dict(bad_rows).get(i, {}))
+        lines.append(",".join(values.values()))
+    return ("\n".join(lines) + "\n").encode()
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        # Cache keys come from database state, which every test rolls back
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user('tester', password='secret')
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='upload.csv', headers=None, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(
+            '/api/upload/' + (f'?{query}' if query else ''),
+            {'file': SimpleUploadedFile(name, content, 'text/csv')},
+            headers=headers,
+        )
+
+    def latest_record(self):
+        return UploadRecord.objects.filter(complete=True).latest('id')
+
+    def assertNestedAlmostEqual(self, first, second, path=''):
+        if isinstance(first, dict):
+            self.assertEqual(set(first), set(second), path)
+            for key in first:
+                self.assertNestedAlmostEqual(first[key], second[key], f'{path}/{key}')
+        elif isinstance(first, list):
+            self.assertEqual(len(first), len(second), path)
+            for i, (a, b) in enumerate(zip(first, second)):
+                self.assertNestedAlmostEqual(a, b, f'{path}/{i}')
+        elif isinstance(first, float) and isinstance(second, (int, float)):
+            self.assertTrue(math.isclose(first, second, rel_tol=1e-9, abs_tol=1e-9), f'{path}: {first} != {second}')
+        else:
+            self.assertEqual(first, second, path)
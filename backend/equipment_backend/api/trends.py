@@ -0,0 +1,139 @@
+"""
+Per-upload, per-type aggregates across uploads for /api/trends/.
+
+Query parameters:
+
+    start=2026-01-01            only uploads at or after this date/datetime
+    end=2026-02-01              only uploads up to this date (the whole day)
+                                or datetime
+    type=Pump&type=Valve        keep only these equipment types
+
+Each result row is one (upload, type) pair with the row count and the
+average flowrate, pressure and temperature, ordered by upload time.
+
+Uploads kept with row storage are aggregated by the database in a single
+GROUP BY over Equipment joined to UploadRecord; the
+equipment_trends_idx index holds every column the query touches, so it
+is answered from the index alone. Columnar uploads have no Equipment
+rows, their figures come from the per-type statistics stored at ingestion.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Equipment, UploadRecord
+from .storage import NUMERIC_FIELDS
+
+TREND_FIELDS = tuple(f'average_{field}' for field in NUMERIC_FIELDS)
+
+
+def _parse_bound(raw, name, end=False):
+    # Returns (aware datetime, whether the bound is exclusive)
+    # Dates first: parse_datetime would also accept a bare date as midnight
+    try:
+        day = parse_date(raw)
+        value = parse_datetime(raw) if day is None else None
+    except ValueError:
+        value = day = None
+    exclusive = False
+    if value is None:
+        if day is None:
+            raise ValueError(f"{name} must be an ISO date or datetime")
+        if end:
+            # A bare end date covers that whole day
+            day += timedelta(days=1)
+            exclusive = True
+        value = datetime.combine(day, time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value, exclusive
+
+
+def parse_trends_query(params):
+    """Turn request query params into a query dict. Raises ValueError on bad input."""
+    query = {'types': [t for t in params.getlist('type') if t], 'start': None, 'end': None, 'end_exclusive': False}
+    if params.get('start'):
+        query['start'], _ = _parse_bound(params['start'], 'start')
+    if params.get('end'):
+        query['end'], query['end_exclusive'] = _parse_bound(params['end'], 'end', end=True)
+    if query['start'] and query['end']:
+        # A bare end date is exclusive, so starting on its bound is after it
+        if query['start'] > query['end'] or (query['end_exclusive'] and query['start'] == query['end']):
+            raise ValueError("start must not be after end")
+    return query
+
+
+def _filter_uploads(qs, query, prefix=''):
+    if query['start'] is not None:
+        qs = qs.filter(**{f'{prefix}uploaded_at__gte': query['start']})
+    if query['end'] is not None:
+        op = 'lt' if query['end_exclusive'] else 'lte'
+        qs = qs.filter(**{f'{prefix}uploaded_at__{op}': query['end']})
+    return qs
+
+
+def query_trends(query):
+    """Return the list of per-upload, per-type aggregate dicts."""
+    results = _aggregate_rows(query) + _aggregate_columnar(query)
+    results.sort(key=lambda row: (row['uploaded_at'], row['upload_id'], row['type']))
+    return results
+
+
+def _aggregate_rows(query):
+    qs = Equipment.objects.filter(
+        upload_record__storage=UploadRecord.STORAGE_ROWS, upload_record__complete=True
+    )
+    qs = _filter_uploads(qs, query, prefix='upload_record__')
+    if query['types']:
+        qs = qs.filter(type__in=query['types'])
+
+    grouped = (
+        qs.values('upload_record_id', 'upload_record__uploaded_at', 'type')
+        .annotate(
+            count=Count('upload_record_id'),
+            **{f'average_{field}': Avg(field) for field in NUMERIC_FIELDS},
+        )
+        .order_by()
+    )
+    return [
+        {
+            "upload_id": row['upload_record_id'],
+            "uploaded_at": row['upload_record__uploaded_at'],
+            "type": row['type'],
+            "count": row['count'],
+            **{name: _round(row[name]) for name in TREND_FIELDS},
+        }
+        for row in grouped
+    ]
+
+
+def _aggregate_columnar(query):
+    records = _filter_uploads(
+        UploadRecord.objects.filter(storage=UploadRecord.STORAGE_COLUMNAR, complete=True), query
+    ).values_list('id', 'uploaded_at', 'equipment_type_distribution', 'statistics')
+
+    results = []
+    for record_id, uploaded_at, distribution, statistics in records:
+        by_type = (statistics or {}).get('by_type', {})
+        for eq_type, count in distribution.items():
+            if query['types'] and eq_type not in query['types']:
+                continue
+            stats = by_type.get(eq_type, {})
+            results.append({
+                "upload_id": record_id,
+                "uploaded_at": uploaded_at,
+                "type": eq_type,
+                "count": count,
+                **{
+                    f'average_{field}': _round(stats.get(field, {}).get('mean'))
+                    for field in NUMERIC_FIELDS
+                },
+            })
+    return results
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
@@ -0,0 +1,45 @@
+"""
+Upload handler that hashes files while Django receives them.
+
+It sits first in FILE_UPLOAD_HANDLERS and passes every chunk through
+untouched to the regular memory/temporary-file handlers, so the SHA-256 of
+an upload is ready by the time the view runs without reading the file a
+second time.
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class HashingUploadHandler(FileUploadHandler):
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        digests = getattr(self.request, 'upload_digests', None)
+        if digests is None:
+            digests = self.request.upload_digests = {}
+        digests[self.field_name] = self._hash.hexdigest()
+        # Let the next handler build the actual file object
+        return None
+
+
+def upload_digest(request, field_name, file):
+    """SHA-256 hex digest of an uploaded file, from the handler if it ran."""
+    digest = getattr(request, 'upload_digests', {}).get(field_name)
+    if digest:
+        return digest
+
+    # Handler not installed (or file built some other way): hash it now
+    sha = hashlib.sha256()
+    for chunk in file.chunks():
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
@@ -1,13 +1,19 @@
 from django.urls import path
-from .views import health_check, upload_csv, upload_history, get_summary, download_pdf, register_user
+from .views import health_check, upload_csv, upload_history, get_summary, download_pdf, register_user, job_status, cache_stats, export_equipment, upload_trends, fleet_statistics, equipment_series
 
 urlpatterns = [
     path('register/', register_user),
     path('health/', health_check),
     path('upload/', upload_csv),
     path('history/', upload_history),
+    path('trends/', upload_trends),
+    path('fleet/', fleet_statistics),
+    path('series/', equipment_series),
+    path('jobs/<int:job_id>/', job_status),
     path('summary/<int:session_id>/', get_summary),
+    path('export/<int:session_id>/', export_equipment),
     path('report/', download_pdf),
     path('report/<int:session_id>/', download_pdf),
     path('download-pdf/', download_pdf),
+    path('cache/stats/', cache_stats),
 ]
@@ -0,0 +1,153 @@
+"""
+Row-level validation of parsed CSV chunks.
+
+Every check is a whole-column operation producing a boolean mask:
+
+- numeric columns: pd.to_numeric(errors='coerce') when the parser could
+  not read them as floats, then missing / not a number / infinite
+- name and type: missing, or longer than the Equipment CharField allows
+
+Rows failing any check are dropped from the chunk in one boolean index
+instead of failing the whole upload; with ``?invalid_rows=reject`` the
+upload is refused instead. Columns the parser already read as float64
+skip the coercion, so clean files only pay for a few NaN masks.
+
+RowValidator folds the outcome of every chunk into one compact report,
+stored on UploadRecord.validation and returned with the upload:
+
+    {"rows_checked": N, "rows_rejected": k,
+     "by_error": {"Flowrate: not_a_number": 3, ...},
+     "rows": [{"row": 7, "errors": [{"column": "Flowrate",
+               "error": "not_a_number", "value": "abc"}]}, ...],
+     "truncated": bool}
+
+``row`` is the 1-based data row in the file (the header not counted);
+only the first VALIDATION_MAX_ERRORS rejected rows are listed, with their
+offending values.
+"""
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import Equipment
+
+NUMERIC_COLUMNS = ('Flowrate', 'Pressure', 'Temperature')
+TEXT_COLUMNS = {
+    'Equipment Name': Equipment._meta.get_field('name').max_length,
+    'Type': Equipment._meta.get_field('type').max_length,
+}
+
+INVALID_ROWS_MODES = ('drop', 'reject')
+
+
+class RowValidator:
+    """Validates chunk after chunk, keeping one report for the whole upload."""
+
+    def __init__(self):
+        self.rows_checked = 0
+        self.rows_rejected = 0
+        self.by_error = Counter()
+        self.rows = []
+
+    def clean(self, df):
+        """Return ``df`` with numeric columns coerced and invalid rows dropped."""
+        offset = self.rows_checked
+        self.rows_checked += len(df)
+
+        checks = []
+        coerced = {}
+        for column in NUMERIC_COLUMNS:
+            raw = df[column]
+            values = raw if pd.api.types.is_float_dtype(raw.dtype) else pd.to_numeric(raw, errors='coerce')
+            if values is not raw:
+                coerced[column] = values
+            array = values.to_numpy(dtype='float64')
+            missing = raw.isna().to_numpy()
+            checks.append((column, 'missing', missing))
+            checks.append((column, 'not_a_number', np.isnan(array) & ~missing))
+            checks.append((column, 'not_finite', np.isinf(array)))
+        for column, max_length in TEXT_COLUMNS.items():
+            missing, too_long = _text_checks(df[column], max_length)
+            checks.append((column, 'missing', missing))
+            checks.append((column, 'too_long', too_long))
+
+        invalid = np.zeros(len(df), dtype=bool)
+        for _, _, mask in checks:
+            invalid |= mask
+
+        raw_frame = df
+        if coerced:
+            df = df.assign(**coerced)
+        if not invalid.any():
+            return df
+
+        self.rows_rejected += int(np.count_nonzero(invalid))
+        room = max(settings.VALIDATION_MAX_ERRORS - len(self.rows), 0)
+        listed = np.flatnonzero(invalid)[:room]
+        errors = {int(position): [] for position in listed}
+        for column, error, mask in checks:
+            hits = int(np.count_nonzero(mask))
+            if not hits:
+                continue
+            self.by_error[f'{column}: {error}'] += hits
+            positions = listed[mask[listed]]
+            if error == 'missing':
+                values = [None] * len(positions)
+            else:
+                values = raw_frame[column].iloc[positions].astype(object).tolist()
+            for position, value in zip(positions.tolist(), values):
+                errors[position].append({
+                    "column": column,
+                    "error": error,
+                    "value": None if value is None else str(value)[:100],
+                })
+        self.rows.extend(
+            {"row": offset + position + 1, "errors": row_errors}
+            for position, row_errors in errors.items()
+        )
+        kept = df[~invalid]
+        # A category only the dropped rows had would still be counted (as 0)
+        # by value_counts() and everything built on it
+        unused = {
+            column: kept[column].cat.remove_unused_categories()
+            for column in kept.columns
+            if isinstance(kept[column].dtype, pd.CategoricalDtype)
+        }
+        return kept.assign(**unused) if unused else kept
+
+    def result(self):
+        return {
+            "rows_checked": self.rows_checked,
+            "rows_rejected": self.rows_rejected,
+            "by_error": dict(self.by_error.most_common()),
+            "rows": self.rows,
+            "truncated": self.rows_rejected > len(self.rows),
+        }
+
+
+def kept_rows(validation, count):
+    """
+    The 1-based file rows of the ``count`` rows an upload kept, worked back
+    from its validation report (stored on UploadRecord.validation). None if
+    the report is truncated, as the rejected rows are then not all known.
+    """
+    if validation.get('truncated'):
+        return None
+    rejected = np.array([entry['row'] for entry in validation.get('rows', [])], dtype='int64')
+    return np.setdiff1d(np.arange(1, count + len(rejected) + 1), rejected)[:count]
+
+
+def _text_checks(series, max_length):
+    # (missing, too long) masks
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Measure each distinct label once and map back through the codes;
+        # code -1 (missing) picks the trailing False
+        codes = series.cat.codes.to_numpy()
+        too_long = np.append(np.asarray(series.cat.categories.astype(str).str.len() > max_length), False)
+        return codes < 0, too_long[codes]
+    # One pass over the strings: the length is NaN where the value is missing
+    lengths = series.str.len().to_numpy(dtype='float64', na_value=np.nan)
+    return np.isnan(lengths), lengths > max_length
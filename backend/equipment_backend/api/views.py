@@ -1,17 +1,56 @@
-from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 
-from django.http import FileResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.contrib.auth.models import User
-from .pdf_utils import generate_pdf
-
-
-
-import pandas as pd
-
-from .models import UploadRecord, Equipment
+from .http_cache import (
+    etag_matches,
+    history_etag,
+    history_version,
+    not_modified,
+    query_digest,
+    set_validators,
+    summary_etag,
+)
+from . import response_cache
+from .report_cache import get_report, report_etag, store_report
+
+
+
+from io import BytesIO
+
+from .retention import trim_after_upload
+from .models import UploadRecord, IngestJob
+from .jobs import recover_jobs, submit_job
+from .ingest import (
+    IngestError,
+    RunningAggregates,
+    InvalidRowsError,
+    chunk_values,
+    check_valid_rows,
+    equipment_columns,
+    find_duplicate,
+    ingest_csv_stream,
+    invalid_rows_mode,
+    read_equipment_csv,
+    release_digest,
+    validate_rows,
+)
+from .anomalies import detect_anomalies
+from .validation import RowValidator
+from .export import EXPORT_CONTENT_TYPES, ExportError, export_stream
+from .renderers import EQUIPMENT_RENDERERS, EXPORT_RENDERERS, wants_columns
+from .upload_handlers import upload_digest
+from .history import parse_history_query, query_history
+from .trends import parse_trends_query, query_trends
+from .rollups import apply_rollup, query_fleet
+from .series import parse_series_query, query_series
+from .equipment_query import iter_equipment, parse_equipment_query, query_equipment
+from .json_stream import stream_summary
+from .storage import default_backend, equipment_records, load_columns, load_equipment, write_equipment
 
 
 @api_view(['POST'])
@@ -60,7 +99,7 @@ def health_check(request):
 
 
 @api_view(['POST'])
-
+@renderer_classes(EQUIPMENT_RENDERERS)
 def upload_csv(request):
     if 'file' not in request.FILES:
         return Response(
@@ -70,119 +109,305 @@ def upload_csv(request):
 
     file = request.FILES['file']
 
+    # Re-uploading a file we already have returns the earlier upload instead
+    # of ingesting it again; ?force=true re-ingests it anyway.
+    digest = upload_digest(request, 'file', file)
+    force = _flag(request, 'force', default=False)
+    if not force:
+        existing = find_duplicate(digest)
+        if existing is not None:
+            return _duplicate_response(request, file, existing)
+
+    # Rows that fail validation are dropped and reported (api/validation.py);
+    # ?invalid_rows=reject refuses the whole file instead.
     try:
-        df = pd.read_csv(file)
-    except Exception as e:
-        return Response(
-            {"error": f"Invalid CSV file: {str(e)}"},
-            status=400
-        )
+        mode = invalid_rows_mode(request.query_params.get('invalid_rows'))
+    except IngestError as e:
+        return Response({"error": str(e)}, status=400)
+
+    # ?async=true queues the file and returns straight away; the client then
+    # polls /api/jobs/<id>/ for progress and the final summary.
+    if _flag(request, 'async'):
+        job = submit_job(file, content_sha256=digest, force=force, invalid_rows=mode)
+        return Response(_job_status(job), status=202)
+
+    # Large files (or an explicit ?stream=true) go through the chunked path,
+    # which never holds the whole upload in memory. The response then carries
+    # the summary only, without the per-equipment list.
+    if _wants_streaming(request, file):
+        try:
+            record = ingest_csv_stream(
+                file, settings.UPLOAD_CHUNK_ROWS, content_sha256=digest, force=force,
+                invalid_rows=mode,
+            )
+        except InvalidRowsError as e:
+            return Response({"error": str(e), "validation": e.report}, status=400)
+        except IngestError as e:
+            return Response({"error": str(e)}, status=400)
+        except IntegrityError:
+            existing = find_duplicate(digest)
+            if existing is None:
+                raise
+            return _duplicate_response(request, file, existing)
+
+        trim_after_upload()
+        return Response(_record_summary(record))
+
+    validator = RowValidator()
+    try:
+        df = validate_rows(validator, read_equipment_csv(file), mode)
+        check_valid_rows(validator, len(df))
+    except InvalidRowsError as e:
+        return Response({"error": str(e), "validation": e.report}, status=400)
+    except IngestError as e:
+        return Response({"error": str(e)}, status=400)
+
+    # Pull the columns out once instead of walking the frame row by row
+    columns = equipment_columns(df)
+    # Column-wise formats take the columns as they are (api/renderers.py)
+    equipment_list = columns if wants_columns(request) else equipment_records(columns)
+
+    # Same aggregation as the chunked path, fed with a single chunk; the
+    # frame is whole, so the percentiles are exact rather than sampled
+    aggregates = RunningAggregates(exact=True)
+    aggregates.update(df)
+    summary = aggregates.summary()
+    summary["anomalies"] = detect_anomalies(
+        *chunk_values(df), summary["statistics"], rows=df.index + 1, names=df['Equipment Name'],
+    )
+    summary["validation"] = validator.result()
+    summary["equipment"] = equipment_list
+
+    # Save to database
+    try:
+        with transaction.atomic():
+            if force:
+                release_digest(digest)
+            record = UploadRecord.objects.create(
+                total_equipment=summary["total_equipment"],
+                average_flowrate=summary["average_flowrate"],
+                average_pressure=summary["average_pressure"],
+                average_temperature=summary["average_temperature"],
+                equipment_type_distribution=summary["equipment_type_distribution"],
+                statistics=summary["statistics"],
+                anomalies=summary["anomalies"],
+                validation=summary["validation"],
+                storage=default_backend(),
+                content_sha256=digest,
+                rollup=aggregates.rollup(),
+                # filename could be added if model supported it, but sticking to existing schema for now
+            )
+
+            # Save individual equipment data
+            write_equipment(record, columns)
+            apply_rollup(record.rollup, record.uploaded_at)
+    except IntegrityError:
+        # The same file was ingested concurrently and won the race
+        existing = find_duplicate(digest)
+        if existing is None:
+            raise
+        return _duplicate_response(request, file, existing)
+
+    trim_after_upload()
+
+    # Same leading id as the chunked path, so either can be followed up
+    return Response({"id": record.id, **summary})
+
+
+def _duplicate_response(request, file, record):
+    # The payload the upload itself would have returned, plus the earlier
+    # upload's id: the equipment list unless the file takes the chunked path
+    summary = _record_summary(record)
+    if not _wants_streaming(request, file):
+        columns = load_columns(record)
+        summary["equipment"] = columns if wants_columns(request) else equipment_records(columns)
+    summary["duplicate_of"] = record.id
+    return Response(summary)
+
+
+def _flag(request, name, default=None):
+    value = request.query_params.get(name, '').lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    return default
+
+
+def _wants_streaming(request, file):
+    flag = _flag(request, 'stream')
+    if flag is not None:
+        return flag
+    return file.size is not None and file.size >= settings.UPLOAD_STREAMING_THRESHOLD_BYTES
 
-    required_columns = {
-        'Equipment Name',
-        'Type',
-        'Flowrate',
-        'Pressure',
-        'Temperature'
+
+def _record_summary(record):
+    return {
+        "id": record.id,
+        "total_equipment": record.total_equipment,
+        "average_flowrate": record.average_flowrate,
+        "average_pressure": record.average_pressure,
+        "average_temperature": record.average_temperature,
+        "equipment_type_distribution": record.equipment_type_distribution,
+        "statistics": record.statistics,
+        "anomalies": record.anomalies,
+        "validation": record.validation,
     }
 
-    if not required_columns.issubset(df.columns):
-        return Response(
-            {"error": "CSV missing required columns"},
-            status=400
-        )
 
-    # Create equipment list from dataframe
-    equipment_list = []
-    for _, row in df.iterrows():
-        equipment_list.append({
-            "name": row['Equipment Name'],
-            "type": row['Type'],
-            "flowrate": float(row['Flowrate']),
-            "pressure": float(row['Pressure']),
-            "temperature": float(row['Temperature'])
-        })
-
-    summary = {
-        "total_equipment": int(len(df)),
-        "average_flowrate": round(df['Flowrate'].mean(), 2),
-        "average_pressure": round(df['Pressure'].mean(), 2),
-        "average_temperature": round(df['Temperature'].mean(), 2),
-        "equipment_type_distribution": df['Type'].value_counts().to_dict(),
-        "equipment": equipment_list
+def _job_status(job):
+    data = {
+        "id": job.id,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "attempts": job.attempts,
+        "file_size": job.file_size,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "status_url": f"/api/jobs/{job.id}/",
     }
+    if job.status == IngestJob.STATUS_FAILED:
+        data["error"] = job.error
+        if job.validation:
+            # Same shape as the synchronous 400 for a rejected upload
+            data["validation"] = job.validation
+    if job.status == IngestJob.STATUS_DONE and job.upload_record_id:
+        data["summary"] = _record_summary(job.upload_record)
+    return data
 
-    # Save to database
-    # Save to database
-    record = UploadRecord.objects.create(
-        total_equipment=summary["total_equipment"],
-        average_flowrate=summary["average_flowrate"],
-        average_pressure=summary["average_pressure"],
-        average_temperature=summary["average_temperature"],
-        equipment_type_distribution=summary["equipment_type_distribution"],
-        # filename could be added if model supported it, but sticking to existing schema for now
-    )
 
-    # Save individual equipment data
-    Equipment.objects.bulk_create([
-        Equipment(
-            upload_record=record,
-            name=eq['name'],
-            type=eq['type'],
-            flowrate=eq['flowrate'],
-            pressure=eq['pressure'],
-            temperature=eq['temperature']
-        ) for eq in equipment_list
-    ])
-
-    # Keep only last 5 uploads
-    if UploadRecord.objects.count() > 5:
-        oldest = UploadRecord.objects.order_by('uploaded_at').first()
-        oldest.delete()
+@api_view(['GET'])
+def job_status(request, job_id):
+    # Pick up jobs left behind by a worker process that went away
+    recover_jobs()
+    try:
+        job = IngestJob.objects.select_related('upload_record').get(id=job_id)
+    except IngestJob.DoesNotExist:
+        return Response({"error": "Job not found"}, status=404)
 
-    return Response(summary)
+    return Response(_job_status(job))
 
 
 @api_view(['GET'])
 
 def upload_history(request):
-    records = UploadRecord.objects.order_by('-uploaded_at')[:5]
+    # Paging, ?fields= projection and compact mode, see api/history.py
+    try:
+        query = parse_history_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    # Read the version before the rows: a change committed in between only
+    # makes the next poll fetch again, never hides new data behind a 304
+    version, changed_at = history_version()
+    etag = history_etag(request, version)
+    cached = not_modified(request, etag, changed_at)
+    if cached is not None:
+        return cached
+
+    # Cached pages skip the query, see api/response_cache.py
+    cache_key = response_cache.history_key(version, query_digest(request))
+    entry = response_cache.get('history', cache_key)
+    if entry is None:
+        entry = {
+            "data": _history_data(request, query),
+            "etag": etag,
+            "last_modified": changed_at,
+        }
+        response_cache.store('history', cache_key, entry)
+
+    return set_validators(
+        Response(entry["data"]), entry["etag"], entry["last_modified"],
+        max_age=settings.HISTORY_CACHE_MAX_AGE,
+    )
 
-    data = []
-    for record in records:
-        data.append({
-            "id": record.id,
-            "uploaded_at": record.uploaded_at,
-            "total_equipment": record.total_equipment,
-            "average_flowrate": record.average_flowrate,
-            "average_pressure": record.average_pressure,
-            "average_temperature": record.average_temperature,
-            "equipment_type_distribution": record.equipment_type_distribution
-        })
 
-    return Response(data)
+def _history_data(request, query):
+    rows, next_cursor = query_history(query)
 
+    if _flag(request, 'compact', default=False):
+        return {
+            "fields": query['fields'],
+            "rows": rows,
+            "next_cursor": next_cursor,
+        }
+    data = [dict(zip(query['fields'], row)) for row in rows]
+    if 'limit' in request.query_params or 'cursor' in request.query_params:
+        return {"results": data, "next_cursor": next_cursor}
+    # Plain requests keep the original bare list of the latest uploads
+    return data
 
 
 @api_view(['GET'])
+@renderer_classes(EQUIPMENT_RENDERERS)
 def get_summary(request, session_id):
     try:
-        record = UploadRecord.objects.get(id=session_id)
+        record = UploadRecord.objects.get(id=session_id, complete=True)
     except UploadRecord.DoesNotExist:
         return Response({"error": "Session not found"}, status=404)
-    
-    # Retrieve equipment list
-    equipment_list_db = [
-        {
-            "name": eq.name,
-            "type": eq.type,
-            "flowrate": eq.flowrate,
-            "pressure": eq.pressure,
-            "temperature": eq.temperature
-        } for eq in record.equipment_list.all()
-    ]
-    
-    summary = {
+
+    # The same id and query always give the same body until the record is
+    # saved again, so revalidation needs nothing beyond this one lookup
+    etag = summary_etag(request, record)
+    cached = not_modified(request, etag, record.updated_at)
+    if cached is not None:
+        return cached
+
+    # Cached summaries skip loading the equipment, see api/response_cache.py
+    cache_key = response_cache.summary_key(record, query_digest(request))
+    entry = response_cache.get('summary', cache_key)
+    if entry is not None:
+        return set_validators(
+            Response(entry["data"]), entry["etag"], entry["last_modified"],
+            max_age=settings.SUMMARY_CACHE_MAX_AGE,
+        )
+
+    if _wants_summary_stream(request, record):
+        try:
+            query = parse_equipment_query(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        # Paged requests are small, only whole lists are streamed
+        if query['limit'] is None:
+            chunks = iter_equipment(record, query, settings.SUMMARY_STREAM_CHUNK_ROWS)
+            response = StreamingHttpResponse(
+                stream_summary(_summary_fields(record), chunks), content_type='application/json'
+            )
+            return set_validators(
+                response, etag, record.updated_at, max_age=settings.SUMMARY_CACHE_MAX_AGE
+            )
+
+    try:
+        summary = _summary_data(request, record)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    response_cache.store('summary', cache_key, {
+        "data": summary,
+        "etag": etag,
+        "last_modified": record.updated_at,
+    })
+    return set_validators(
+        Response(summary), etag, record.updated_at, max_age=settings.SUMMARY_CACHE_MAX_AGE
+    )
+
+
+def _wants_summary_stream(request, record):
+    # ?stream=true / ?stream=false, otherwise decided by the upload's size.
+    # Streaming only applies to the JSON format with the equipment list.
+    if getattr(request.accepted_renderer, 'format', None) != 'json':
+        return False
+    if not _flag(request, 'include_equipment', default=True):
+        return False
+    stream = _flag(request, 'stream')
+    if stream is None:
+        return record.total_equipment >= settings.SUMMARY_STREAMING_THRESHOLD_ROWS
+    return stream
+
+
+def _summary_fields(record):
+    return {
         "id": record.id,
         "uploaded_at": record.uploaded_at,
         "filename": getattr(record, 'filename', 'upload.csv'), # Handle missing filename field if any
@@ -191,43 +416,196 @@ def get_summary(request, session_id):
         "average_pressure": record.average_pressure,
         "average_temperature": record.average_temperature,
         "equipment_type_distribution": record.equipment_type_distribution,
-        "equipment": equipment_list_db
+        "statistics": record.statistics,
+        "anomalies": record.anomalies,
+        "validation": record.validation,
     }
-    return Response(summary)
+
+
+def _summary_data(request, record):
+    summary = _summary_fields(record)
+
+    # ?include_equipment=false skips the equipment list entirely
+    if not _flag(request, 'include_equipment', default=True):
+        return summary
+
+    # Filtering / sorting / keyset paging, see api/equipment_query.py.
+    # Raises ValueError on bad query params.
+    query = parse_equipment_query(request.query_params)
+    equipment_list_db, next_cursor = query_equipment(record, query, as_columns=wants_columns(request))
+    summary["equipment"] = equipment_list_db
+    if query['limit']:
+        summary["next_cursor"] = next_cursor
+    return summary
+
+
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+def export_equipment(request, session_id):
+    """
+    Stream an upload's equipment list as CSV, NDJSON or Parquet, picked
+    with ?format= or the Accept header. Takes the same type/min_/max_/sort
+    filters as /api/summary/<id>/.
+    """
+    try:
+        record = UploadRecord.objects.get(id=session_id, complete=True)
+    except UploadRecord.DoesNotExist:
+        return Response({"error": "Session not found"}, status=404)
+
+    try:
+        query = parse_equipment_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    etag = summary_etag(request, record, resource='export')
+    cached = not_modified(request, etag, record.updated_at)
+    if cached is not None:
+        return cached
+
+    export_format = request.accepted_renderer.format
+    chunks = iter_equipment(record, query, settings.EXPORT_CHUNK_ROWS)
+    try:
+        stream = export_stream(export_format, chunks)
+    except ExportError as e:
+        return Response({"error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(stream, content_type=EXPORT_CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="upload_{record.id}.{export_format}"'
+    return set_validators(response, etag, record.updated_at, max_age=settings.SUMMARY_CACHE_MAX_AGE)
+
+
+@api_view(['GET'])
+def upload_trends(request):
+    # Per-upload, per-type aggregates, see api/trends.py. Like the history it
+    # only changes when an upload does, so it shares its version counter.
+    try:
+        query = parse_trends_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    version, changed_at = history_version()
+    etag = history_etag(request, version, resource='trends')
+    cached = not_modified(request, etag, changed_at)
+    if cached is not None:
+        return cached
+
+    cache_key = response_cache.history_key(version, query_digest(request), resource='trends')
+    entry = response_cache.get('trends', cache_key)
+    if entry is None:
+        entry = {
+            "data": {"results": query_trends(query)},
+            "etag": etag,
+            "last_modified": changed_at,
+        }
+        response_cache.store('trends', cache_key, entry)
+
+    return set_validators(
+        Response(entry["data"]), entry["etag"], entry["last_modified"],
+        max_age=settings.HISTORY_CACHE_MAX_AGE,
+    )
+
+
+@api_view(['GET'])
+def fleet_statistics(request):
+    # Fleet-wide statistics per equipment type from the rollup tables, see
+    # api/rollups.py. Takes the trends filters plus ?by=day.
+    try:
+        query = parse_trends_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    by = request.query_params.get('by', '')
+    if by not in ('', 'day'):
+        return Response({"error": "by must be 'day'"}, status=400)
+
+    version, changed_at = history_version()
+    etag = history_etag(request, version, resource='fleet')
+    cached = not_modified(request, etag, changed_at)
+    if cached is not None:
+        return cached
+
+    return set_validators(
+        Response(query_fleet(query, by_day=by == 'day')), etag, changed_at,
+        max_age=settings.HISTORY_CACHE_MAX_AGE,
+    )
+
+
+@api_view(['GET'])
+def equipment_series(request):
+    # One asset's readings across uploads, downsampled for long ranges, see
+    # api/series.py
+    try:
+        query = parse_series_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    version, changed_at = history_version()
+    etag = history_etag(request, version, resource='series')
+    cached = not_modified(request, etag, changed_at)
+    if cached is not None:
+        return cached
+
+    series = query_series(query)
+    if series is None:
+        return Response({"error": "Equipment not found"}, status=404)
+    return set_validators(
+        Response(series), etag, changed_at,
+        max_age=settings.HISTORY_CACHE_MAX_AGE,
+    )
+
+
+@api_view(['GET'])
+def cache_stats(request):
+    """Hit/miss counters of the response and report caches in this process."""
+    return Response(response_cache.cache_stats())
 
 
 @api_view(['GET'])
 def download_pdf(request, session_id=None):
+    # Only what the ETag needs; the rest is loaded when the report is built
+    records = UploadRecord.objects.filter(complete=True).only('id', 'updated_at')
     if session_id:
-        try:
-            record = UploadRecord.objects.get(id=session_id)
-        except UploadRecord.DoesNotExist:
+        record = records.filter(id=session_id).first()
+        if record is None:
             return Response({"error": "Session not found"}, status=404)
     else:
-        record = UploadRecord.objects.order_by('-uploaded_at').first()
+        record = records.order_by('-uploaded_at').first()
 
-    if not record:
+    if record is None:
         return Response({"error": "No data available"}, status=400)
+    record_id = record.id
 
-    summary = {
-        "total_equipment": record.total_equipment,
-        "average_flowrate": record.average_flowrate,
-        "average_pressure": record.average_pressure,
-        "average_temperature": record.average_temperature,
-        "equipment_type_distribution": record.equipment_type_distribution
-    }
+    # The ETag changes with the record's updated_at, so a match means the
+    # client already has this version of the report
+    etag = report_etag(record)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    pdf_bytes = get_report(record)
+    if pdf_bytes is None:
+        record = UploadRecord.objects.get(id=record_id)
+
+        summary = {
+            "total_equipment": record.total_equipment,
+            "average_flowrate": record.average_flowrate,
+            "average_pressure": record.average_pressure,
+            "average_temperature": record.average_temperature,
+            "equipment_type_distribution": record.equipment_type_distribution,
+            "statistics": record.statistics,
+            "anomalies": record.anomalies,
+            "validation": record.validation,
+        }
+
+        # Fetch equipment list for the detailed table
+        equipment_list = load_equipment(record)
 
-    # Fetch equipment list for the detailed table
-    equipment_list = [
-        {
-            "name": eq.name,
-            "type": eq.type,
-            "flowrate": eq.flowrate,
-            "pressure": eq.pressure,
-            "temperature": eq.temperature
-        } for eq in record.equipment_list.all()
-    ]
+        # ReportLab and matplotlib are only loaded once a report is actually built
+        from .pdf_utils import generate_pdf
 
-    pdf_buffer = generate_pdf(summary, equipment_list)
-    return FileResponse(pdf_buffer, as_attachment=True, filename=f"report_{record.id}.pdf")
+        pdf_bytes = generate_pdf(summary, equipment_list).getvalue()
+        store_report(record, pdf_bytes)
 
+    response = FileResponse(BytesIO(pdf_bytes), as_attachment=True, filename=f"report_{record_id}.pdf")
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,83 @@
+"""
+Benchmark: cost of the anomaly pass at ingestion.
+
+For each size, times the work upload_csv does before writing to the
+database, then the detect_anomalies() pass over the same columns:
+
+    parse      read_equipment_csv() on the CSV bytes
+    aggregate  RunningAggregates.update() plus the statistics and rollup
+    anomalies  detect_anomalies(), z-scores only and with hard limits
+
+and prints the anomaly pass as a share of parse + aggregate. The database
+write is not included, so the real overhead per upload is lower.
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_anomalies.py
+    python benchmarks/bench_anomalies.py --sizes 10000 1000000 --repeat 5
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_backend.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from api.anomalies import detect_anomalies  # noqa: E402
+from api.ingest import RunningAggregates, chunk_values, read_equipment_csv  # noqa: E402
+from bench_ingest import make_frame  # noqa: E402
+
+# Used for the "with limits" run; roughly the top of make_frame's ranges,
+# so a few percent of rows are flagged
+LIMITS = {'pressure': (None, 11.5), 'temperature': (25.0, 145.0)}
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def aggregate(df):
+    aggregates = RunningAggregates()
+    aggregates.update(df)
+    return aggregates.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'parse s':>8} {'aggr s':>8} {'z-score s':>10} {'overhead':>9} "
+          f"{'limits s':>9} {'overhead':>9} {'flagged':>9}")
+    for n in args.sizes:
+        data = make_frame(n).to_csv(index=False).encode()
+        parse, df = best_of(args.repeat, lambda: read_equipment_csv(io.BytesIO(data)))
+        aggr, summary = best_of(args.repeat, lambda: aggregate(df))
+        types, values = chunk_values(df)
+        statistics = summary['statistics']
+        baseline = parse + aggr
+
+        settings.ANOMALY_LIMITS = {}
+        zscore, _ = best_of(args.repeat, lambda: detect_anomalies(types, values, statistics))
+        settings.ANOMALY_LIMITS = LIMITS
+        limits, result = best_of(args.repeat, lambda: detect_anomalies(types, values, statistics))
+        print(f"{n:>10} {parse:>8.3f} {aggr:>8.3f} {zscore:>10.3f} {zscore / baseline:>8.1%} "
+              f"{limits:>9.3f} {limits / baseline:>8.1%} {result['count']:>9,}")
+
+
+if __name__ == '__main__':
+    main()
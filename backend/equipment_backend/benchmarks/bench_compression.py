@@ -0,0 +1,101 @@
+"""
+Benchmark: response compression on GET /api/summary/<id>/.
+
+Stores one upload of N rows in a scratch SQLite database, then fetches its
+summary (full equipment list) through the middleware stack with each
+Accept-Encoding. Reports the body size, the server-side time per request
+(median of --repeat runs, compression included) and the estimated total
+latency over a link of --link-mbps.
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --sizes 10000 50000 --link-mbps 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_backend.settings')
+
+# Never touch the real database
+_scratch = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+os.environ['DATABASE_URL'] = f"sqlite:///{_scratch.name}"
+
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from api.ingest import RunningAggregates, equipment_columns  # noqa: E402
+from api.middleware import brotli  # noqa: E402
+from api.models import UploadRecord  # noqa: E402
+from api.storage import write_equipment  # noqa: E402
+from bench_ingest import make_frame  # noqa: E402
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+
+def store_upload(n_rows):
+    df = make_frame(n_rows)
+    aggregates = RunningAggregates()
+    aggregates.update(df)
+    record = UploadRecord.objects.create(**aggregates.summary())
+    write_equipment(record, equipment_columns(df))
+    return record
+
+
+def fetch(client, url, encoding, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        timings.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.status_code
+    return len(body), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--link-mbps', type=float, default=5.0, help="Client link speed for the latency estimate.")
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    settings.ALLOWED_HOSTS.append('testserver')
+    # Measure building and compressing the response, not the response cache
+    settings.RESPONSE_CACHE_TTLS = {}
+
+    client = Client()
+    client.force_login(User.objects.create(username='bench'))
+    bytes_per_second = args.link_mbps * 1_000_000 / 8
+
+    print(f"{'rows':>8} {'encoding':>9} {'body':>12} {'ratio':>7} {'server ms':>10} {'total ms @' + str(args.link_mbps) + 'Mb/s':>18}")
+    try:
+        for n in args.sizes:
+            record = store_upload(n)
+            url = f'/api/summary/{record.id}/'
+            baseline = None
+            for encoding in ENCODINGS:
+                size, server_s = fetch(client, url, encoding, args.repeat)
+                baseline = baseline or size
+                total_ms = (server_s + size / bytes_per_second) * 1000
+                print(f"{n:>8} {encoding:>9} {size / 1024:>9,.0f} KB {size / baseline:>7.2f} {server_s * 1000:>10.1f} {total_ms:>18,.0f}")
+            record.delete()
+    finally:
+        connection.close()
+        os.unlink(_scratch.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: worker startup import cost with and without the report stack.
+
+Each measurement runs in a fresh interpreter:
+  app         django.setup() + importing the URLconf (what a web worker loads)
+  app+report  the same, plus api.pdf_utils and matplotlib's Agg figure,
+              i.e. what every worker used to pay before the lazy import
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_import.py --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    'app': (
+        "import django; django.setup(); "
+        "import equipment_backend.urls"
+    ),
+    'app+report': (
+        "import django; django.setup(); "
+        "import equipment_backend.urls; "
+        "from api.pdf_utils import preload_report_stack; preload_report_stack()"
+    ),
+}
+
+TIMER = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+
+def measure(code):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='equipment_backend.settings')
+    out = subprocess.run(
+        [sys.executable, '-c', TIMER.format(code=code)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in SNIPPETS.items():
+        measure(code)  # warm the OS file cache / .pyc files
+        results[name] = statistics.median(measure(code) for _ in range(args.repeat))
+        print(f"{name:>12}: {results[name] * 1000:8.1f} ms (median of {args.repeat})")
+
+    print(f"{'saved':>12}: {(results['app+report'] - results['app']) * 1000:8.1f} ms per worker start")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: row materialization in upload_csv, iterrows() vs columnar.
+
+Measures building the response payload plus the Equipment instances that
+get handed to bulk_create (the database write itself is not included).
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --sizes 1000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_backend.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from api.models import Equipment, UploadRecord  # noqa: E402
+from api.ingest import equipment_columns  # noqa: E402
+from api.storage import equipment_records, EQUIPMENT_FIELDS  # noqa: E402
+
+
+def make_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    types = np.array(['Pump', 'Valve', 'Reactor', 'Compressor', 'HeatExchanger'])
+    return pd.DataFrame({
+        'Equipment Name': [f"Unit {i}" for i in range(n_rows)],
+        'Type': types[rng.integers(0, len(types), n_rows)],
+        'Flowrate': rng.uniform(50, 250, n_rows).round(1),
+        'Pressure': rng.uniform(1, 12, n_rows).round(2),
+        'Temperature': rng.uniform(20, 150, n_rows).round(1),
+    })
+
+
+def legacy(df, record):
+    # The original upload_csv loop
+    equipment_list = []
+    for _, row in df.iterrows():
+        equipment_list.append({
+            "name": row['Equipment Name'],
+            "type": row['Type'],
+            "flowrate": float(row['Flowrate']),
+            "pressure": float(row['Pressure']),
+            "temperature": float(row['Temperature'])
+        })
+    objs = [
+        Equipment(
+            upload_record=record,
+            name=eq['name'],
+            type=eq['type'],
+            flowrate=eq['flowrate'],
+            pressure=eq['pressure'],
+            temperature=eq['temperature']
+        ) for eq in equipment_list
+    ]
+    return equipment_list, objs
+
+
+def columnar(df, record):
+    columns = equipment_columns(df)
+    equipment_list = equipment_records(columns)
+    objs = [
+        Equipment(upload_record_id=record.id, name=n, type=t,
+                  flowrate=f, pressure=p, temperature=temp)
+        for n, t, f, p, temp in zip(*(columns[field] for field in EQUIPMENT_FIELDS))
+    ]
+    return equipment_list, objs
+
+
+def timed(func, df, record):
+    start = time.perf_counter()
+    func(df, record)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    # unsaved record, only its id is used
+    record = UploadRecord(id=1)
+
+    print(f"{'rows':>10} {'iterrows rows/s':>18} {'columnar rows/s':>18} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_frame(n)
+        old = timed(legacy, df, record)
+        new = timed(columnar, df, record)
+        print(f"{n:>10} {n / old:>18,.0f} {n / new:>18,.0f} {old / new:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
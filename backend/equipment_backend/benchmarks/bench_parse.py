@@ -0,0 +1,122 @@
+"""
+Benchmark: CSV parsing in upload_csv, plain read_csv vs read_equipment_csv.
+
+Writes a large file (the five equipment columns) and a wide one (the same
+plus --extra-columns unrelated columns) to a temp directory, then parses
+each in a fresh subprocess per parser so peak memory is measured cleanly:
+
+    legacy    pd.read_csv(file) then the column check, as upload_csv used to
+    fast-c    read_equipment_csv() with the C engine
+    fast-pa   read_equipment_csv() with the pyarrow engine (if installed)
+
+Also times rejecting a large file that lacks a required column, which the
+fast path does from the header line alone.
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --rows 200000 --extra-columns 100
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_backend.settings')
+
+import django  # noqa: E402
+django.setup()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from api.ingest import IngestError, check_columns, pyarrow, read_equipment_csv  # noqa: E402
+from bench_ingest import make_frame  # noqa: E402
+
+PARSERS = ['legacy', 'fast-c'] + (['fast-pa'] if pyarrow is not None else [])
+
+
+def write_files(directory, n_rows, extra_columns):
+    df = make_frame(n_rows)
+    paths = {'large': os.path.join(directory, 'large.csv')}
+    df.to_csv(paths['large'], index=False)
+
+    rng = np.random.default_rng(1)
+    wide = df.copy()
+    for i in range(extra_columns):
+        wide[f'extra_{i}'] = rng.uniform(0, 1, n_rows).round(3)
+    paths['wide'] = os.path.join(directory, 'wide.csv')
+    wide.to_csv(paths['wide'], index=False)
+
+    paths['missing-column'] = os.path.join(directory, 'missing.csv')
+    wide.drop(columns=['Pressure']).to_csv(paths['missing-column'], index=False)
+    return paths
+
+
+def _memory_kb(field):
+    # VmRSS now, or VmHWM: the peak of this process since exec (ru_maxrss
+    # would carry over the parent's peak)
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def parse_once(parser, path):
+    # Runs in the child process; returns seconds and peak memory growth
+    settings.CSV_PARSER_ENGINE = {'fast-c': 'c', 'fast-pa': 'pyarrow'}.get(parser, 'auto')
+    baseline = _memory_kb('VmRSS')
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        try:
+            if parser == 'legacy':
+                df = pd.read_csv(f)
+                check_columns(df)
+            else:
+                df = read_equipment_csv(f)
+            rows = len(df)
+        except IngestError:
+            rows = None
+    elapsed = time.perf_counter() - start
+    peak = _memory_kb('VmHWM')
+    return {"seconds": elapsed, "peak_mb": max(peak - baseline, 0) / 1024, "rows": rows}
+
+
+def measure(parser, path):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', parser, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--extra-columns', type=int, default=50)
+    parser.add_argument('--child', nargs=2, metavar=('PARSER', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(parse_once(*args.child)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_files(directory, args.rows, args.extra_columns)
+        print(f"{'file':>15} {'size':>9} {'parser':>8} {'seconds':>8} {'peak MB':>8} {'result':>10}")
+        for name, path in paths.items():
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for which in PARSERS:
+                result = measure(which, path)
+                outcome = 'rejected' if result['rows'] is None else f"{result['rows']:,}"
+                print(f"{name:>15} {size_mb:>6.0f} MB {which:>8} {result['seconds']:>8.2f} {result['peak_mb']:>8.0f} {outcome:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: generate_pdf detail table, single grid table vs high-volume mode.
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --sizes 1000 10000 --legacy-max 10000
+
+The single-table layout gets very slow on big uploads, so by default it is
+only timed up to --legacy-max rows.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.pdf_utils import generate_pdf  # noqa: E402
+from bench_ingest import make_frame  # noqa: E402
+
+
+def make_summary(df):
+    return {
+        "total_equipment": len(df),
+        "average_flowrate": df['Flowrate'].mean(),
+        "average_pressure": df['Pressure'].mean(),
+        "average_temperature": df['Temperature'].mean(),
+        "equipment_type_distribution": df['Type'].value_counts().to_dict(),
+    }
+
+
+def make_equipment(df):
+    return [
+        {"name": n, "type": t, "flowrate": f, "pressure": p, "temperature": temp}
+        for n, t, f, p, temp in zip(
+            df['Equipment Name'], df['Type'], df['Flowrate'], df['Pressure'], df['Temperature']
+        )
+    ]
+
+
+def timed(summary, equipment, high_volume):
+    start = time.perf_counter()
+    pdf = generate_pdf(summary, equipment, high_volume=high_volume)
+    return time.perf_counter() - start, len(pdf.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--legacy-max', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'single table s':>15} {'high-volume s':>14} {'speedup':>8} {'pdf size':>10}")
+    for n in args.sizes:
+        df = make_frame(n)
+        summary, equipment = make_summary(df), make_equipment(df)
+        fast, size = timed(summary, equipment, high_volume=True)
+        if n <= args.legacy_max:
+            slow, _ = timed(summary, equipment, high_volume=False)
+            print(f"{n:>8} {slow:>15.2f} {fast:>14.2f} {slow / fast:>7.1f}x {size / 1024:>8,.0f} KB")
+        else:
+            print(f"{n:>8} {'skipped':>15} {fast:>14.2f} {'':>8} {size / 1024:>8,.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: 'rows' vs 'columnar' equipment storage.
+
+Writes one upload of N rows with each backend into a scratch SQLite
+database and reports insert time, time to read the whole list back, and
+how much the database file grew.
+
+Usage (from backend/equipment_backend):
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_backend.settings')
+
+# Never touch the real database
+_scratch = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+os.environ['DATABASE_URL'] = f"sqlite:///{_scratch.name}"
+
+import django  # noqa: E402
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from api.ingest import equipment_columns  # noqa: E402
+from api.models import UploadRecord  # noqa: E402
+from api.storage import load_columns, write_equipment  # noqa: E402
+from bench_ingest import make_frame  # noqa: E402
+
+
+def db_size():
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    return os.path.getsize(_scratch.name)
+
+
+def run(backend, columns):
+    size_before = db_size()
+    record = UploadRecord.objects.create(
+        total_equipment=len(columns['name']),
+        average_flowrate=0,
+        average_pressure=0,
+        average_temperature=0,
+        equipment_type_distribution={},
+        storage=backend,
+    )
+
+    start = time.perf_counter()
+    write_equipment(record, columns, backend)
+    insert_s = time.perf_counter() - start
+
+    record = UploadRecord.objects.get(id=record.id)
+    start = time.perf_counter()
+    load_columns(record)
+    read_s = time.perf_counter() - start
+
+    grown = db_size() - size_before
+    record.delete()
+    return insert_s, read_s, grown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+
+    print(f"{'rows':>10} {'backend':>9} {'insert s':>10} {'read s':>10} {'db growth':>12}")
+    try:
+        for n in args.sizes:
+            columns = equipment_columns(make_frame(n))
+            for backend in (UploadRecord.STORAGE_ROWS, UploadRecord.STORAGE_COLUMNAR):
+                insert_s, read_s, grown = run(backend, columns)
+                print(f"{n:>10} {backend:>9} {insert_s:>10.3f} {read_s:>10.3f} {grown / 1024:>10,.0f} KB")
+    finally:
+        connection.close()
+        os.unlink(_scratch.name)
+
+
+if __name__ == '__main__':
+    main()
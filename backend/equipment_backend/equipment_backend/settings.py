@@ -56,6 +56,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise for static files
+    'api.middleware.CompressionMiddleware',  # gzip/brotli for API responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -169,3 +170,176 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Response compression
+# Brotli when installed and accepted, gzip otherwise (api/middleware.py),
+# for responses of at least COMPRESSION_MIN_BYTES
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+COMPRESSION_EXCLUDED_TYPES = (
+    'application/pdf',
+    'application/zip',
+    'application/gzip',
+    'application/vnd.apache.parquet',
+    'image/',
+)
+
+# CSV ingestion
+# Uploads at or above this size are read in chunks of UPLOAD_CHUNK_ROWS rows
+# instead of being loaded into one DataFrame. Clients can force either mode
+# with ?stream=true / ?stream=false on /api/upload/.
+UPLOAD_STREAMING_THRESHOLD_BYTES = int(os.environ.get('UPLOAD_STREAMING_THRESHOLD_BYTES', 50 * 1024 * 1024))
+UPLOAD_CHUNK_ROWS = int(os.environ.get('UPLOAD_CHUNK_ROWS', 50000))
+
+# Uploaded rows failing validation (api/validation.py) are dropped and
+# reported ('drop') or refuse the whole upload ('reject'); ?invalid_rows=
+# overrides it per upload. Up to VALIDATION_MAX_ERRORS bad rows are listed.
+INVALID_ROWS_MODE = os.environ.get('INVALID_ROWS_MODE', 'drop')
+VALIDATION_MAX_ERRORS = int(os.environ.get('VALIDATION_MAX_ERRORS', 100))
+
+# read_csv engine for uploads parsed in one piece: 'auto' (pyarrow when
+# installed, else 'c'), 'pyarrow' or 'c'. Chunked uploads always use 'c'.
+CSV_PARSER_ENGINE = os.environ.get('CSV_PARSER_ENGINE', 'auto')
+
+# Hash uploads as they arrive so repeated files can be recognised
+# (api/upload_handlers.py), then hand them to Django's usual handlers
+FILE_UPLOAD_HANDLERS = [
+    'api.upload_handlers.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Uploaded files waiting in the ingestion job queue are spooled here
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
+
+# Background ingestion jobs (/api/upload/?async=true)
+# INGEST_WORKERS threads per process pick jobs off the IngestJob table.
+# With INGEST_JOBS_EAGER the job runs inline in the request, which is handy
+# for tests and single-process setups.
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 2))
+INGEST_JOBS_EAGER = os.environ.get('INGEST_JOBS_EAGER', 'False').lower() in ('true', '1', 'yes')
+# A running job whose worker has not sent a heartbeat for this long is
+# requeued, or failed after INGEST_JOB_MAX_ATTEMPTS claims. Each process
+# looks for such jobs, and for queued jobs nobody runs, at most every
+# INGEST_JOB_RECOVERY_SECONDS when a job is polled or submitted
+# (`manage.py process_ingest_jobs` does the same on demand).
+INGEST_JOB_LEASE_SECONDS = int(os.environ.get('INGEST_JOB_LEASE_SECONDS', 600))
+INGEST_JOB_MAX_ATTEMPTS = int(os.environ.get('INGEST_JOB_MAX_ATTEMPTS', 3))
+INGEST_JOB_RECOVERY_SECONDS = int(os.environ.get('INGEST_JOB_RECOVERY_SECONDS', 60))
+
+# Layout used for the equipment list of new uploads: 'rows' (one Equipment
+# row per item) or 'columnar' (packed arrays in one EquipmentColumns row).
+# Existing uploads keep their layout; see `manage.py convert_equipment_storage`.
+EQUIPMENT_STORAGE = os.environ.get('EQUIPMENT_STORAGE', 'rows')
+
+# Upload history retention (api/retention.py)
+# Keep the newest HISTORY_RETENTION_COUNT uploads and/or uploads younger than
+# HISTORY_RETENTION_DAYS; 0 disables either rule. With HISTORY_TRIM_ON_UPLOAD
+# off, run `manage.py trim_history` periodically instead.
+HISTORY_RETENTION_COUNT = int(os.environ.get('HISTORY_RETENTION_COUNT', 5))
+HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', 0))
+HISTORY_TRIM_ON_UPLOAD = os.environ.get('HISTORY_TRIM_ON_UPLOAD', 'True').lower() in ('true', '1', 'yes')
+
+# JSON summaries of uploads with at least this many rows are streamed out
+# in chunks of SUMMARY_STREAM_CHUNK_ROWS instead of being rendered in one
+# piece; ?stream=true / ?stream=false on /api/summary/<id>/ overrides it.
+SUMMARY_STREAMING_THRESHOLD_ROWS = int(os.environ.get('SUMMARY_STREAMING_THRESHOLD_ROWS', 50000))
+SUMMARY_STREAM_CHUNK_ROWS = int(os.environ.get('SUMMARY_STREAM_CHUNK_ROWS', 2000))
+
+# Rows per chunk read from the database and written out by /api/export/<id>/
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', 5000))
+
+# Rows per equipment type kept to estimate the p50/p95/p99 statistics of
+# streamed uploads (api/statistics.py): exact up to this many rows per type,
+# sampled above, so ingestion memory does not grow with the upload.
+# In-memory uploads always get exact percentiles
+STATISTICS_SAMPLE_SIZE = int(os.environ.get('STATISTICS_SAMPLE_SIZE', 10000))
+
+# Anomaly flags computed at ingestion (api/anomalies.py): values more than
+# ANOMALY_ZSCORE_THRESHOLD standard deviations from their type's mean (0
+# disables), and values outside per-row hard limits. No limits are set by
+# default; a deployment opts in per bound with ANOMALY_<FIELD>_MIN/_MAX,
+# e.g. ANOMALY_PRESSURE_MAX=12. Up to ANOMALY_MAX_ROWS flagged rows are
+# stored per upload.
+def _anomaly_limits(fields):
+    limits = {}
+    for field in fields:
+        bounds = tuple(
+            float(value) if value else None
+            for value in (os.environ.get(f'ANOMALY_{field.upper()}_{bound}', '') for bound in ('MIN', 'MAX'))
+        )
+        if bounds != (None, None):
+            limits[field] = bounds
+    return limits
+
+
+ANOMALY_ZSCORE_THRESHOLD = float(os.environ.get('ANOMALY_ZSCORE_THRESHOLD', 3.0))
+ANOMALY_LIMITS = _anomaly_limits(('flowrate', 'pressure', 'temperature'))
+ANOMALY_MAX_ROWS = int(os.environ.get('ANOMALY_MAX_ROWS', 1000))
+
+# Points returned by /api/series/ before it downsamples into time buckets
+# (?points=N picks another count, up to the maximum)
+SERIES_DEFAULT_POINTS = int(os.environ.get('SERIES_DEFAULT_POINTS', 500))
+SERIES_MAX_POINTS = int(os.environ.get('SERIES_MAX_POINTS', 5000))
+# The series is kept independently of the upload history: readings older
+# than SERIES_RETENTION_DAYS are trimmed with it, 0 keeps them all
+SERIES_RETENTION_DAYS = int(os.environ.get('SERIES_RETENTION_DAYS', 0))
+
+# Cache-Control max-age (seconds) for /api/summary/<id>/ (and exports) and
+# for /api/history/ (and trends).
+# 0 means clients must revalidate every time; they still get a cheap 304
+# when nothing changed (api/http_cache.py).
+SUMMARY_CACHE_MAX_AGE = int(os.environ.get('SUMMARY_CACHE_MAX_AGE', 300))
+HISTORY_CACHE_MAX_AGE = int(os.environ.get('HISTORY_CACHE_MAX_AGE', 0))
+
+# Caches
+# 'reports' holds generated PDF reports keyed by upload id (api/report_cache.py).
+# locmem evicts least recently used entries past MAX_ENTRIES; point
+# REPORT_CACHE_DIR at a directory to share the cache between workers.
+# Entries expire after REPORT_CACHE_TTL seconds.
+REPORT_CACHE_ALIAS = 'reports'
+REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 24 * 3600))
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get('REPORT_CACHE_MAX_ENTRIES', 50))
+REPORT_CACHE_MAX_ITEM_BYTES = int(os.environ.get('REPORT_CACHE_MAX_ITEM_BYTES', 20 * 1024 * 1024))
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+
+# 'responses' holds summary and history response data (api/response_cache.py),
+# with a lifetime in seconds per endpoint; 0 turns caching off for it. Keys
+# carry the record's updated_at or the history version, so entries are never
+# stale; point RESPONSE_CACHE_DIR at a directory to share them between workers.
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+RESPONSE_CACHE_MAX_ITEM_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ITEM_BYTES', 5 * 1024 * 1024))
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR')
+RESPONSE_CACHE_TTLS = {
+    'summary': int(os.environ.get('RESPONSE_CACHE_TTL_SUMMARY', 3600)),
+    'history': int(os.environ.get('RESPONSE_CACHE_TTL_HISTORY', 60)),
+    'trends': int(os.environ.get('RESPONSE_CACHE_TTL_TRENDS', 300)),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    REPORT_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reports',
+        'TIMEOUT': REPORT_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': REPORT_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': REPORT_CACHE_MAX_ENTRIES},
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': RESPONSE_CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': RESPONSE_CACHE_MAX_ENTRIES},
+    },
+}
+if REPORT_CACHE_DIR:
+    CACHES[REPORT_CACHE_ALIAS].update({
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': REPORT_CACHE_DIR,
+    })
+if RESPONSE_CACHE_DIR:
+    CACHES[RESPONSE_CACHE_ALIAS].update({
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': RESPONSE_CACHE_DIR,
+    })
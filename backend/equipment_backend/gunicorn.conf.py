@@ -0,0 +1,10 @@
+# Gunicorn picks this file up automatically from the working directory.
+import os
+
+# Report generation (ReportLab + matplotlib) is imported lazily on the first
+# report request. Set PRELOAD_REPORT_STACK=true to import it once in the
+# master instead, so every forked worker starts with it already loaded.
+if os.environ.get('PRELOAD_REPORT_STACK', 'False').lower() in ('true', '1', 'yes'):
+    def on_starting(server):
+        from api.pdf_utils import preload_report_stack
+        preload_report_stack()
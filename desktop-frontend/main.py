@@ -5,6 +5,10 @@ PySide6 + Matplotlib frontend for the Django backend API
 """
 
 import sys
+import json
+import struct
+import time
+import numpy as np
 import requests
 from io import BytesIO
 from requests.auth import HTTPBasicAuth
@@ -28,10 +32,63 @@ import matplotlib.pyplot as plt
 # API Configuration
 API_BASE_URL = 'https://chemical-equipment-api-01hg.onrender.com/api'
 
+# Only the first page of equipment rows is fetched for the table; the
+# summary statistics and charts always cover the whole upload
+TABLE_PAGE_SIZE = 1000
+
+# Equipment tables are fetched column-wise as packed arrays instead of JSON
+# (layout documented in the backend's api/renderers.py)
+PACKED_COLUMNS_TYPE = 'application/vnd.equipment.columns'
+PACKED_COLUMNS_MAGIC = b'EQCOLS\x00\x01'
+
 # Global auth credentials
 auth_credentials = None
 
 
+def fetch_summary(session_id):
+    """GET a summary with its first page of equipment as packed columns."""
+    response = requests.get(
+        f"{API_BASE_URL}/summary/{session_id}/",
+        params={'limit': TABLE_PAGE_SIZE},
+        headers={'Accept': PACKED_COLUMNS_TYPE},
+        auth=auth_credentials,
+        timeout=60  # Increased for Render cold-start
+    )
+    response.raise_for_status()
+    if not response.headers.get('Content-Type', '').startswith(PACKED_COLUMNS_TYPE):
+        return response.json()
+    return decode_packed_columns(response.content)
+
+
+def decode_packed_columns(content):
+    """
+    Turn a packed-columns response into the summary dict, with the table in
+    summary['equipment_columns'] as NumPy arrays (and a plain list of names).
+    """
+    if content[:8] != PACKED_COLUMNS_MAGIC:
+        raise ValueError("Unexpected response format from server")
+    (header_len,) = struct.unpack('<I', content[8:12])
+    offset = 12 + header_len
+    summary = json.loads(content[12:offset])
+
+    layout = summary.pop('columns', None)
+    if layout is None:
+        return summary
+
+    columns = {}
+    for name, dtype, length in layout['layout']:
+        raw = content[offset:offset + length]
+        offset += length
+        if dtype == 'utf-8':
+            columns[name] = raw.decode('utf-8').split('\x00') if layout['rows'] else []
+        else:
+            columns[name] = np.frombuffer(raw, dtype=dtype)
+    labels = np.array(layout['type_labels'], dtype=object)
+    columns['type'] = labels[columns['type']] if len(labels) else np.array([], dtype=object)
+    summary['equipment_columns'] = columns
+    return summary
+
+
 class LoginDialog(QDialog):
     """Login dialog for authentication with registration support."""
     
@@ -264,6 +321,20 @@ class LoginDialog(QDialog):
                 "Please ensure the backend is running.")
 
 
+def wait_for_job(job, poll_interval=1.0):
+    """Poll /jobs/<id>/ until a background upload job has finished."""
+    while job['status'] in ('queued', 'running'):
+        time.sleep(poll_interval)
+        response = requests.get(
+            f"{API_BASE_URL}/jobs/{job['id']}/",
+            auth=auth_credentials,
+            timeout=30
+        )
+        response.raise_for_status()
+        job = response.json()
+    return job
+
+
 class APIWorker(QThread):
     """Worker thread for API calls to prevent UI blocking."""
     finished = Signal(object)
@@ -300,6 +371,8 @@ class ChemicalVisualizerApp(QMainWindow):
         super().__init__()
         self.session_data = None
         self.history = []
+        # ETag of the last /history/ response, sent back so unchanged history costs a 304
+        self.history_etag = None
         self.workers = []
         
         self.init_ui()
@@ -524,6 +597,7 @@ class ChemicalVisualizerApp(QMainWindow):
         auth_credentials = None
         self.session_data = None
         self.history = []
+        self.history_etag = None
         self.history_list.clear()
         self.upload_status.setText("No file uploaded")
         self.download_btn.setEnabled(False)
@@ -550,21 +624,34 @@ class ChemicalVisualizerApp(QMainWindow):
             try:
                 with open(file_path, 'rb') as f:
                     files = {'file': (file_path.split('/')[-1], f)}
+                    # Job mode: the server queues the file and answers at once,
+                    # ingestion runs in the background while we poll for it
                     response = requests.post(
                         f"{API_BASE_URL}/upload/", 
+                        params={'async': 'true'},
                         files=files, 
                         auth=auth_credentials,
                         timeout=90  # Increased for Render cold-start
                     )
                     response.raise_for_status()
                     
-                    data = response.json()
-                    
-                    # Check for empty dataset
-                    if not data or data.get('total_equipment', 0) == 0:
-                        raise ValueError("CSV file is empty or contains no valid equipment records")
-                    
-                    return data
+                    job = response.json()
+
+                if response.status_code == 202:
+                    job = wait_for_job(job)
+                    if job['status'] == 'failed':
+                        raise ValueError(job.get('error') or "Upload could not be processed")
+                    summary = job.get('summary') or {}
+                else:
+                    # Same file uploaded before: the server answers with that upload's summary
+                    summary = job
+
+                # Check for empty dataset
+                if summary.get('total_equipment', 0) == 0:
+                    raise ValueError("CSV file is empty or contains no valid equipment records")
+
+                # The job only reports the summary; fetch the equipment table too
+                return fetch_summary(summary['id'])
             except requests.exceptions.ConnectionError:
                 raise Exception("Cannot connect to backend. Ensure the Django server is running on localhost:8000")
             except requests.exceptions.Timeout:
@@ -599,22 +686,33 @@ class ChemicalVisualizerApp(QMainWindow):
         QMessageBox.critical(self, "Upload Error", f"Failed to upload file:\n{error}")
 
     def load_history(self):
+        # Read the cached list and its ETag here on the GUI thread; the
+        # worker hands the new ETag back through its finished signal
+        cached, etag = self.history, self.history_etag
+        headers = {'If-None-Match': etag} if etag and cached else {}
+
         def fetch():
             try:
                 response = requests.get(
                     f"{API_BASE_URL}/history/",
+                    # Only what the history list shows
+                    params={'fields': 'id,uploaded_at,total_equipment'},
+                    headers=headers,
                     auth=auth_credentials,
                     timeout=60  # Increased for Render cold-start
                 )
+                if response.status_code == 304:
+                    return cached, etag
                 response.raise_for_status()
                 
                 data = response.json()
                 
+
                 # Validate response is a list and not empty
                 if not isinstance(data, list):
                     raise ValueError("Invalid history format from server")
                 
-                return data if data else []
+                return (data if data else []), response.headers.get('ETag')
             except requests.exceptions.ConnectionError:
                 raise Exception("Cannot reach backend. Is the Django server running?")
             except requests.exceptions.Timeout:
@@ -637,7 +735,8 @@ class ChemicalVisualizerApp(QMainWindow):
         QMessageBox.warning(self, "History Load Failed", f"{error}\n\nYou can continue using the app.")
         # Keep history as empty, app continues running
 
-    def on_history_loaded(self, data):
+    def on_history_loaded(self, result):
+        data, self.history_etag = result
         self.history = data
         self.history_list.clear()
         for item in data:
@@ -664,14 +763,7 @@ class ChemicalVisualizerApp(QMainWindow):
         self.status_bar.showMessage("Loading session data...")
         def fetch():
             try:
-                response = requests.get(
-                    f"{API_BASE_URL}/summary/{session_id}/",
-                    auth=auth_credentials,
-                    timeout=60  # Increased for Render cold-start
-                )
-                response.raise_for_status()
-                
-                data = response.json()
+                data = fetch_summary(session_id)
                 
                 # Validate essential fields exist
                 required_fields = ['total_equipment', 'average_flowrate', 'average_pressure', 'average_temperature']
@@ -795,7 +887,18 @@ class ChemicalVisualizerApp(QMainWindow):
             
             # Table - skip invalid rows
             equipment = data.get('equipment', [])
-            if isinstance(equipment, list):
+            columns = data.get('equipment_columns')
+            if columns is not None:
+                # Straight from the packed arrays, no per-row dicts
+                keep = [i for i, name in enumerate(columns['name']) if name]
+                self.data_table.setRowCount(len(keep))
+                for r, i in enumerate(keep):
+                    self.data_table.setItem(r, 0, QTableWidgetItem(columns['name'][i]))
+                    self.data_table.setItem(r, 1, QTableWidgetItem(str(columns['type'][i])))
+                    self.data_table.setItem(r, 2, QTableWidgetItem(f"{safe_float(columns['flowrate'][i], 0.0):.2f}"))
+                    self.data_table.setItem(r, 3, QTableWidgetItem(f"{safe_float(columns['pressure'][i], 0.0):.2f}"))
+                    self.data_table.setItem(r, 4, QTableWidgetItem(f"{safe_float(columns['temperature'][i], 0.0):.2f}"))
+            elif isinstance(equipment, list):
                 valid_equipment = []
                 for eq in equipment:
                     # Only add if it has a name
@@ -812,7 +915,11 @@ class ChemicalVisualizerApp(QMainWindow):
             else:
                 self.data_table.setRowCount(0)
             
-            self.status_bar.showMessage(f"Displaying {total_eq} equipment items")
+            shown = self.data_table.rowCount()
+            if shown < total_eq:
+                self.status_bar.showMessage(f"Displaying first {shown} of {total_eq} equipment items")
+            else:
+                self.status_bar.showMessage(f"Displaying {total_eq} equipment items")
         
         except Exception as e:
             # Catch any unexpected errors in display logic
@@ -82,7 +82,8 @@ export default function History() {
 
   useEffect(() => {
     setIsLoading(true);
-    fetch("https://chemical-equipment-api-01hg.onrender.com/api/history/")
+    // Only ask for the columns this page renders
+    fetch("https://chemical-equipment-api-01hg.onrender.com/api/history/?fields=id,uploaded_at,total_equipment,average_flowrate,average_pressure,average_temperature")
       .then((res) => res.json())
       .then((data) => {
         if (Array.isArray(data)) {
@@ -7,7 +7,10 @@ export async function uploadCSV(file, onProgress) {
   return new Promise((resolve, reject) => {
     const xhr = new XMLHttpRequest();
 
-    xhr.open("POST", `${API_BASE_URL}/upload/`);
+    // Upload in job mode: the server answers right away with a job id and
+    // ingestion continues in the background, so big files no longer run into
+    // the request timeout.
+    xhr.open("POST", `${API_BASE_URL}/upload/?async=true`);
 
     xhr.upload.onprogress = (event) => {
       if (event.lengthComputable && onProgress) {
@@ -18,7 +21,10 @@ export async function uploadCSV(file, onProgress) {
 
     xhr.onload = () => {
       try {
-        if (xhr.status === 200) {
+        if (xhr.status === 202) {
+          const job = JSON.parse(xhr.response);
+          waitForJob(job.id).then(resolve, reject);
+        } else if (xhr.status === 200) {
           const data = JSON.parse(xhr.response);
 
           if (!data || typeof data !== 'object') {
@@ -61,6 +67,46 @@ export async function uploadCSV(file, onProgress) {
 }
 
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
+export async function fetchJob(jobId) {
+  const response = await fetch(`${API_BASE_URL}/jobs/${jobId}/`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch upload status (${response.status})`);
+  }
+
+  return response.json();
+}
+
+async function waitForJob(jobId) {
+  for (;;) {
+    let job;
+    try {
+      job = await fetchJob(jobId);
+    } catch (error) {
+      if (error instanceof TypeError) {
+        throw "Network error: Cannot connect to backend.";
+      }
+      throw error.message;
+    }
+
+    if (job.status === "done") {
+      if (!job.summary || !job.summary.total_equipment) {
+        throw "CSV file is empty or contains no valid equipment records";
+      }
+      return job.summary;
+    }
+
+    if (job.status === "failed") {
+      throw job.error || "Invalid CSV format or file is empty";
+    }
+
+    await new Promise((r) => setTimeout(r, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+
 export async function fetchHistory() {
   try {
     const response = await fetch(`${API_BASE_URL}/history/`);